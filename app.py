@@ -21,6 +21,19 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 # RAG API URL
 RAG_API_URL = os.getenv("RAG_API_URL", "http://localhost:5003")
 
+# Number of documents the RAG API retrieves per question; "auto" lets it choose per query
+RAG_TOP_K = os.getenv("RAG_TOP_K", "3")
+RAG_TOP_K = RAG_TOP_K if RAG_TOP_K == "auto" else int(RAG_TOP_K)
+
+# How long to wait for a RAG answer; the RAG API is asked to answer a little earlier
+# (with an extractive answer if the LLM is slow) so a stalled LLM call is not followed
+# by a second, non-RAG one
+RAG_TIMEOUT_SECONDS = float(os.getenv("RAG_TIMEOUT_SECONDS", "10"))
+RAG_ANSWER_BUDGET_MS = int(max(RAG_TIMEOUT_SECONDS - 1.0, RAG_TIMEOUT_SECONDS / 2) * 1000)
+
+# Earlier user turns sent along so follow-up questions retrieve in context
+RAG_HISTORY_TURNS = int(os.getenv("RAG_HISTORY_TURNS", "3"))
+
 # Available models
 AVAILABLE_MODELS = {
     "gpt-3.5-turbo": "GPT-3.5 Turbo",
@@ -39,6 +52,25 @@ def calculate_cost(model, prompt_tokens, completion_tokens):
         return prompt_cost + completion_cost
     return 0
 
+# Format RAG sources as citations appended to the answer
+def format_sources_text(sources):
+    sources_text = "\n\nSources:\n"
+    for i, source in enumerate(sources):
+        source_name = source['source']
+        page = f", Page {source['page']}" if source['page'] else ""
+        sources_text += f"[{i+1}] {source_name}{page}\n"
+    return sources_text
+
+# Parse the server-sent events of a streaming RAG response
+def iter_rag_events(response):
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data: "):
+            continue
+        payload = line[len("data: "):]
+        if payload == "[DONE]":
+            return
+        yield json.loads(payload)
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -68,51 +100,75 @@ def chat():
         # If RAG is enabled, use the RAG API for the latest user message
         if use_rag and len(messages) > 0 and messages[-1]['role'] == 'user':
             user_query = messages[-1]['content']
+            history = [msg['content'] for msg in messages[:-1] if msg['role'] == 'user']
+            history = history[-RAG_HISTORY_TURNS:] if RAG_HISTORY_TURNS > 0 else []
             
             try:
-                # Call RAG API
-                rag_response = requests.post(
-                    f"{RAG_API_URL}/api/rag/query",
-                    json={"query": user_query, "top_k": 3},
-                    timeout=10
-                )
-                
-                if rag_response.status_code == 200:
-                    rag_data = rag_response.json()
+                if stream:
+                    # Relay the RAG answer as it is generated
+                    rag_stream = requests.post(
+                        f"{RAG_API_URL}/api/rag/query/stream",
+                        json={"query": user_query, "top_k": RAG_TOP_K, "history": history},
+                        stream=True,
+                        timeout=RAG_TIMEOUT_SECONDS
+                    )
                     
-                    if rag_data['status'] == 'success' and rag_data['has_context']:
-                        # Format sources for citation
-                        sources_text = "\n\nSources:\n"
-                        for i, source in enumerate(rag_data['sources']):
-                            source_name = source['source']
-                            page = f", Page {source['page']}" if source['page'] else ""
-                            sources_text += f"[{i+1}] {source_name}{page}\n"
+                    if rag_stream.status_code == 200:
+                        rag_events = iter_rag_events(rag_stream)
                         
-                        # For streaming response
-                        if stream:
+                        # The first event carries the sources, sent as soon as retrieval is done
+                        sources_event = next(rag_events, None)
+                        if sources_event and sources_event.get('type') == 'sources' and sources_event['has_context']:
+                            sources_text = format_sources_text(sources_event['sources'])
+                            
                             def generate():
-                                # Send the RAG answer
-                                answer = rag_data['answer']
-                                answer_with_sources = answer + sources_text
-                                
-                                # Split into smaller chunks to simulate streaming
-                                chunks = [answer_with_sources[i:i+10] for i in range(0, len(answer_with_sources), 10)]
-                                
-                                # Track tokens for cost calculation
-                                prompt_tokens = len(user_query.split())
-                                completion_tokens = len(answer_with_sources.split())
                                 start_time = time.time()
+                                first_token_latency = None
+                                prompt_tokens = len(user_query.split())
+                                completion_tokens = 0
                                 
-                                for chunk in chunks:
-                                    data = {
-                                        "choices": [{
-                                            "delta": {
-                                                "content": chunk
+                                try:
+                                    # Send the sources before the first token
+                                    yield f"data: {json.dumps({'sources': sources_event['sources']})}\n\n"
+                                    
+                                    try:
+                                        for event in rag_events:
+                                            if event.get('type') == 'error':
+                                                yield f"data: {json.dumps({'error': event['message']})}\n\n"
+                                                continue
+                                            if event.get('type') != 'token':
+                                                continue
+                                            
+                                            if first_token_latency is None:
+                                                first_token_latency = time.time() - start_time
+                                            completion_tokens += len(event['content'].split())
+                                            
+                                            data = {
+                                                "choices": [{
+                                                    "delta": {
+                                                        "content": event['content']
+                                                    }
+                                                }]
                                             }
-                                        }]
-                                    }
-                                    yield f"data: {json.dumps(data)}\n\n"
-                                    time.sleep(0.01)  # Simulate streaming delay
+                                            yield f"data: {json.dumps(data)}\n\n"
+                                    
+                                    except (requests.exceptions.RequestException, ValueError) as e:
+                                        # The RAG stream broke off (timeout, dropped connection or a garbled event)
+                                        print(f"Error reading RAG stream: {str(e)}")
+                                        yield f"data: {json.dumps({'error': f'RAG stream interrupted: {str(e)}'})}\n\n"
+                                    else:
+                                        # Append the citations to the answer
+                                        completion_tokens += len(sources_text.split())
+                                        data = {
+                                            "choices": [{
+                                                "delta": {
+                                                    "content": sources_text
+                                                }
+                                            }]
+                                        }
+                                        yield f"data: {json.dumps(data)}\n\n"
+                                finally:
+                                    rag_stream.close()
                                 
                                 # Calculate metrics
                                 latency = time.time() - start_time
@@ -125,6 +181,7 @@ def chat():
                                         "completionTokens": completion_tokens,
                                         "totalTokens": prompt_tokens + completion_tokens,
                                         "latency": round(latency, 2),
+                                        "timeToFirstToken": round(first_token_latency or latency, 2),
                                         "estimatedCost": round(cost, 6),
                                         "isRagResponse": True
                                     }
@@ -133,10 +190,25 @@ def chat():
                                 yield f"data: [DONE]\n\n"
                             
                             return Response(stream_with_context(generate()), content_type='text/event-stream')
-                        else:
+                    
+                    # No context: fall back to standard OpenAI response
+                    rag_stream.close()
+                else:
+                    # Call RAG API
+                    rag_response = requests.post(
+                        f"{RAG_API_URL}/api/rag/query",
+                        json={"query": user_query, "top_k": RAG_TOP_K, "timeout_ms": RAG_ANSWER_BUDGET_MS,
+                              "history": history},
+                        timeout=RAG_TIMEOUT_SECONDS
+                    )
+                    
+                    if rag_response.status_code == 200:
+                        rag_data = rag_response.json()
+                        
+                        if rag_data['status'] == 'success' and rag_data['has_context']:
                             # Non-streaming RAG response
                             answer = rag_data['answer']
-                            answer_with_sources = answer + sources_text
+                            answer_with_sources = answer + format_sources_text(rag_data['sources'])
                             
                             prompt_tokens = len(user_query.split())
                             completion_tokens = len(answer_with_sources.split())
@@ -153,7 +225,8 @@ def chat():
                                     "completionTokens": completion_tokens,
                                     "totalTokens": prompt_tokens + completion_tokens,
                                     "estimatedCost": round(cost, 6),
-                                    "isRagResponse": True
+                                    "isRagResponse": True,
+                                    "isDegraded": rag_data.get('degraded', False)
                                 }
                             })
             
@@ -5,8 +5,11 @@ This package provides tools for building a RAG system that combines LLMs with cu
 """
 
 from .models.rag_engine import RAGEngine
+from .utils.dimension_reducer import DimensionReducer
 from .utils.document_processor import DocumentProcessor
+from .utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache
 from .utils.embedding_manager import EmbeddingManager
+from .utils.embedding_pool import EmbeddingWorkerPool
 from .utils.vector_store import VectorStore
 
-__all__ = ['RAGEngine', 'DocumentProcessor', 'EmbeddingManager', 'VectorStore'] 
\ No newline at end of file
+__all__ = ['RAGEngine', 'DimensionReducer', 'DocumentProcessor', 'EmbeddingCache', 'QueryEmbeddingCache', 'EmbeddingManager', 'EmbeddingWorkerPool', 'VectorStore'] 
\ No newline at end of file
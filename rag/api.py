@@ -6,7 +6,9 @@ This module provides API endpoints for the RAG system to be used by the chat app
 
 import os
 import json
-from flask import Flask, request, jsonify
+import time
+import numpy as np
+from flask import Flask, Response, request, jsonify, stream_with_context
 from dotenv import load_dotenv
 
 from .models.rag_engine import RAGEngine
@@ -17,6 +19,9 @@ load_dotenv()
 # Initialize Flask app
 app = Flask(__name__)
 
+# Data directory
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
 # Initialize RAG engine
 use_openai_embeddings = os.getenv("OPENAI_API_KEY") is not None
 rag_engine = RAGEngine(
@@ -25,38 +30,211 @@ rag_engine = RAGEngine(
     llm_model_name="gpt-3.5-turbo",
     temperature=0.7,
     chunk_size=500,
-    chunk_overlap=50
+    chunk_overlap=50,
+    embedding_cache_path=os.getenv("RAG_EMBEDDING_CACHE", os.path.join(DATA_DIR, "embedding_cache.sqlite")),
+    query_batching=os.getenv("RAG_QUERY_BATCHING", "1") == "1",
+    query_batch_wait_ms=float(os.getenv("RAG_QUERY_BATCH_WAIT_MS", "5")),
+    batch_search=os.getenv("RAG_BATCH_SEARCH", "1") == "1",
+    reduced_dimension=int(os.getenv("RAG_REDUCED_DIMENSION")) if os.getenv("RAG_REDUCED_DIMENSION") else None,
+    model_cache_folder=os.getenv("RAG_MODEL_CACHE_DIR"),
+    offline=os.getenv("RAG_OFFLINE", "0") == "1",
+    embedding_memory_budget_mb=float(os.getenv("RAG_MODEL_MEMORY_MB")) if os.getenv("RAG_MODEL_MEMORY_MB") else None,
+    answer_cache_size=int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1024")),
+    answer_cache_threshold=float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95")),
+    # Answers are sampled at temperature 0.7, so reusing them must be opted into
+    answer_cache_allow_sampling=os.getenv("RAG_ANSWER_CACHE_ALLOW_SAMPLING", "0") == "1",
+    retrieval_cache_size=int(os.getenv("RAG_RETRIEVAL_CACHE_SIZE", "4096")),
+    context_max_tokens=int(os.getenv("RAG_CONTEXT_MAX_TOKENS", "1500")),
+    compression_max_tokens=int(os.getenv("RAG_COMPRESSION_MAX_TOKENS")) if os.getenv("RAG_COMPRESSION_MAX_TOKENS") else None,
+    adaptive_min_k=int(os.getenv("RAG_ADAPTIVE_MIN_K", "1")),
+    adaptive_max_k=int(os.getenv("RAG_ADAPTIVE_MAX_K", "10")),
+    adaptive_min_score=float(os.getenv("RAG_ADAPTIVE_MIN_SCORE")) if os.getenv("RAG_ADAPTIVE_MIN_SCORE") else None,
+    adaptive_min_gap=float(os.getenv("RAG_ADAPTIVE_MIN_GAP", "0.05")),
+    min_answer_score=float(os.getenv("RAG_MIN_ANSWER_SCORE")) if os.getenv("RAG_MIN_ANSWER_SCORE") else None,
+    extractive_min_score=float(os.getenv("RAG_EXTRACTIVE_MIN_SCORE")) if os.getenv("RAG_EXTRACTIVE_MIN_SCORE") else None,
+    mmr_lambda=float(os.getenv("RAG_MMR_LAMBDA")) if os.getenv("RAG_MMR_LAMBDA") else None,
+    mmr_fetch_k=int(os.getenv("RAG_MMR_FETCH_K", "20")),
+    max_chunks_per_source=int(os.getenv("RAG_MAX_CHUNKS_PER_SOURCE")) if os.getenv("RAG_MAX_CHUNKS_PER_SOURCE") else None,
+    neighbour_window=int(os.getenv("RAG_NEIGHBOUR_WINDOW", "0")),
+    neighbour_max_tokens=int(os.getenv("RAG_NEIGHBOUR_MAX_TOKENS", "400")),
+    history_turns=int(os.getenv("RAG_HISTORY_TURNS", "3")),
+    history_decay=float(os.getenv("RAG_HISTORY_DECAY", "0.5"))
 )
 
-# Data directory
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# Collections with their own embedding model, as "name=model,name=model"; the documents
+# of a collection are read from DATA_DIR/<name> and its index is saved as DATA_DIR/<name>.*
+for collection_spec in filter(None, os.getenv("RAG_COLLECTIONS", "").split(",")):
+    collection_name, collection_model = collection_spec.split("=", 1)
+    rag_engine.add_collection(collection_name.strip(), collection_model.strip())
+
+# Request-size limits of the embedding endpoint
+EMBED_MAX_TEXTS = int(os.getenv("RAG_EMBED_MAX_TEXTS", "256"))
+EMBED_MAX_TEXT_CHARS = int(os.getenv("RAG_EMBED_MAX_TEXT_CHARS", "8192"))
+EMBED_MAX_TOTAL_CHARS = int(os.getenv("RAG_EMBED_MAX_TOTAL_CHARS", "262144"))
+
+# Load models in the background so the API can answer health checks right away
+if os.getenv("RAG_PRELOAD", "1") == "1":
+    rag_engine.start_background_load(warmup_batch_size=int(os.getenv("RAG_WARMUP_BATCH", "8")))
 
 @app.route("/api/rag/health", methods=["GET"])
 def health_check():
     """Health check endpoint."""
-    return jsonify({"status": "ok", "message": "RAG API is running"})
+    return jsonify({"status": "ok", "message": "RAG API is running", "models": rag_engine.status()})
+
+@app.route("/api/rag/ready", methods=["GET"])
+def readiness_check():
+    """Readiness endpoint: 200 once models are loaded and warmed up, 503 before."""
+    engine_status = rag_engine.status()
+    if engine_status["ready"]:
+        return jsonify({"status": "ready", **engine_status})
+    return jsonify({"status": "not_ready", **engine_status}), 503
+
+@app.route("/api/rag/stats", methods=["GET"])
+def stats():
+    """Cache and performance statistics endpoint."""
+    return jsonify({
+        "status": "ok",
+        "embedding_cache": rag_engine.embedding_manager.cache_stats(),
+        "query_batching": rag_engine.query_batcher.stats() if rag_engine.query_batcher else None,
+        "openai_embeddings": rag_engine.embedding_manager.client.stats() if rag_engine.embedding_manager.client else None,
+        "models": rag_engine.model_registry.stats(),
+        "answer_cache": rag_engine.answer_cache_stats(),
+        "retrieval_cache": rag_engine.retrieval_cache.stats() if rag_engine.retrieval_cache else None,
+        "answer_paths": rag_engine.answer_path_stats()
+    })
+
+def collection_dir(collection=None):
+    """Directory holding the documents of a collection."""
+    return DATA_DIR if collection is None else os.path.join(DATA_DIR, collection)
+
+def index_name(collection=None):
+    """Base name of the saved index of a collection."""
+    return "vector_store" if collection is None else collection
+
+class IndexModelMismatchError(Exception):
+    """The saved index was built with another embedding model than the configured one."""
+
+def ensure_index(collection=None):
+    """
+    Load the saved index of a collection, or build it if there is none.
+    
+    Raises:
+        IndexModelMismatchError: If the saved index was built with another embedding model.
+            It is neither rebuilt in the request nor overwritten: either the configured model
+            is stale, or the index has to be migrated (POST /api/rag/migrate) or rebuilt
+            (POST /api/rag/index) first.
+    """
+    # Check if vector store exists, if not, index documents
+    name = index_name(collection)
+    vector_store_path = os.path.join(DATA_DIR, f"{name}.index")
+    if not os.path.exists(vector_store_path):
+        rag_engine.index_documents(collection_dir(collection), collection=collection)
+        rag_engine.save_index(DATA_DIR, name, collection=collection)
+    else:
+        # Load existing index if not already loaded
+        _, vector_store = rag_engine.get_collection(collection)
+        if len(vector_store.documents) == 0:
+            try:
+                rag_engine.load_index(DATA_DIR, name, collection=collection)
+            except ValueError as e:
+                raise IndexModelMismatchError(f"Index/model mismatch: {str(e)}. Run a migration "
+                                              "(POST /api/rag/migrate) or reindex (POST /api/rag/index)")
+
+def mismatch_response(error):
+    """Response to a query against an index built with another embedding model."""
+    return jsonify({
+        "status": "error",
+        "message": str(error)
+    }), 409
+
+def parse_query_request(data):
+    """
+    Validate the parameters shared by the query endpoints.
+    
+    Args:
+        data: JSON request body
+    
+    Returns:
+        Tuple of (dictionary with query, top_k (None for "auto"), collection, history and
+        timeout_ms; None), or (None; error response) if the request is invalid
+    """
+    if not data or "query" not in data:
+        return None, (jsonify({
+            "status": "error",
+            "message": "Missing required parameter: query"
+        }), 400)
+    
+    top_k = data.get("top_k", 3)
+    if top_k == "auto":
+        top_k = None
+    elif isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+        return None, (jsonify({
+            "status": "error",
+            "message": "top_k must be a positive integer or \"auto\""
+        }), 400)
+    
+    collection = data.get("collection")
+    if collection is not None and collection not in rag_engine.collections:
+        return None, (jsonify({
+            "status": "error",
+            "message": f"Unknown collection: {collection}"
+        }), 404)
+    
+    history = data.get("history")
+    if history is not None and not (isinstance(history, list) and all(isinstance(turn, str) for turn in history)):
+        return None, (jsonify({
+            "status": "error",
+            "message": "history must be a list of strings"
+        }), 400)
+    
+    timeout_ms = data.get("timeout_ms")
+    if timeout_ms is not None and (isinstance(timeout_ms, bool) or not isinstance(timeout_ms, (int, float))
+                                   or not 0 < timeout_ms < float("inf")):
+        return None, (jsonify({
+            "status": "error",
+            "message": "timeout_ms must be a positive number"
+        }), 400)
+    
+    return {
+        "query": data["query"],
+        "top_k": top_k,
+        "collection": collection,
+        "history": history,
+        "timeout_ms": timeout_ms
+    }, None
 
 @app.route("/api/rag/index", methods=["POST"])
 def index_documents():
     """
     Index documents from the data directory.
     
+    Request body:
+        collection: (optional) Collection to index, from DATA_DIR/<collection>
+    
     Returns:
         JSON response with status and message
     """
     try:
+        collection = (request.get_json(silent=True) or {}).get("collection")
+        if collection is not None and collection not in rag_engine.collections:
+            return jsonify({
+                "status": "error",
+                "message": f"Unknown collection: {collection}"
+            }), 404
+        
         # Check if data directory exists
-        if not os.path.exists(DATA_DIR):
+        documents_dir = collection_dir(collection)
+        if not os.path.exists(documents_dir):
             return jsonify({
                 "status": "error",
-                "message": f"Data directory {DATA_DIR} not found"
+                "message": f"Data directory {documents_dir} not found"
             }), 404
         
         # Index documents
-        rag_engine.index_documents(DATA_DIR)
+        rag_engine.index_documents(documents_dir, collection=collection)
         
         # Save index
-        rag_engine.save_index(DATA_DIR)
+        rag_engine.save_index(DATA_DIR, index_name(collection), collection=collection)
         
         return jsonify({
             "status": "success",
@@ -69,6 +247,84 @@ def index_documents():
             "message": f"Error indexing documents: {str(e)}"
         }), 500
 
+@app.route("/api/rag/embed", methods=["POST"])
+def embed():
+    """
+    Embed a batch of texts with the RAG engine's embedding model.
+    
+    Request body:
+        texts: List of texts
+        type: (optional) "document" (default, cached on disk) or "query" (in-memory query cache)
+        format: (optional) "json" (default) or "binary"
+    
+    Returns:
+        JSON response with the embeddings, or with format "binary" (or an
+        "Accept: application/octet-stream" header) the row-major little-endian float32
+        matrix, its shape and model given in the X-Embedding-* headers
+    """
+    try:
+        data = request.json
+        if not data or not isinstance(data.get("texts"), list) or not data["texts"]:
+            return jsonify({
+                "status": "error",
+                "message": "Missing required parameter: texts"
+            }), 400
+        
+        texts = data["texts"]
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({"status": "error", "message": "texts must be a list of strings"}), 400
+        
+        # Enforce request-size limits
+        if len(texts) > EMBED_MAX_TEXTS:
+            return jsonify({
+                "status": "error",
+                "message": f"Too many texts: {len(texts)} (limit {EMBED_MAX_TEXTS})"
+            }), 413
+        if max(len(text) for text in texts) > EMBED_MAX_TEXT_CHARS:
+            return jsonify({
+                "status": "error",
+                "message": f"Text longer than {EMBED_MAX_TEXT_CHARS} characters"
+            }), 413
+        if sum(len(text) for text in texts) > EMBED_MAX_TOTAL_CHARS:
+            return jsonify({
+                "status": "error",
+                "message": f"Request larger than {EMBED_MAX_TOTAL_CHARS} characters"
+            }), 413
+        
+        # Take one reference so a migration cut-over cannot switch models mid-request
+        embedding_manager = rag_engine.embedding_manager
+        if data.get("type", "document") == "query":
+            embeddings = embedding_manager.generate_query_embeddings(texts)
+        else:
+            embeddings = embedding_manager.generate_embeddings(texts)
+        embeddings = np.ascontiguousarray(embeddings, dtype="<f4")
+        
+        binary = data.get("format") == "binary" or (
+            "format" not in data and request.accept_mimetypes.best == "application/octet-stream")
+        if binary:
+            return Response(
+                embeddings.tobytes(),
+                mimetype="application/octet-stream",
+                headers={
+                    "X-Embedding-Count": str(embeddings.shape[0]),
+                    "X-Embedding-Dimension": str(embeddings.shape[1]),
+                    "X-Embedding-Model": embedding_manager.model_id
+                }
+            )
+        
+        return jsonify({
+            "status": "success",
+            "model": embedding_manager.model_id,
+            "dimension": embeddings.shape[1],
+            "embeddings": embeddings.tolist()
+        })
+    
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Error generating embeddings: {str(e)}"
+        }), 500
+
 @app.route("/api/rag/query", methods=["POST"])
 def query():
     """
@@ -76,49 +332,152 @@ def query():
     
     Request body:
         query: User query
-        top_k: (optional) Number of documents to retrieve
+        top_k: (optional) Number of documents to retrieve, or "auto" to choose it per query
+        collection: (optional) Collection to search
+        history: (optional) Earlier user turns of the conversation, oldest first
+        timeout_ms: (optional) Time the caller waits for the answer; once it has passed, the
+            best retrieved passage is returned instead, flagged "degraded"
     
     Returns:
-        JSON response with answer and sources
+        JSON response with answer, sources and the number of documents used (k)
     """
     try:
         # Parse request
         data = request.json
-        if not data or "query" not in data:
-            return jsonify({
-                "status": "error",
-                "message": "Missing required parameter: query"
-            }), 400
+        params, error = parse_query_request(data)
+        if error is not None:
+            return error
+        query, top_k, collection = params["query"], params["top_k"], params["collection"]
+        history = params["history"]
         
-        query = data["query"]
-        top_k = data.get("top_k", 3)
+        # The deadline counts from the arrival of the request, so indexing and retrieval use it up too
+        timeout_ms = params["timeout_ms"]
+        deadline = time.monotonic() + timeout_ms / 1000.0 if timeout_ms is not None else None
         
-        # Check if vector store exists, if not, index documents
-        vector_store_path = os.path.join(DATA_DIR, "vector_store.index")
-        if not os.path.exists(vector_store_path):
-            rag_engine.index_documents(DATA_DIR)
-            rag_engine.save_index(DATA_DIR)
-        else:
-            # Load existing index if not already loaded
-            if len(rag_engine.vector_store.documents) == 0:
-                rag_engine.load_index(DATA_DIR)
+        ensure_index(collection)
         
         # Answer question
-        response = rag_engine.answer_question(query, top_k=top_k)
+        response = rag_engine.answer_question(query, top_k=top_k, collection=collection, deadline=deadline,
+                                              history=history)
         
         return jsonify({
             "status": "success",
             "answer": response["answer"],
             "sources": response["sources"],
-            "has_context": response["has_context"]
+            "has_context": response["has_context"],
+            "cached": response.get("cached", False),
+            "extractive": response.get("extractive", False),
+            "degraded": response.get("degraded", False),
+            "k": response["k"]
         })
     
+    except IndexModelMismatchError as e:
+        return mismatch_response(e)
+    
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": f"Error processing query: {str(e)}"
         }), 500
 
+@app.route("/api/rag/query/stream", methods=["POST"])
+def query_stream():
+    """
+    Query the RAG system, streaming the answer as server-sent events.
+    
+    Request body:
+        query: User query
+        top_k: (optional) Number of documents to retrieve, or "auto" to choose it per query
+        collection: (optional) Collection to search
+        history: (optional) Earlier user turns of the conversation, oldest first
+    
+    Returns:
+        Event stream of JSON events: first {"type": "sources", ...} once retrieval is done,
+        then {"type": "token", "content": ...} per generated chunk, then [DONE]
+    """
+    params, error = parse_query_request(request.json)
+    if error is not None:
+        return error
+    query, top_k, collection = params["query"], params["top_k"], params["collection"]
+    history = params["history"]
+    
+    # Checked before streaming starts, so a mismatch is reported with its status code
+    try:
+        ensure_index(collection)
+    except IndexModelMismatchError as e:
+        return mismatch_response(e)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Error processing query: {str(e)}"
+        }), 500
+    
+    def generate():
+        try:
+            for event in rag_engine.stream_answer(query, top_k=top_k, collection=collection,
+                                                   history=history):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'message': f'Error processing query: {str(e)}'})}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    # Disable proxy buffering so each event is sent as soon as it is produced
+    return Response(stream_with_context(generate()), content_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/rag/migrate", methods=["GET", "POST"])
+def migrate():
+    """
+    Re-embed the index with a new embedding model in the background, or get the progress of the migration.
+    
+    Request body (POST):
+        embedding_model: Name of the new embedding model
+        use_openai: (optional) Whether it is an OpenAI embedding model
+        batch_size: (optional) Number of chunks re-embedded per batch
+    
+    Returns:
+        JSON response with the migration state, progress and throughput
+    """
+    if request.method == "GET":
+        return jsonify({"status": "ok", "migration": rag_engine.migration_status()})
+    
+    try:
+        data = request.json
+        if not data or "embedding_model" not in data:
+            return jsonify({
+                "status": "error",
+                "message": "Missing required parameter: embedding_model"
+            }), 400
+        
+        batch_size = data.get("batch_size", 256)
+        if isinstance(batch_size, bool) or not isinstance(batch_size, int) or batch_size < 1:
+            return jsonify({
+                "status": "error",
+                "message": "batch_size must be a positive integer"
+            }), 400
+        
+        # Make sure the index being migrated is loaded, with the model it was built with
+        if len(rag_engine.vector_store.documents) == 0 and os.path.exists(os.path.join(DATA_DIR, "vector_store.index")):
+            rag_engine.load_index(DATA_DIR, use_saved_model=True)
+        
+        migration = rag_engine.start_migration(
+            data["embedding_model"],
+            use_openai_embeddings=data.get("use_openai", False),
+            batch_size=batch_size,
+            save_directory=DATA_DIR
+        )
+        
+        return jsonify({"status": "started", "migration": migration.status()}), 202
+    
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Error starting migration: {str(e)}"
+        }), 500
+
 def create_app():
     """Create and configure the Flask app."""
     return app
@@ -0,0 +1,603 @@
+"""
+Benchmark script for the RAG system.
+
+This script measures the time and memory cost of individual RAG components.
+
+Usage:
+    python -m rag.benchmark memory --chunks 100000
+    python -m rag.benchmark batching --chunks 2000 --batch-sizes 8 32 128
+    python -m rag.benchmark onnx --quantize
+    python -m rag.benchmark workers --chunks 20000 --max-workers 8
+    python -m rag.benchmark query-load --clients 32 --requests 2000
+    python -m rag.benchmark reduction --dims 64 128 192 --index-dir rag/data
+    python -m rag.benchmark startup --runs 3
+    python -m rag.benchmark async-load --concurrency 8 32 128 --llm-latency-ms 500
+    python -m rag.benchmark compression --budgets 150 300 --top-k 5
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import faiss
+import numpy as np
+
+from rag.models.rag_engine import RAGEngine
+from rag.utils.dimension_reducer import DimensionReducer
+from rag.utils.document_processor import DocumentProcessor
+from rag.utils.embedding_manager import EmbeddingManager
+from rag.utils.query_batcher import QueryBatcher
+from rag.utils.token_counter import count_tokens
+from rag.utils.vector_store import VectorStore
+
+# Directory with the sample documents
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Minimum cosine similarity of ONNX embeddings to the torch embeddings of the same texts
+ONNX_MIN_SIMILARITY = 0.999
+ONNX_INT8_MIN_SIMILARITY = 0.98
+
+def cosine_similarities(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """
+    Get the cosine similarity of each row of `candidate` to the same row of `reference`.
+    
+    Args:
+        reference: Reference embeddings
+        candidate: Embeddings of the same texts by another backend
+    
+    Returns:
+        Similarity per row
+    """
+    return (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1))
+
+def measure(fn: Callable[[], None]) -> Tuple[float, float]:
+    """
+    Run a function once and measure it.
+    
+    Args:
+        fn: Function to run
+    
+    Returns:
+        Tuple of (elapsed seconds, peak traced memory in MB)
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+def benchmark_embedding_memory(num_chunks: int, dimension: int) -> None:
+    """
+    Compare the list-based and matrix-based embedding -> vector store paths.
+    
+    The encoder output is simulated with a random float32 matrix so that only the
+    conversion and indexing cost is measured.
+    
+    Args:
+        num_chunks: Number of document chunks
+        dimension: Embedding dimension
+    """
+    rng = np.random.default_rng(0)
+    encoder_output = rng.standard_normal((num_chunks, dimension), dtype=np.float32)
+    
+    def make_documents():
+        return [{"id": f"doc-{i}", "text": "", "metadata": {"chunk_id": i}} for i in range(num_chunks)]
+    
+    def list_path():
+        documents = make_documents()
+        embeddings = encoder_output.tolist()
+        for i, doc in enumerate(documents):
+            doc["embedding"] = embeddings[i]
+        VectorStore(dimension).add_documents(documents)
+    
+    def matrix_path():
+        documents = make_documents()
+        VectorStore(dimension).add_documents(documents, embeddings=encoder_output)
+    
+    print(f"Embedding -> vector store path ({num_chunks} chunks, dimension {dimension})")
+    for name, fn in [("python lists", list_path), ("float32 matrix", matrix_path)]:
+        elapsed, peak_mb = measure(fn)
+        print(f"  {name:<16} {elapsed:8.3f} s   peak {peak_mb:10.1f} MB")
+
+def load_sample_texts(num_chunks: int) -> List[str]:
+    """
+    Load chunk texts from the sample documents, repeated up to `num_chunks`.
+    
+    Args:
+        num_chunks: Number of texts to return
+    
+    Returns:
+        List of chunk texts
+    """
+    chunks = DocumentProcessor().load_documents_from_directory(DATA_DIR)
+    texts = [chunk["text"] for chunk in chunks]
+    # Vary the lengths so that padding matters
+    texts += [text[:len(text) // 3] for text in texts]
+    return [texts[i % len(texts)] for i in range(num_chunks)]
+
+def benchmark_batching(num_chunks: int, batch_sizes: List[int], model_name: str) -> None:
+    """
+    Measure local encoder throughput at several batch sizes, with and without length sorting.
+    
+    Args:
+        num_chunks: Number of chunks to embed per run
+        batch_sizes: Batch sizes to try
+        model_name: Sentence Transformers model name
+    """
+    texts = load_sample_texts(num_chunks)
+    manager = EmbeddingManager(model_name=model_name, query_cache_size=0)
+    manager.generate_embeddings(texts[:manager.batch_size])  # warm-up
+    
+    print(f"Local encoder throughput ({num_chunks} chunks, {model_name})")
+    for batch_size in batch_sizes:
+        for sort_by_length in (False, True):
+            manager.batch_size = batch_size
+            manager.sort_by_length = sort_by_length
+            start_time = time.perf_counter()
+            manager.generate_embeddings(texts)
+            elapsed = time.perf_counter() - start_time
+            label = "sorted" if sort_by_length else "unsorted"
+            print(f"  batch {batch_size:>4} {label:<9} {num_chunks / elapsed:10.1f} chunks/s")
+
+def benchmark_onnx(num_chunks: int, model_name: str, quantize: bool, min_similarity: float) -> bool:
+    """
+    Check ONNX backend parity with the torch backend and compare throughput and latency.
+    
+    Args:
+        num_chunks: Number of chunks to embed
+        model_name: Sentence Transformers model name
+        quantize: Whether to use the int8-quantized ONNX model
+        min_similarity: Minimum cosine similarity required against the torch embeddings
+    
+    Returns:
+        True if every embedding meets `min_similarity`
+    """
+    texts = load_sample_texts(num_chunks)
+    queries = [text[:80] for text in texts[:50]]
+    managers = [
+        ("torch", EmbeddingManager(model_name=model_name, query_cache_size=0)),
+        ("onnx-int8" if quantize else "onnx", EmbeddingManager(model_name=model_name, query_cache_size=0,
+                                                               backend="onnx", onnx_quantize=quantize))
+    ]
+    
+    print(f"Embedding backends ({num_chunks} chunks, {len(queries)} single queries, {model_name})")
+    outputs = []
+    for name, manager in managers:
+        manager.generate_embeddings(texts[:manager.batch_size])  # warm-up
+        
+        start_time = time.perf_counter()
+        embeddings = manager.generate_embeddings(texts)
+        elapsed = time.perf_counter() - start_time
+        outputs.append(embeddings)
+        
+        latencies = []
+        for query in queries:
+            query_start = time.perf_counter()
+            manager.generate_query_embedding(query)
+            latencies.append((time.perf_counter() - query_start) * 1000)
+        
+        print(f"  {name:<10} {num_chunks / elapsed:10.1f} chunks/s   "
+              f"query p50 {np.percentile(latencies, 50):6.2f} ms   p99 {np.percentile(latencies, 99):6.2f} ms")
+    
+    reference, candidate = outputs
+    similarity = cosine_similarities(reference, candidate)
+    passed = bool(similarity.min() >= min_similarity)
+    print(f"  parity: min cosine {similarity.min():.5f}, mean {similarity.mean():.5f} "
+          f"(threshold {min_similarity}) -> {'PASS' if passed else 'FAIL'}")
+    return passed
+
+def benchmark_workers(num_chunks: int, max_workers: int, model_name: str) -> None:
+    """
+    Measure scaling efficiency of the embedding worker pool from 1 to `max_workers` processes.
+    
+    Args:
+        num_chunks: Number of chunks to embed per run
+        max_workers: Largest number of worker processes to try
+        model_name: Sentence Transformers model name
+    """
+    texts = load_sample_texts(num_chunks)
+    
+    print(f"Embedding worker pool scaling ({num_chunks} chunks, {model_name})")
+    baseline = None
+    num_workers = 1
+    while num_workers <= max_workers:
+        manager = EmbeddingManager(model_name=model_name, query_cache_size=0,
+                                   num_workers=num_workers, pool_min_texts=1)
+        manager.generate_embeddings(texts[:num_workers * 256])  # start the pool and warm up
+        
+        start_time = time.perf_counter()
+        manager.generate_embeddings(texts)
+        elapsed = time.perf_counter() - start_time
+        manager.close()
+        
+        throughput = num_chunks / elapsed
+        baseline = baseline or throughput
+        speedup = throughput / baseline
+        print(f"  {num_workers:>3} workers {throughput:10.1f} chunks/s   "
+              f"speedup {speedup:5.2f}x   efficiency {speedup / num_workers:6.1%}")
+        num_workers *= 2
+
+def build_sample_store(manager: EmbeddingManager) -> VectorStore:
+    """
+    Index the sample documents into a new vector store.
+    
+    Args:
+        manager: Embedding manager used to embed the chunks
+    
+    Returns:
+        Vector store with the sample chunks
+    """
+    chunks = DocumentProcessor().load_documents_from_directory(DATA_DIR)
+    embeddings = manager.embed_documents(chunks)
+    store = VectorStore(dimension=embeddings.shape[1])
+    store.add_documents(chunks, embeddings=embeddings)
+    return store
+
+def run_load(handler: Callable[[str], object], queries: List[str], clients: int) -> Tuple[float, List[float]]:
+    """
+    Send queries from concurrent client threads.
+    
+    Args:
+        handler: Function handling one query
+        queries: Queries to send
+        clients: Number of concurrent client threads
+    
+    Returns:
+        Tuple of (total seconds, per-request latencies in ms)
+    """
+    def timed(query):
+        start_time = time.perf_counter()
+        handler(query)
+        return (time.perf_counter() - start_time) * 1000
+    
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = list(executor.map(timed, queries))
+    return time.perf_counter() - start_time, latencies
+
+def print_load(name: str, elapsed: float, latencies: List[float]) -> None:
+    """Print throughput and latency percentiles of a load run."""
+    print(f"  {name:<20} {len(latencies) / elapsed:9.1f} req/s   "
+          f"p50 {np.percentile(latencies, 50):8.2f} ms   p99 {np.percentile(latencies, 99):8.2f} ms")
+
+def benchmark_query_load(num_requests: int, clients: int, max_wait_ms: float, model_name: str) -> None:
+    """
+    Compare query embedding + search under concurrent load with and without micro-batching.
+    
+    Args:
+        num_requests: Total number of queries
+        clients: Number of concurrent client threads
+        max_wait_ms: Maximum batching delay
+        model_name: Sentence Transformers model name
+    """
+    # The query cache is disabled so every request reaches the encoder
+    manager = EmbeddingManager(model_name=model_name, query_cache_size=0)
+    store = build_sample_store(manager)
+    queries = [f"question {i}: {text[:60]}" for i, text in enumerate(load_sample_texts(num_requests))]
+    
+    print(f"Query load ({num_requests} requests, {clients} clients, {model_name})")
+    
+    elapsed, latencies = run_load(
+        lambda query: store.search(manager.generate_query_embedding(query), top_k=3), queries, clients)
+    print_load("unbatched", elapsed, latencies)
+    
+    batcher = QueryBatcher(manager.generate_query_embeddings, max_wait_ms=max_wait_ms)
+    elapsed, latencies = run_load(lambda query: store.search(batcher.embed(query), top_k=3), queries, clients)
+    print_load("batched embedding", elapsed, latencies)
+    print(f"    mean batch size {batcher.stats()['mean_batch_size']:.1f}")
+    batcher.close()
+    
+    batcher = QueryBatcher(manager.generate_query_embeddings, search_fn=store.search_batch, max_wait_ms=max_wait_ms)
+    elapsed, latencies = run_load(lambda query: batcher.search(query, 3), queries, clients)
+    print_load("batched + search", elapsed, latencies)
+    batcher.close()
+
+def benchmark_reduction(target_dims: List[int], top_k: int, index_dir: str, num_vectors: int,
+                        dimension: int, num_queries: int) -> None:
+    """
+    Report recall@k, index memory and search latency of reduced-dimension indexes.
+    
+    Vectors come from a saved vector store if `index_dir` is given, otherwise from a
+    synthetic low-rank distribution. Queries are held-out vectors; recall@k is the overlap
+    with the exact full-dimension top k.
+    
+    Args:
+        target_dims: Reduced dimensions to evaluate
+        top_k: k for recall@k
+        index_dir: Directory of a saved vector store, or None for synthetic vectors
+        num_vectors: Number of synthetic vectors
+        dimension: Dimension of synthetic vectors
+        num_queries: Number of held-out query vectors
+    """
+    rng = np.random.default_rng(0)
+    if index_dir:
+        store = VectorStore.load(index_dir)
+        vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    else:
+        latent = rng.standard_normal((num_vectors + num_queries, dimension // 8), dtype=np.float32)
+        mixing = rng.standard_normal((dimension // 8, dimension), dtype=np.float32)
+        vectors = latent @ mixing + 0.1 * rng.standard_normal((num_vectors + num_queries, dimension), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    
+    num_queries = min(num_queries, len(vectors) // 2)
+    queries, corpus = vectors[:num_queries], vectors[num_queries:]
+    k = min(top_k, len(corpus))
+    
+    def evaluate(index, corpus_matrix, query_matrix):
+        index.add(corpus_matrix)
+        start_time = time.perf_counter()
+        _, ids = index.search(query_matrix, k)
+        latency = (time.perf_counter() - start_time) * 1000 / len(query_matrix)
+        return ids, latency
+    
+    exact_ids, full_latency = evaluate(faiss.IndexFlatL2(corpus.shape[1]), corpus, queries)
+    
+    print(f"Dimension reduction ({len(corpus)} vectors, {len(queries)} queries, recall@{k})")
+    print(f"  {'full':<14} dim {corpus.shape[1]:>5}   recall 1.000   "
+          f"{corpus.nbytes / 1024 / 1024:8.2f} MB   {full_latency:7.3f} ms/query")
+    
+    for method in DimensionReducer.METHODS:
+        for target_dim in target_dims:
+            if target_dim >= corpus.shape[1]:
+                continue
+            reducer = DimensionReducer(target_dim, method=method).fit(corpus)
+            corpus_matrix = reducer.transform(corpus)
+            ids, latency = evaluate(faiss.IndexFlatL2(target_dim), corpus_matrix, reducer.transform(queries))
+            recall = np.mean([len(set(ids[i]) & set(exact_ids[i])) / k for i in range(len(queries))])
+            print(f"  {method:<14} dim {target_dim:>5}   recall {recall:.3f}   "
+                  f"{corpus_matrix.nbytes / 1024 / 1024:8.2f} MB   {latency:7.3f} ms/query")
+
+STARTUP_SCRIPT = """
+import time
+start_time = time.perf_counter()
+from rag.api import rag_engine
+imported = time.perf_counter() - start_time
+rag_engine.wait_until_ready()
+ready = time.perf_counter() - start_time
+query_start = time.perf_counter()
+rag_engine.embedding_manager.generate_query_embedding("first query after startup")
+first_query = time.perf_counter() - query_start
+print(imported, ready, first_query)
+"""
+
+def benchmark_startup(runs: int, warmup_batch_size: int) -> None:
+    """
+    Measure RAG API cold start in fresh interpreters: time until the app is importable
+    (serving health checks), time until models are ready, and first query embedding latency.
+    
+    Args:
+        runs: Number of cold starts
+        warmup_batch_size: Warm-up batch size passed to the API (0 disables warm-up)
+    """
+    env = dict(os.environ, RAG_PRELOAD="1", RAG_WARMUP_BATCH=str(warmup_batch_size))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    
+    print(f"RAG API cold start ({runs} runs, warm-up batch {warmup_batch_size})")
+    for run in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=root, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        imported, ready, first_query = (float(value) for value in output.strip().splitlines()[-1].split())
+        print(f"  run {run + 1}: serving after {imported:6.2f} s   ready after {ready:6.2f} s   "
+              f"first query {first_query * 1000:8.2f} ms")
+
+class SimulatedLLMChain:
+    """Stand-in for the generation chain that only waits, like an LLM call would."""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+    
+    def invoke(self, inputs):
+        time.sleep(self.latency)
+        return f"Answer to: {inputs['query']}"
+    
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.latency)
+        return f"Answer to: {inputs['query']}"
+
+def peak_threads(fn: Callable[[], object]) -> Tuple[float, int]:
+    """
+    Run a function while sampling the number of live threads.
+    
+    Args:
+        fn: Function to run
+    
+    Returns:
+        Tuple of (seconds, peak number of threads)
+    """
+    peak = threading.active_count()
+    done = threading.Event()
+    
+    def sample():
+        nonlocal peak
+        while not done.wait(0.005):
+            peak = max(peak, threading.active_count())
+    
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start_time = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start_time
+    done.set()
+    sampler.join()
+    # The sampler itself is not part of the workload
+    return elapsed, peak - 1
+
+def benchmark_async_load(concurrency_levels: List[int], requests_per_level: int, llm_latency_ms: float,
+                         model_name: str) -> None:
+    """
+    Compare threaded answer_question with aanswer_question on one event loop as concurrency grows.
+    
+    The LLM is simulated with a fixed latency so the numbers show how each API
+    scales with concurrent slow calls rather than OpenAI throughput.
+    
+    Args:
+        concurrency_levels: Numbers of concurrent clients to test
+        requests_per_level: Number of questions sent at each level
+        llm_latency_ms: Simulated LLM latency
+        model_name: Sentence Transformers model name
+    """
+    engine = RAGEngine(embedding_model_name=model_name)
+    engine.vector_store = build_sample_store(engine.embedding_manager)
+    engine._generation_chain = SimulatedLLMChain(llm_latency_ms / 1000.0)
+    queries = [f"question {i}: {text[:60]}" for i, text in enumerate(load_sample_texts(requests_per_level))]
+    
+    print(f"Async load ({requests_per_level} requests per level, simulated LLM {llm_latency_ms:.0f} ms, {model_name})")
+    for concurrency in concurrency_levels:
+        elapsed, threads = peak_threads(lambda: run_load(engine.answer_question, queries, concurrency))
+        print(f"  {concurrency:>4} clients   threaded {len(queries) / elapsed:9.1f} req/s   peak threads {threads:4d}")
+        
+        async def run_async():
+            semaphore = asyncio.Semaphore(concurrency)
+            
+            async def ask(query):
+                async with semaphore:
+                    await engine.aanswer_question(query)
+            
+            await asyncio.gather(*(ask(query) for query in queries))
+        
+        elapsed, threads = peak_threads(lambda: asyncio.run(run_async()))
+        print(f"  {concurrency:>4} clients   async    {len(queries) / elapsed:9.1f} req/s   peak threads {threads:4d}")
+
+def benchmark_compression(budgets: List[int], top_k: int, num_queries: int, queries_file: str,
+                          model_name: str) -> None:
+    """
+    Compare prompt tokens and answer latency with and without context compression.
+    
+    Answers are generated with the configured LLM when OPENAI_API_KEY is set; otherwise
+    only the context build time (retrieval + compression) is measured.
+    
+    Args:
+        budgets: Compression token budgets to test
+        top_k: Number of chunks retrieved per question
+        num_queries: Number of questions taken from the sample documents if no file is given
+        queries_file: File with one question per line
+        model_name: Sentence Transformers model name
+    """
+    engine = RAGEngine(embedding_model_name=model_name)
+    engine.vector_store = build_sample_store(engine.embedding_manager)
+    
+    if queries_file:
+        with open(queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        # The opening words of sample chunks stand in for questions about them
+        queries = [" ".join(text.split()[:12]) for text in load_sample_texts(num_queries)]
+    use_llm = bool(os.getenv("OPENAI_API_KEY"))
+    
+    print(f"Context compression ({len(queries)} questions, top {top_k}, {model_name}"
+          f"{'' if use_llm else ', no OPENAI_API_KEY: LLM skipped'})")
+    baseline_tokens = None
+    for budget in [None] + budgets:
+        engine.compression_max_tokens = budget
+        prompt_tokens = []
+        latencies = []
+        for query in queries:
+            start_time = time.perf_counter()
+            results = engine.retrieve(query, top_k=top_k)
+            context = engine.format_context(results, query)
+            if use_llm:
+                engine.generation_chain.invoke({"context": context, "query": query})
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            prompt_tokens.append(count_tokens(context, engine.llm_model_name) + count_tokens(query, engine.llm_model_name))
+        
+        mean_tokens = float(np.mean(prompt_tokens))
+        baseline_tokens = baseline_tokens or mean_tokens
+        name = "uncompressed" if budget is None else f"budget {budget}"
+        print(f"  {name:<14} prompt tokens {mean_tokens:8.1f} ({1 - mean_tokens / baseline_tokens:6.1%} saved)   "
+              f"{'answer' if use_llm else 'context'} p50 {np.percentile(latencies, 50):8.2f} ms   "
+              f"p99 {np.percentile(latencies, 99):8.2f} ms")
+
+def main():
+    """Main function to run the benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark RAG components")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    memory_parser = subparsers.add_parser("memory", help="Embedding -> vector store time and peak memory")
+    memory_parser.add_argument("--chunks", type=int, default=100000)
+    memory_parser.add_argument("--dimension", type=int, default=384)
+    
+    batching_parser = subparsers.add_parser("batching", help="Local encoder chunks/sec at several batch sizes")
+    batching_parser.add_argument("--chunks", type=int, default=2000)
+    batching_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+    batching_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    
+    onnx_parser = subparsers.add_parser("onnx", help="ONNX backend parity and throughput against torch")
+    onnx_parser.add_argument("--chunks", type=int, default=1000)
+    onnx_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    onnx_parser.add_argument("--quantize", action="store_true")
+    onnx_parser.add_argument("--min-similarity", type=float, default=None,
+                             help="Parity threshold (default 0.999, or 0.98 with --quantize)")
+    
+    workers_parser = subparsers.add_parser("workers", help="Embedding worker pool scaling from 1 to N processes")
+    workers_parser.add_argument("--chunks", type=int, default=20000)
+    workers_parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    workers_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    
+    load_parser = subparsers.add_parser("query-load", help="Concurrent query latency with and without micro-batching")
+    load_parser.add_argument("--requests", type=int, default=2000)
+    load_parser.add_argument("--clients", type=int, default=32)
+    load_parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    load_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    
+    reduction_parser = subparsers.add_parser("reduction", help="Recall@k, memory and latency of reduced dimensions")
+    reduction_parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 128, 192, 256])
+    reduction_parser.add_argument("--top-k", type=int, default=10)
+    reduction_parser.add_argument("--index-dir", default=None, help="Saved vector store to take vectors from")
+    reduction_parser.add_argument("--vectors", type=int, default=100000)
+    reduction_parser.add_argument("--dimension", type=int, default=384)
+    reduction_parser.add_argument("--queries", type=int, default=1000)
+    
+    startup_parser = subparsers.add_parser("startup", help="RAG API cold start and time to ready")
+    startup_parser.add_argument("--runs", type=int, default=3)
+    startup_parser.add_argument("--warmup-batch", type=int, default=8)
+    
+    async_parser = subparsers.add_parser("async-load", help="Threaded vs async answer_question under concurrency")
+    async_parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    async_parser.add_argument("--requests", type=int, default=256)
+    async_parser.add_argument("--llm-latency-ms", type=float, default=500.0)
+    async_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    
+    compression_parser = subparsers.add_parser("compression", help="Prompt tokens and answer latency with context compression")
+    compression_parser.add_argument("--budgets", type=int, nargs="+", default=[150, 300, 600])
+    compression_parser.add_argument("--top-k", type=int, default=5)
+    compression_parser.add_argument("--queries", type=int, default=50)
+    compression_parser.add_argument("--queries-file", default=None, help="File with one question per line")
+    compression_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    
+    args = parser.parse_args()
+    
+    if args.benchmark == "memory":
+        benchmark_embedding_memory(args.chunks, args.dimension)
+    elif args.benchmark == "batching":
+        benchmark_batching(args.chunks, args.batch_sizes, args.model)
+    elif args.benchmark == "onnx":
+        min_similarity = args.min_similarity
+        if min_similarity is None:
+            min_similarity = ONNX_INT8_MIN_SIMILARITY if args.quantize else ONNX_MIN_SIMILARITY
+        if not benchmark_onnx(args.chunks, args.model, args.quantize, min_similarity):
+            sys.exit(1)
+    elif args.benchmark == "workers":
+        benchmark_workers(args.chunks, args.max_workers, args.model)
+    elif args.benchmark == "query-load":
+        benchmark_query_load(args.requests, args.clients, args.max_wait_ms, args.model)
+    elif args.benchmark == "reduction":
+        benchmark_reduction(args.dims, args.top_k, args.index_dir, args.vectors, args.dimension, args.queries)
+    elif args.benchmark == "startup":
+        benchmark_startup(args.runs, args.warmup_batch)
+    elif args.benchmark == "async-load":
+        benchmark_async_load(args.concurrency, args.requests, args.llm_latency_ms, args.model)
+    elif args.benchmark == "compression":
+        benchmark_compression(args.budgets, args.top_k, args.queries, args.queries_file, args.model)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
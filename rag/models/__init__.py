@@ -2,6 +2,7 @@
 Model modules for the RAG system.
 """
 
+from .index_migration import IndexMigration
 from .rag_engine import RAGEngine
 
-__all__ = ['RAGEngine'] 
\ No newline at end of file
+__all__ = ['IndexMigration', 'RAGEngine']
\ No newline at end of file
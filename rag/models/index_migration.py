@@ -0,0 +1,147 @@
+"""
+Index Migration Module
+
+This module re-embeds an existing index with a new embedding model in the
+background while queries keep using the old index, then cuts over atomically.
+"""
+
+import time
+import threading
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from ..utils.embedding_manager import EmbeddingManager
+from ..utils.vector_store import VectorStore
+
+if TYPE_CHECKING:
+    from .rag_engine import RAGEngine
+
+class IndexMigration:
+    """Background re-embedding of a RAGEngine's documents with a new embedding model."""
+    
+    def __init__(self, engine: 'RAGEngine', embedding_manager: EmbeddingManager,
+                 batch_size: int = 256, save_directory: Optional[str] = None, save_name: str = "vector_store"):
+        """
+        Initialize the IndexMigration.
+        
+        Args:
+            engine: Engine whose index is migrated
+            embedding_manager: Embedding manager of the new model
+            batch_size: Number of documents re-embedded per batch
+            save_directory: Directory the new index is saved to after cut-over (not saved if None)
+            save_name: Base name of the saved index files
+        """
+        if isinstance(batch_size, bool) or not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError(f"batch_size must be a positive integer, got {batch_size!r}")
+        
+        self.engine = engine
+        self.embedding_manager = embedding_manager
+        self.batch_size = batch_size
+        self.save_directory = save_directory
+        self.save_name = save_name
+        
+        self.state = "pending"
+        self.error = None
+        self.total = 0
+        self.done = 0
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+    
+    def start(self) -> None:
+        """Start the migration in a background thread."""
+        self.state = "running"
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="index-migration", daemon=True)
+        self._thread.start()
+    
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for the migration to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait (forever if None)
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _run(self) -> None:
+        """Re-embed all documents, catch up on documents added meanwhile, then cut over."""
+        try:
+            new_store = self.engine._new_vector_store(self.embedding_manager)
+            
+            # Documents are only ever appended, so re-embed until the new store has caught up
+            while True:
+                documents = self.engine.vector_store.documents
+                self.total = len(documents)
+                if len(new_store.documents) >= self.total:
+                    break
+                self._embed_range(new_store, documents, len(new_store.documents), self.total)
+            
+            self.state = "cutting_over"
+            with self.engine._swap_lock.write():
+                # Pick up anything indexed between the last pass and taking the lock
+                documents = self.engine.vector_store.documents
+                self.total = len(documents)
+                self._embed_range(new_store, documents, len(new_store.documents), self.total)
+                
+                old_manager = self.engine.embedding_manager
+                self.engine.embedding_manager = self.embedding_manager
+                self.engine.vector_store = new_store
+            old_manager.close()
+            
+            if self.save_directory:
+                self.engine.save_index(self.save_directory, self.save_name)
+            
+            self.state = "completed"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"Error migrating index: {str(e)}")
+        finally:
+            self.finished_at = time.time()
+    
+    def _embed_range(self, new_store: VectorStore, documents, start: int, end: int) -> None:
+        """
+        Embed documents[start:end] with the new model into the new store.
+        
+        A dimension reducer that is not fitted yet is fitted once on the embeddings of the
+        whole range, as at index time, before any batch is added; fitting it on the first
+        batch alone would bias the projection towards the first documents.
+        """
+        fit_reducer = new_store.reducer is not None and not new_store.reducer.is_fitted
+        embedded = []
+        for batch_start in range(start, end, self.batch_size):
+            batch = documents[batch_start:min(batch_start + self.batch_size, end)]
+            embeddings = self.embedding_manager.embed_documents(batch)
+            if fit_reducer:
+                embedded.append((batch, embeddings))
+            else:
+                new_store.add_documents(batch, embeddings=embeddings)
+            self.done = batch_start + len(batch)
+        
+        if embedded:
+            new_store.reducer.fit(np.vstack([embeddings for _, embeddings in embedded]))
+            for batch, embeddings in embedded:
+                new_store.add_documents(batch, embeddings=embeddings)
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Get migration progress.
+        
+        Returns:
+            Dictionary with state, target model, progress and throughput
+        """
+        end_time = self.finished_at or time.time()
+        elapsed = end_time - self.started_at if self.started_at else 0.0
+        return {
+            "state": self.state,
+            "model": self.embedding_manager.model_id,
+            "total": self.total,
+            "done": self.done,
+            "progress": self.done / self.total if self.total else 0.0,
+            "elapsed_seconds": elapsed,
+            "docs_per_second": self.done / elapsed if elapsed > 0 else 0.0,
+            "error": self.error
+        }
\ No newline at end of file
@@ -5,14 +5,40 @@ This module combines document processing, embedding, and retrieval with LLM gene
 """
 
 import os
-from typing import List, Dict, Any, Optional, Union
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
+import time
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional, Tuple, Union
 
+import numpy as np
+
+from ..utils.adaptive_k import choose_k
+from ..utils.answer_cache import SemanticAnswerCache
+from ..utils.answer_gate import is_lookup_question
+from ..utils.context_compressor import compress_passages
+from ..utils.context_packer import chunk_tokens, merge_chunks, pack_context
+from ..utils.conversation import combine_turn_embeddings
 from ..utils.document_processor import DocumentProcessor
-from ..utils.embedding_manager import EmbeddingManager
+from ..utils.dimension_reducer import DimensionReducer
+from ..utils.embedding_manager import OPENAI_EMBEDDING_DIMENSIONS, EmbeddingManager
+from ..utils.model_registry import EmbeddingModelRegistry
+from ..utils.concurrency import ReadWriteLock
+from ..utils.query_batcher import QueryBatcher
+from ..utils.retrieval_cache import RetrievalCache
 from ..utils.vector_store import VectorStore
+from .index_migration import IndexMigration
+
+# Answer returned when retrieval finds nothing
+NO_CONTEXT_ANSWER = "I don't have enough information to answer this question."
+
+# Ways a question can be answered, reported by answer_path_stats
+ANSWER_PATHS = ("llm", "extractive", "low_confidence", "no_results", "cached", "deadline_exceeded")
+
+# Answer paths that never call the LLM (a deadline_exceeded answer did call it, and gave up)
+LLM_SKIP_PATHS = ("extractive", "low_confidence", "no_results", "cached")
 
 class RAGEngine:
     """Class for performing Retrieval-Augmented Generation."""
@@ -23,7 +49,45 @@ class RAGEngine:
                  llm_model_name: str = "gpt-3.5-turbo",
                  temperature: float = 0.7,
                  chunk_size: int = 500,
-                 chunk_overlap: int = 50):
+                 chunk_overlap: int = 50,
+                 embedding_cache_path: Optional[str] = None,
+                 embedding_batch_size: int = 32,
+                 embedding_max_batch_tokens: Optional[int] = None,
+                 embedding_backend: str = "torch",
+                 onnx_quantize: bool = False,
+                 embedding_workers: int = 0,
+                 query_batching: bool = False,
+                 query_batch_size: int = 32,
+                 query_batch_wait_ms: float = 5.0,
+                 batch_search: bool = False,
+                 openai_embedding_concurrency: int = 4,
+                 openai_embedding_tpm: int = 1000000,
+                 openai_embedding_checkpoint_dir: Optional[str] = None,
+                 reduced_dimension: Optional[int] = None,
+                 dimension_reduction: str = "pca",
+                 model_cache_folder: Optional[str] = None,
+                 offline: bool = False,
+                 embedding_memory_budget_mb: Optional[float] = None,
+                 executor_workers: int = 4,
+                 answer_cache_size: int = 0,
+                 answer_cache_threshold: float = 0.95,
+                 answer_cache_allow_sampling: bool = False,
+                 retrieval_cache_size: int = 0,
+                 context_max_tokens: Optional[int] = None,
+                 compression_max_tokens: Optional[int] = None,
+                 adaptive_min_k: int = 1,
+                 adaptive_max_k: int = 10,
+                 adaptive_min_score: Optional[float] = None,
+                 adaptive_min_gap: float = 0.05,
+                 min_answer_score: Optional[float] = None,
+                 extractive_min_score: Optional[float] = None,
+                 mmr_lambda: Optional[float] = None,
+                 mmr_fetch_k: int = 20,
+                 max_chunks_per_source: Optional[int] = None,
+                 neighbour_window: int = 0,
+                 neighbour_max_tokens: Optional[int] = 400,
+                 history_turns: int = 3,
+                 history_decay: float = 0.5):
         """
         Initialize the RAG Engine.
         
@@ -34,49 +98,355 @@ class RAGEngine:
             temperature: Temperature for LLM generation
             chunk_size: Size of document chunks
             chunk_overlap: Overlap between chunks
+            embedding_cache_path: Path of an on-disk embedding cache (disabled if None)
+            embedding_batch_size: Maximum number of chunks per embedding batch
+            embedding_max_batch_tokens: Maximum padded tokens per embedding batch (unbounded if None)
+            embedding_backend: Local embedding backend, "torch" or "onnx"
+            onnx_quantize: Whether the ONNX backend uses int8 dynamic quantization
+            embedding_workers: Number of worker processes used to embed large indexing jobs (disabled if 0)
+            query_batching: Whether concurrent queries are embedded together in micro-batches
+            query_batch_size: Maximum number of queries per micro-batch
+            query_batch_wait_ms: Maximum time a query waits for a micro-batch to fill
+            batch_search: Whether vector searches are batched along with the query embeddings
+            openai_embedding_concurrency: Maximum number of OpenAI embedding requests in flight
+            openai_embedding_tpm: Tokens-per-minute budget for OpenAI embedding requests
+            openai_embedding_checkpoint_dir: Directory for resumable OpenAI embedding checkpoints
+            reduced_dimension: Dimension embeddings are reduced to before indexing (full dimension if None)
+            dimension_reduction: Reduction method, "pca" (learned at index time) or "truncate"
+            model_cache_folder: Local directory where embedding model weights are cached
+            offline: Only load embedding model weights from the local cache
+            embedding_memory_budget_mb: Memory budget of the loaded embedding models, beyond which
+                the least recently used ones are unloaded (unbounded if None)
+            executor_workers: Number of threads running embedding and search for the async API
+                (this also bounds how many async queries are micro-batched together)
+            answer_cache_size: Maximum number of cached answers per collection (disabled if 0)
+            answer_cache_threshold: Minimum query similarity for a cached answer to be served
+            answer_cache_allow_sampling: Use the answer cache even when temperature is not 0
+            retrieval_cache_size: Maximum number of cached retrieval results (disabled if 0)
+            context_max_tokens: Token budget of the LLM context; retrieved chunks are packed into it by
+                score and adjacent chunks merged (every retrieved chunk is used if None)
+            compression_max_tokens: Token budget of the sentences kept from the context, chosen by
+                similarity to the query (no compression if None)
+            adaptive_min_k: Fewest chunks kept when top_k is chosen adaptively (top_k=None)
+            adaptive_max_k: Most chunks kept when top_k is chosen adaptively
+            adaptive_min_score: Score threshold, calibrated for the embedding model, below which
+                chunks are dropped; if set, adaptive retrieval uses a range search
+            adaptive_min_gap: Smallest score drop between consecutive chunks where adaptive
+                retrieval cuts the ranking
+            min_answer_score: Best retrieval score below which the no-context answer is returned
+                without calling the LLM (always call it if None)
+            extractive_min_score: Best retrieval score from which lookup-style questions are answered
+                with the best passage as is, without calling the LLM (disabled if None)
+            mmr_lambda: Relevance/diversity trade-off of MMR re-ranking, from 1.0 (relevance only)
+                to 0.0 (diversity only); no MMR if None
+            mmr_fetch_k: Number of nearest chunks re-ranked for diversity
+            max_chunks_per_source: Maximum number of retrieved chunks from the same source file
+                (unbounded if None)
+            neighbour_window: Number of chunks before and after each hit merged into its passage
+                (disabled if 0)
+            neighbour_max_tokens: Token budget of the merged neighbour chunks (unbounded if None)
+            history_turns: Number of earlier conversation turns blended into the retrieval query
+            history_decay: Weight of each earlier turn relative to the turn after it
+        
+        Models are loaded on first use, or up front with `load` / `start_background_load`.
         """
         self.document_processor = DocumentProcessor(
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+            chunk_overlap=chunk_overlap,
+            token_model=llm_model_name
         )
         
-        self.embedding_manager = EmbeddingManager(
+        # Settings shared by the embedding manager of every model (see add_collection and start_migration)
+        self._embedding_kwargs = {
+            "cache_path": embedding_cache_path,
+            "batch_size": embedding_batch_size,
+            "max_batch_tokens": embedding_max_batch_tokens,
+            "backend": embedding_backend,
+            "onnx_quantize": onnx_quantize,
+            "num_workers": embedding_workers,
+            "openai_max_concurrency": openai_embedding_concurrency,
+            "openai_tokens_per_minute": openai_embedding_tpm,
+            "openai_checkpoint_dir": openai_embedding_checkpoint_dir,
+            "model_cache_folder": model_cache_folder,
+            "offline": offline
+        }
+        self.model_registry = EmbeddingModelRegistry(embedding_memory_budget_mb, **self._embedding_kwargs)
+        self.embedding_manager = self.model_registry.register(EmbeddingManager(
             use_openai=use_openai_embeddings,
-            model_name=embedding_model_name
-        )
+            model_name=embedding_model_name,
+            **self._embedding_kwargs
+        ))
         
-        # Determine embedding dimension based on model
-        if use_openai_embeddings:
-            self.embedding_dim = 1536  # OpenAI ada-002 dimension
-        else:
-            # For sentence-transformers, dimension depends on model
-            # all-MiniLM-L6-v2 has 384 dimensions
-            self.embedding_dim = 384
+        # Additional collections, each with its own embedding model and vector store
+        self.collections = {}
         
-        self.vector_store = VectorStore(dimension=self.embedding_dim)
+        self.reduced_dimension = reduced_dimension
+        self.dimension_reduction = dimension_reduction
+        self._vector_store = None
         
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            model_name=llm_model_name,
-            temperature=temperature
-        )
+        self.llm_model_name = llm_model_name
+        self.temperature = temperature
+        self.context_max_tokens = context_max_tokens
+        self.compression_max_tokens = compression_max_tokens
+        
+        # Bounds and cut-offs of adaptive retrieval
+        self.adaptive_min_k = adaptive_min_k
+        self.adaptive_max_k = adaptive_max_k
+        self.adaptive_min_score = adaptive_min_score
+        self.adaptive_min_gap = adaptive_min_gap
+        
+        # Confidence gate and extractive fast path
+        self.min_answer_score = min_answer_score
+        self.extractive_min_score = extractive_min_score
+        self._path_stats = {path: {"requests": 0, "seconds": 0.0} for path in ANSWER_PATHS}
+        self._stats_lock = threading.Lock()
+        
+        # Diversity of the retrieved chunks
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch_k = mmr_fetch_k
+        self.max_chunks_per_source = max_chunks_per_source
+        
+        # Expansion of hits with their neighbouring chunks
+        self.neighbour_window = neighbour_window
+        self.neighbour_max_tokens = neighbour_max_tokens
+        
+        # Conversation-aware retrieval
+        self.history_turns = history_turns
+        self.history_decay = history_decay
+        self._llm = None
+        self._generation_chain = None
+        
+        # Readiness state of the models
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._load_thread = None
+        self.state = "not_loaded"
+        self.load_error = None
+        self.load_seconds = None
+        
+        # Retrievals hold the read side so a migration cut-over never pairs
+        # one model's query embeddings with another model's index
+        self._swap_lock = ReadWriteLock()
+        self.migration = None
+        
+        # Answers of past questions, per collection (None is the default collection)
+        self.answer_cache_size = answer_cache_size
+        self.answer_cache_threshold = answer_cache_threshold
+        self.answer_cache_allow_sampling = answer_cache_allow_sampling
+        self._answer_caches = {}
+        
+        # Results of identical retrievals
+        self.retrieval_cache = RetrievalCache(retrieval_cache_size) if retrieval_cache_size > 0 else None
+        
+        # Threads for CPU-bound work of the async API (threads are started on demand)
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="rag-executor")
+        
+        # Event loop running deadline-bound LLM calls of the sync API, so they can be cancelled
+        self._generation_loop = None
+        
+        # Micro-batching of concurrent queries
+        self.query_batcher = None
+        if query_batching:
+            self.query_batcher = QueryBatcher(
+                # Look the manager and store up at call time since migrations and load_index replace them
+                lambda queries: self.embedding_manager.generate_query_embeddings(queries),
+                search_fn=(lambda embeddings, top_k: self.vector_store.search_batch(embeddings, top_k))
+                if batch_search else None,
+                max_batch_size=query_batch_size,
+                max_wait_ms=query_batch_wait_ms
+            )
+        
+    @property
+    def embedding_dim(self) -> int:
+        """Dimension of the embedding model (loads the model on first access)."""
+        return self.embedding_manager.get_dimension()
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        """The vector store, created for the embedding model on first access."""
+        if self._vector_store is None:
+            self._vector_store = self._new_vector_store()
+        return self._vector_store
+    
+    @vector_store.setter
+    def vector_store(self, vector_store: VectorStore) -> None:
+        self._vector_store = vector_store
+    
+    @property
+    def llm(self):
+        """The chat model, constructed on first access."""
+        if self._llm is None:
+            self._build_generation_chain()
+        return self._llm
+    
+    @property
+    def generation_chain(self):
+        """The prompt | LLM | parser chain, constructed on first access."""
+        if self._generation_chain is None:
+            self._build_generation_chain()
+        return self._generation_chain
+    
+    def _build_generation_chain(self) -> None:
+        """Import LangChain and build the LLM and generation chain."""
+        with self._load_lock:
+            if self._generation_chain is not None:
+                return
+            
+            from langchain_openai import ChatOpenAI
+            from langchain.prompts import ChatPromptTemplate
+            from langchain.schema import StrOutputParser
+            
+            # Initialize LLM
+            llm = ChatOpenAI(
+                model_name=self.llm_model_name,
+                temperature=self.temperature
+            )
+            
+            # Initialize prompt template
+            self.prompt_template = ChatPromptTemplate.from_messages([
+                ("system", "You are a helpful assistant that answers questions based on the provided context. "
+                          "If the answer cannot be found in the context, say that you don't know."),
+                ("human", "Context:\n{context}\n\nQuestion: {query}")
+            ])
+            
+            # Create generation chain
+            self._llm = llm
+            self._generation_chain = self.prompt_template | llm | StrOutputParser()
+    
+    def load(self, warmup_batch_size: int = 8) -> None:
+        """
+        Load the embedding model and LLM chain and warm up the encoder.
+        
+        Args:
+            warmup_batch_size: Number of texts in the embedding warm-up batch (no warm-up if 0)
+        """
+        start_time = time.perf_counter()
+        self.state = "loading"
+        try:
+            self.embedding_manager.load(warmup_batch_size=warmup_batch_size)
+            if self._vector_store is None:
+                self._vector_store = self._new_vector_store()
+            self._build_generation_chain()
+        except Exception as e:
+            self.state = "error"
+            self.load_error = str(e)
+            raise
+        
+        self.load_seconds = time.perf_counter() - start_time
+        self.state = "ready"
+        self._ready.set()
+    
+    def start_background_load(self, warmup_batch_size: int = 8) -> None:
+        """
+        Load the models in a background thread; see `status` and `wait_until_ready`.
+        
+        Args:
+            warmup_batch_size: Number of texts in the embedding warm-up batch
+        """
+        if self._load_thread is not None:
+            return
         
-        # Initialize prompt template
-        self.prompt_template = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful assistant that answers questions based on the provided context. "
-                      "If the answer cannot be found in the context, say that you don't know."),
-            ("human", "Context:\n{context}\n\nQuestion: {query}")
-        ])
+        def run():
+            try:
+                self.load(warmup_batch_size=warmup_batch_size)
+            except Exception as e:
+                print(f"Error loading RAG models: {str(e)}")
         
-        # Create generation chain
-        self.generation_chain = self.prompt_template | self.llm | StrOutputParser()
+        self.state = "loading"
+        self._load_thread = threading.Thread(target=run, name="rag-model-loader", daemon=True)
+        self._load_thread.start()
     
-    def index_documents(self, directory_path: str) -> None:
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a background load to finish.
+        
+        Args:
+            timeout: Maximum seconds to wait (forever if None)
+            
+        Returns:
+            Whether the engine is ready
+        """
+        return self._ready.wait(timeout)
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the readiness state of the engine.
+        
+        Returns:
+            Dictionary with state ("not_loaded", "loading", "ready" or "error"), load time and error
+        """
+        return {
+            "state": self.state,
+            "ready": self._ready.is_set(),
+            "load_seconds": self.load_seconds,
+            "error": self.load_error
+        }
+    
+    def _new_vector_store(self, embedding_manager: Optional[EmbeddingManager] = None) -> VectorStore:
+        """
+        Create an empty vector store for an embedding model.
+        
+        Args:
+            embedding_manager: Embedding manager of the model (the engine's if None)
+        
+        Returns:
+            New VectorStore, with a dimension reducer if one is configured
+        """
+        embedding_manager = embedding_manager or self.embedding_manager
+        dimension = embedding_manager.get_dimension()
+        reducer = None
+        if self.reduced_dimension is not None and self.reduced_dimension < dimension:
+            reducer = DimensionReducer(self.reduced_dimension, method=self.dimension_reduction)
+        return VectorStore(dimension=dimension, reducer=reducer, model_id=embedding_manager.model_id)
+    
+    def add_collection(self, name: str, embedding_model_name: str, use_openai_embeddings: bool = False) -> None:
+        """
+        Register a collection indexed with its own embedding model.
+        
+        The model is loaded when the collection is first used, and shared with other
+        collections using the same model.
+        
+        Args:
+            name: Name of the collection
+            embedding_model_name: Name of the collection's embedding model
+            use_openai_embeddings: Whether it is an OpenAI embedding model
+        """
+        self.collections[name] = {
+            "embedding_model_name": embedding_model_name,
+            "use_openai_embeddings": use_openai_embeddings,
+            "vector_store": None
+        }
+    
+    def get_collection(self, collection: Optional[str] = None) -> Tuple[EmbeddingManager, VectorStore]:
+        """
+        Get the embedding manager and vector store of a collection.
+        
+        Args:
+            collection: Name of the collection (the default collection if None)
+            
+        Returns:
+            Tuple of the embedding manager and vector store
+        """
+        if collection is None:
+            self.model_registry.touch(self.embedding_manager)
+            return self.embedding_manager, self.vector_store
+        
+        if collection not in self.collections:
+            raise ValueError(f"Unknown collection: {collection}")
+        
+        entry = self.collections[collection]
+        embedding_manager = self.model_registry.get(entry["embedding_model_name"], entry["use_openai_embeddings"])
+        if entry["vector_store"] is None:
+            entry["vector_store"] = self._new_vector_store(embedding_manager)
+        return embedding_manager, entry["vector_store"]
+    
+    def index_documents(self, directory_path: str, collection: Optional[str] = None) -> None:
         """
         Index documents from a directory.
         
         Args:
             directory_path: Path to directory containing documents
+            collection: Collection to index into (the default collection if None)
         """
         # Load and process documents
         document_chunks = self.document_processor.load_documents_from_directory(directory_path)
@@ -87,108 +457,817 @@ class RAGEngine:
             
         print(f"Loaded {len(document_chunks)} document chunks")
         
-        # Generate embeddings
-        documents_with_embeddings = self.embedding_manager.process_documents(document_chunks)
-        
-        # Add to vector store
-        self.vector_store.add_documents(documents_with_embeddings)
-        print(f"Indexed {len(documents_with_embeddings)} document chunks")
+        with self._swap_lock.read():
+            embedding_manager, vector_store = self.get_collection(collection)
+            
+            # Generate embeddings as one float32 matrix aligned with the chunks
+            embeddings = embedding_manager.embed_documents(document_chunks)
+            
+            # Add to vector store
+            vector_store.add_documents(document_chunks, embeddings=embeddings)
+        print(f"Indexed {len(document_chunks)} document chunks")
     
-    def save_index(self, directory: str = "rag/data", name: str = "vector_store") -> None:
+    def save_index(self, directory: str = "rag/data", name: str = "vector_store",
+                   collection: Optional[str] = None) -> None:
         """
         Save the vector index to disk.
         
         Args:
             directory: Directory to save the index
             name: Base name for the index files
+            collection: Collection to save (the default collection if None)
         """
-        self.vector_store.save(directory, name)
+        _, vector_store = self.get_collection(collection)
+        vector_store.save(directory, name)
         print(f"Saved vector store to {directory}/{name}.*")
     
-    def load_index(self, directory: str = "rag/data", name: str = "vector_store") -> None:
+    def load_index(self, directory: str = "rag/data", name: str = "vector_store",
+                   collection: Optional[str] = None, use_saved_model: bool = False) -> None:
         """
         Load a vector index from disk.
         
         Args:
             directory: Directory containing the index
             name: Base name of the index files
+            collection: Collection to load into (the default collection if None)
+            use_saved_model: Switch the default collection to the embedding model the index
+                was built with, e.g. to migrate it away from that model (default collection only)
+        
+        Raises:
+            ValueError: If the index was built with a different embedding model
         """
-        self.vector_store = VectorStore.load(directory, name)
+        embedding_manager = self.embedding_manager
+        if collection is not None:
+            embedding_manager, _ = self.get_collection(collection)
+        elif use_saved_model:
+            saved_model = VectorStore.saved_model(directory, name)
+            if saved_model is not None and saved_model != embedding_manager.model_id:
+                embedding_manager = self.model_registry.get(
+                    saved_model, use_openai=saved_model in OPENAI_EMBEDDING_DIMENSIONS)
+        
+        vector_store = VectorStore.load(
+            directory, name,
+            expected_model=embedding_manager.model_id,
+            expected_dimension=embedding_manager.get_dimension()
+        )
+        if collection is None:
+            with self._swap_lock.write():
+                self.embedding_manager = embedding_manager
+                self.vector_store = vector_store
+        else:
+            self.collections[collection]["vector_store"] = vector_store
         print(f"Loaded vector store from {directory}/{name}.*")
     
-    def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    def start_migration(self,
+                        embedding_model_name: str,
+                        use_openai_embeddings: bool = False,
+                        batch_size: int = 256,
+                        save_directory: Optional[str] = None,
+                        save_name: str = "vector_store") -> IndexMigration:
+        """
+        Re-embed the index with a new embedding model in the background.
+        
+        Queries keep using the current model and index until the new index has
+        caught up, then both are swapped in at once.
+        
+        Args:
+            embedding_model_name: Name of the new embedding model
+            use_openai_embeddings: Whether the new model is an OpenAI embedding model
+            batch_size: Number of chunks re-embedded per batch
+            save_directory: Directory the new index is saved to after cut-over (not saved if None)
+            save_name: Base name of the saved index files
+            
+        Returns:
+            The running IndexMigration
+        """
+        if self.migration is not None and self.migration.state in ("running", "cutting_over"):
+            raise RuntimeError("An index migration is already running")
+        
+        embedding_manager = self.model_registry.get(embedding_model_name, use_openai_embeddings)
+        self.migration = IndexMigration(
+            self, embedding_manager,
+            batch_size=batch_size,
+            save_directory=save_directory,
+            save_name=save_name
+        )
+        self.migration.start()
+        return self.migration
+    
+    def migration_status(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the progress of the last index migration.
+        
+        Returns:
+            Dictionary as returned by IndexMigration.status, or None if no migration was started
+        """
+        return self.migration.status() if self.migration is not None else None
+    
+    def retrieve(self, query: str, top_k: Optional[int] = 3, collection: Optional[str] = None,
+                 expand_neighbours: Optional[bool] = None,
+                 history: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents for a query.
         
         Args:
             query: User query
-            top_k: Number of top results to retrieve
+            top_k: Number of top results to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            expand_neighbours: Whether the chunks next to each hit are merged into its passage
+                within the `neighbour_max_tokens` budget (the engine's `neighbour_window` setting if None)
+            history: Earlier user turns of the conversation, oldest first, blended into the
+                retrieval query
             
         Returns:
-            List of relevant document chunks with scores
+            List of relevant document chunks with scores, one per hit
         """
-        # Generate query embedding
-        query_embedding = self.embedding_manager.generate_query_embedding(query)
+        if expand_neighbours is None:
+            expand_neighbours = self.neighbour_window > 0
+        history = self._history_turns(history)
         
-        # Search vector store
-        results = self.vector_store.search(query_embedding, top_k=top_k)
+        with self._swap_lock.read():
+            embedding_manager, vector_store = self.get_collection(collection)
+            
+            # Identical retrievals against the same store version are served from the cache
+            results = None
+            cache_key = None
+            if self.retrieval_cache is not None:
+                options = (collection, tuple(history)) if history else collection
+                cache_key = self.retrieval_cache.make_key(vector_store.version, query, top_k, options)
+                cached = self.retrieval_cache.get(cache_key)
+                if cached is not None:
+                    results = vector_store.results_from_ids(*cached)
+            
+            if results is None:
+                query_embedding = None
+                if history:
+                    query_embedding = self._conversation_embedding(query, history, embedding_manager)
+                results = self._search(query, top_k, collection, embedding_manager, vector_store, query_embedding)
+                if cache_key is not None:
+                    self.retrieval_cache.put(cache_key, results)
+            
+            if expand_neighbours:
+                results = self._expand_neighbours(vector_store, results)
         
         return results
     
-    def format_context(self, results: List[Dict[str, Any]]) -> str:
+    def _search(self, query: str, top_k: Optional[int], collection: Optional[str],
+                embedding_manager: EmbeddingManager, vector_store: VectorStore,
+                query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Embed a query and search a collection's vector store.
+        
+        Args:
+            query: User query
+            top_k: Number of top results to retrieve, or None to choose it adaptively
+            collection: Collection searched (the default collection if None)
+            embedding_manager: Embedding manager of the collection
+            vector_store: Vector store of the collection
+            query_embedding: Embedding to search with instead of the query's own
+            
+        Returns:
+            List of relevant document chunks with scores
+        """
+        if query_embedding is not None or top_k is None or self.diversity_enabled:
+            # Adaptive, diverse and conversational retrieval need their own search,
+            # so only the embedding is micro-batched
+            if query_embedding is None:
+                if collection is None and self.query_batcher is not None:
+                    query_embedding = self.query_batcher.embed(query)
+                else:
+                    query_embedding = embedding_manager.generate_query_embedding(query)
+            
+            if top_k is None:
+                results = self._adaptive_search(vector_store, query_embedding)
+            elif not self.diversity_enabled:
+                results = vector_store.search(query_embedding, top_k=top_k)
+            if self.diversity_enabled:
+                # As many results as requested, or as adaptive retrieval chose
+                results = vector_store.search_diverse(
+                    query_embedding, top_k if top_k is not None else len(results), fetch_k=self.mmr_fetch_k,
+                    mmr_lambda=self.mmr_lambda, max_per_source=self.max_chunks_per_source)
+        elif collection is not None:
+            # Other collections are not micro-batched; the batcher serves the default model
+            query_embedding = embedding_manager.generate_query_embedding(query)
+            results = vector_store.search(query_embedding, top_k=top_k)
+        elif self.query_batcher is not None and self.query_batcher.search_fn is not None:
+            # Embed and search together with concurrent queries
+            results = self.query_batcher.search(query, top_k)
+        else:
+            # Generate query embedding
+            if self.query_batcher is not None:
+                query_embedding = self.query_batcher.embed(query)
+            else:
+                query_embedding = embedding_manager.generate_query_embedding(query)
+            
+            # Search vector store
+            results = vector_store.search(query_embedding, top_k=top_k)
+        
+        return results
+    
+    def _history_turns(self, history: Optional[List[str]]) -> List[str]:
+        """Get the earlier turns of a conversation that are blended into the retrieval query."""
+        if not history or self.history_turns <= 0:
+            return []
+        return [turn for turn in history if turn and turn.strip()][-self.history_turns:]
+    
+    def _conversation_embedding(self, query: str, history: List[str],
+                                embedding_manager: EmbeddingManager) -> np.ndarray:
+        """
+        Embed a conversation turn together with the earlier turns it follows.
+        
+        The turns are embedded in one call through the query embedding cache, so turns
+        seen before (the previous request's history and question) are not encoded again.
+        
+        Args:
+            query: Current turn
+            history: Earlier turns, oldest first
+            embedding_manager: Embedding manager of the searched collection
+            
+        Returns:
+            Recency-weighted combination of the turn embeddings
+        """
+        embeddings = embedding_manager.generate_query_embeddings(history + [query])
+        return combine_turn_embeddings(embeddings, self.history_decay)
+    
+    def _expand_neighbours(self, vector_store: VectorStore, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge the chunks next to each hit into its passage, best hits first, within the token budget.
+        
+        Neighbours already among the hits (or merged into a better hit) are skipped, and so
+        is anything beyond a skipped chunk, so every passage stays one contiguous run. The
+        results keep one entry per hit, so k and the citations count only retrieved hits.
+        
+        Args:
+            vector_store: Vector store the results come from
+            results: Search results, highest score first
+            
+        Returns:
+            Results whose documents hold the merged passages, with the positions of the
+            merged chunks as "neighbours"
+        """
+        seen = {result["id"] for result in results}
+        used_tokens = 0
+        expanded = []
+        for result in results:
+            chunk_id = result["document"]["metadata"].get("chunk_id")
+            run = {chunk_id: result["document"]}
+            neighbours = []
+            for position in vector_store.neighbours(result["id"], max(self.neighbour_window, 1)):
+                if position in seen:
+                    continue
+                document = vector_store.documents[position]
+                neighbour_id = document["metadata"]["chunk_id"]
+                if neighbour_id - 1 not in run and neighbour_id + 1 not in run:
+                    continue
+                tokens = chunk_tokens(document, self.llm_model_name)
+                if self.neighbour_max_tokens is not None and used_tokens + tokens > self.neighbour_max_tokens:
+                    continue
+                seen.add(position)
+                used_tokens += tokens
+                run[neighbour_id] = document
+                neighbours.append(position)
+            
+            if not neighbours:
+                expanded.append(result)
+                continue
+            merged = merge_chunks([run[i] for i in sorted(run)], result["document"]["metadata"], self.llm_model_name)
+            expanded.append(dict(result, document=merged, neighbours=neighbours))
+        return expanded
+    
+    @property
+    def diversity_enabled(self) -> bool:
+        """Whether retrieved chunks are re-ranked by MMR or capped per source."""
+        return self.mmr_lambda is not None or self.max_chunks_per_source is not None
+    
+    def _adaptive_search(self, vector_store: VectorStore, query_embedding: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Over-fetch candidates and keep as many as `choose_k` picks within the adaptive bounds.
+        
+        Args:
+            vector_store: Vector store to search
+            query_embedding: Embedding of the query
+            
+        Returns:
+            List of relevant document chunks with scores
+        """
+        if self.adaptive_min_score is not None:
+            # The threshold is applied by the index itself
+            candidates = vector_store.range_search(query_embedding, self.adaptive_min_score,
+                                                   max_results=self.adaptive_max_k)
+            if len(candidates) < self.adaptive_min_k:
+                candidates = vector_store.search(query_embedding, top_k=self.adaptive_min_k)
+        else:
+            candidates = vector_store.search(query_embedding, top_k=self.adaptive_max_k)
+        
+        k = choose_k([result["score"] for result in candidates], self.adaptive_min_k, self.adaptive_max_k,
+                     min_score=self.adaptive_min_score, min_gap=self.adaptive_min_gap)
+        return candidates[:k]
+    
+    def format_context(self, results: List[Dict[str, Any]], query: Optional[str] = None,
+                       collection: Optional[str] = None) -> str:
         """
         Format retrieval results into context for the LLM.
         
+        With a `context_max_tokens` budget, the best chunks that fit are kept and consecutive
+        chunks of the same source are merged into one passage without their overlap. With a
+        `compression_max_tokens` budget and the query, only the sentences most similar to the
+        query are kept.
+        
         Args:
             results: List of retrieval results
+            query: User query the context is compressed for
+            collection: Collection the results come from (the default collection if None)
             
         Returns:
             Formatted context string
         """
+        if self.context_max_tokens is not None:
+            passages = pack_context(results, self.context_max_tokens, self.llm_model_name)
+        else:
+            passages = [{
+                "text": result["document"]["text"],
+                "metadata": {
+                    "source": result["document"]["metadata"].get("source", "Unknown"),
+                    "page": result["document"]["metadata"].get("page", "")
+                },
+                "score": result["score"]
+            } for result in results]
+        
+        if query is not None and self.compression_max_tokens is not None:
+            passages = self.compress_context(query, passages, collection)
+        
         context_parts = []
         
-        for i, result in enumerate(results):
-            doc = result["document"]
-            score = result["score"]
-            
+        for i, passage in enumerate(passages):
             # Format document with source information
-            source = doc["metadata"].get("source", "Unknown")
-            page = doc["metadata"].get("page", "")
+            source = passage["metadata"]["source"]
+            page = passage["metadata"]["page"]
             page_info = f", Page {page}" if page else ""
             
-            context_part = f"[Document {i+1}] (Source: {source}{page_info}, Relevance: {score:.2f})\n{doc['text']}\n"
+            context_part = f"[Document {i+1}] (Source: {source}{page_info}, Relevance: {passage['score']:.2f})\n{passage['text']}\n"
             context_parts.append(context_part)
         
         return "\n".join(context_parts)
     
-    def answer_question(self, query: str, top_k: int = 3) -> Dict[str, Any]:
+    def compress_context(self, query: str, passages: List[Dict[str, Any]],
+                         collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Reduce context passages to the sentences most similar to the query.
+        
+        Args:
+            query: User query
+            passages: Context passages with text, metadata and score
+            collection: Collection whose embedding model scores the sentences
+            
+        Returns:
+            Passages reduced to the sentences within `compression_max_tokens`
+        """
+        with self._swap_lock.read():
+            embedding_manager, _ = self.get_collection(collection)
+            # Served from the query cache after retrieval. The sentences share one encoder call
+            # and bypass the on-disk cache, which would otherwise be written on every query
+            # and fill up with sentence fragments
+            query_embedding = embedding_manager.generate_query_embedding(query)
+            return compress_passages(passages, query_embedding,
+                                     functools.partial(embedding_manager.generate_embeddings, use_cache=False),
+                                     self.compression_max_tokens, self.llm_model_name)
+    
+    @property
+    def answer_cache_enabled(self) -> bool:
+        """Whether answers are cached; sampled answers are only reused if explicitly allowed."""
+        return self.answer_cache_size > 0 and (self.temperature == 0 or self.answer_cache_allow_sampling)
+    
+    def _answer_cache(self, collection: Optional[str] = None) -> SemanticAnswerCache:
+        """Get the answer cache of a collection, creating it on first use."""
+        if collection not in self._answer_caches:
+            self._answer_caches.setdefault(collection, SemanticAnswerCache(self.answer_cache_size, self.answer_cache_threshold))
+        return self._answer_caches[collection]
+    
+    def _lookup_answer(self, query: str, top_k: Optional[int], collection: Optional[str] = None,
+                       history: Optional[List[str]] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple]]:
+        """
+        Look up a cached answer of a similar question.
+        
+        Args:
+            query: User question
+            top_k: Number of documents to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            history: Earlier user turns of the conversation
+            
+        Returns:
+            Tuple of (cached response or None, key to store the new answer under or None if caching is off)
+        """
+        if not self.answer_cache_enabled:
+            return None, None
+        history = self._history_turns(history)
+        
+        with self._swap_lock.read():
+            embedding_manager, vector_store = self.get_collection(collection)
+            # A follow-up question means different things in different conversations, so it is
+            # keyed on the same blended embedding retrieval searches with; the query cache makes
+            # the embeddings free for the retrieval that follows a miss
+            if history:
+                embedding = self._conversation_embedding(query, history, embedding_manager)
+            else:
+                embedding = embedding_manager.generate_query_embedding(query)
+            version = vector_store.version
+        
+        cached = self._answer_cache(collection).get(embedding, version, top_k)
+        if cached is not None:
+            cached = {**cached, "cached": True}
+        return cached, (collection, embedding, version, top_k)
+    
+    def _store_answer(self, cache_key: Optional[Tuple], response: Dict[str, Any]) -> None:
+        """Cache an answer under the key returned by `_lookup_answer`."""
+        if cache_key is None or not response["has_context"] or response.get("degraded"):
+            return
+        collection, embedding, version, top_k = cache_key
+        self._answer_cache(collection).put(embedding, version, top_k, response)
+    
+    def answer_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get answer cache statistics.
+        
+        Returns:
+            Statistics per collection ("default" for the default collection), or None if caching is off
+        """
+        if not self.answer_cache_enabled:
+            return None
+        return {collection or "default": cache.stats() for collection, cache in self._answer_caches.items()}
+    
+    def _answer_without_llm(self, query: str,
+                            results: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Answer from the retrieval results alone when the LLM cannot add anything.
+        
+        Args:
+            query: User question
+            results: Retrieval results, highest score first
+            
+        Returns:
+            Tuple of (response, or None if the LLM is needed; answer path)
+        """
+        if not results or (self.min_answer_score is not None and results[0]["score"] < self.min_answer_score):
+            # Nothing relevant enough was found; the LLM would only say it doesn't know
+            return {
+                "answer": NO_CONTEXT_ANSWER,
+                "sources": [],
+                "has_context": False,
+                "k": 0
+            }, "no_results" if not results else "low_confidence"
+        
+        if (self.extractive_min_score is not None and results[0]["score"] >= self.extractive_min_score
+                and is_lookup_question(query)):
+            # A confident match to a lookup question is the answer itself
+            return self._extractive_response(results), "extractive"
+        
+        return None, "llm"
+    
+    def _extractive_response(self, results: List[Dict[str, Any]], degraded: bool = False) -> Dict[str, Any]:
+        """
+        Build a response whose answer is the best retrieved passage.
+        
+        Args:
+            results: Retrieval results, highest score first
+            degraded: Whether the passage stands in for an answer the LLM did not produce in time
+            
+        Returns:
+            Response flagged as extractive (and degraded)
+        """
+        response = {
+            "answer": results[0]["document"]["text"],
+            "sources": self.format_sources(results[:1]),
+            "has_context": True,
+            "k": 1,
+            "extractive": True
+        }
+        if degraded:
+            response["degraded"] = True
+        return response
+    
+    def _get_generation_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the event loop for deadline-bound generation, starting its thread on first use."""
+        with self._load_lock:
+            if self._generation_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rag-generation", daemon=True).start()
+                self._generation_loop = loop
+            return self._generation_loop
+    
+    def _generate(self, context: str, query: str, deadline: Optional[float] = None) -> Optional[str]:
+        """
+        Generate an answer, giving up once the deadline passes.
+        
+        Args:
+            context: Formatted context
+            query: User question
+            deadline: `time.monotonic()` time by which the answer is needed (no limit if None)
+            
+        Returns:
+            Generated answer, or None if the deadline passed first
+        """
+        inputs = {"context": context, "query": query}
+        if deadline is None:
+            return self.generation_chain.invoke(inputs)
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        
+        # A blocking invoke cannot be interrupted, so the async call runs on the generation
+        # loop; cancelling its future cancels the task and with it the HTTP request
+        future = asyncio.run_coroutine_threadsafe(self.generation_chain.ainvoke(inputs), self._get_generation_loop())
+        try:
+            return future.result(timeout=remaining)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return None
+    
+    async def _agenerate(self, context: str, query: str, deadline: Optional[float] = None) -> Optional[str]:
+        """Async version of `_generate`."""
+        generation_chain = await self._ageneration_chain()
+        inputs = {"context": context, "query": query}
+        if deadline is None:
+            return await generation_chain.ainvoke(inputs)
+        
+        try:
+            return await asyncio.wait_for(generation_chain.ainvoke(inputs), timeout=max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            return None
+    
+    def _record_path(self, path: str, start_time: float) -> None:
+        """Add one answered question to the latency statistics of its answer path."""
+        with self._stats_lock:
+            self._path_stats[path]["requests"] += 1
+            self._path_stats[path]["seconds"] += time.perf_counter() - start_time
+    
+    def answer_path_stats(self) -> Dict[str, Any]:
+        """
+        Get latency statistics per answer path.
+        
+        Returns:
+            Dictionary with the request count and mean latency of each path, and the share
+            of questions answered without calling the LLM (requests that timed out waiting
+            for it count as LLM requests, not as skips)
+        """
+        with self._stats_lock:
+            stats = {path: dict(path_stats) for path, path_stats in self._path_stats.items()}
+        
+        for path_stats in stats.values():
+            path_stats["mean_latency_ms"] = (path_stats["seconds"] * 1000.0 / path_stats["requests"]
+                                             if path_stats["requests"] else 0.0)
+        total = sum(path_stats["requests"] for path_stats in stats.values())
+        skipped = sum(stats[path]["requests"] for path in LLM_SKIP_PATHS)
+        stats["llm_skip_rate"] = skipped / total if total else 0.0
+        return stats
+    
+    def answer_question(self, query: str, top_k: Optional[int] = 3, collection: Optional[str] = None,
+                        deadline: Optional[float] = None,
+                        history: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Answer a question using RAG.
         
+        If the LLM has not answered by the deadline, generation is cancelled and the best
+        retrieved passage is returned instead, flagged "degraded".
+        
         Args:
             query: User question
-            top_k: Number of documents to retrieve
+            top_k: Number of documents to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            deadline: `time.monotonic()` time by which the answer is needed (no limit if None)
+            history: Earlier user turns of the conversation, oldest first, blended into the
+                retrieval query
             
         Returns:
             Dictionary with answer and retrieval information
         """
+        start_time = time.perf_counter()
+        
+        # Serve a similar question's answer if one is cached
+        cached, cache_key = self._lookup_answer(query, top_k, collection, history)
+        if cached is not None:
+            self._record_path("cached", start_time)
+            return cached
+        
         # Retrieve relevant documents
-        results = self.retrieve(query, top_k=top_k)
+        results = self.retrieve(query, top_k=top_k, collection=collection, history=history)
         
-        if not results:
-            return {
-                "answer": "I don't have enough information to answer this question.",
-                "sources": [],
-                "has_context": False
-            }
+        # Answer without the LLM if retrieval is too weak, or strong enough for a lookup
+        response, path = self._answer_without_llm(query, results)
         
-        # Format context
-        context = self.format_context(results)
+        if response is None:
+            # Format context
+            context = self.format_context(results, query, collection)
+            
+            # Generate answer
+            answer = self._generate(context, query, deadline)
+            
+            if answer is None:
+                response, path = self._extractive_response(results, degraded=True), "deadline_exceeded"
+            else:
+                response = {
+                    "answer": answer,
+                    "sources": self.format_sources(results),
+                    "has_context": True,
+                    "k": len(results)
+                }
         
-        # Generate answer
-        answer = self.generation_chain.invoke({"context": context, "query": query})
+        self._store_answer(cache_key, response)
+        self._record_path(path, start_time)
+        return response
+    
+    def stream_answer(self, query: str, top_k: Optional[int] = 3, collection: Optional[str] = None,
+                      history: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Answer a question using RAG, yielding the answer as it is generated.
+        
+        Args:
+            query: User question
+            top_k: Number of documents to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            history: Earlier user turns of the conversation, oldest first, blended into the
+                retrieval query
+            
+        Yields:
+            A "sources" event ({"type", "sources", "has_context"}) as soon as retrieval is done,
+            then "token" events ({"type", "content"}) as the LLM produces them
+        """
+        start_time = time.perf_counter()
+        cached, cache_key = self._lookup_answer(query, top_k, collection, history)
+        if cached is not None:
+            yield {"type": "sources", "sources": cached["sources"], "has_context": True}
+            yield {"type": "token", "content": cached["answer"]}
+            self._record_path("cached", start_time)
+            return
+        
+        # Retrieve relevant documents
+        results = self.retrieve(query, top_k=top_k, collection=collection, history=history)
         
-        # Format sources for citation
+        response, path = self._answer_without_llm(query, results)
+        if response is not None:
+            yield {"type": "sources", "sources": response["sources"], "has_context": response["has_context"]}
+            yield {"type": "token", "content": response["answer"]}
+            self._store_answer(cache_key, response)
+            self._record_path(path, start_time)
+            return
+        
+        # Sources are known before generation starts
+        sources = self.format_sources(results)
+        yield {"type": "sources", "sources": sources, "has_context": True}
+        
+        # Stream the answer
+        context = self.format_context(results, query, collection)
+        chunks = []
+        for chunk in self.generation_chain.stream({"context": context, "query": query}):
+            if chunk:
+                chunks.append(chunk)
+                yield {"type": "token", "content": chunk}
+        
+        # Only a completely streamed answer is cached
+        self._store_answer(cache_key, {"answer": "".join(chunks), "sources": sources, "has_context": True,
+                                       "k": len(sources)})
+        self._record_path("llm", start_time)
+    
+    async def _run_in_executor(self, fn, *args, **kwargs):
+        """Run a blocking function in the engine's executor without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+    
+    async def _ageneration_chain(self):
+        """Get the generation chain, building it in the executor on first use."""
+        if self._generation_chain is None:
+            await self._run_in_executor(self._build_generation_chain)
+        return self._generation_chain
+    
+    async def aretrieve(self, query: str, top_k: Optional[int] = 3, collection: Optional[str] = None,
+                        history: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve relevant documents for a query without blocking the event loop.
+        
+        Embedding and search run in the engine's executor. Cancelling the caller stops
+        waiting immediately; the search itself finishes in the background.
+        
+        Args:
+            query: User query
+            top_k: Number of top results to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            history: Earlier user turns of the conversation, oldest first, blended into the
+                retrieval query
+            
+        Returns:
+            List of relevant document chunks with scores
+        """
+        return await self._run_in_executor(self.retrieve, query, top_k=top_k, collection=collection,
+                                           history=history)
+    
+    async def aanswer_question(self, query: str, top_k: Optional[int] = 3, collection: Optional[str] = None,
+                               deadline: Optional[float] = None,
+                               history: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Answer a question using RAG with an async LLM call.
+        
+        Cancelling the task also cancels the in-flight LLM request, and so does the deadline
+        passing, in which case a degraded extractive answer is returned as in `answer_question`.
+        
+        Args:
+            query: User question
+            top_k: Number of documents to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            deadline: `time.monotonic()` time by which the answer is needed (no limit if None)
+            history: Earlier user turns of the conversation, oldest first, blended into the
+                retrieval query
+            
+        Returns:
+            Dictionary with answer and retrieval information
+        """
+        start_time = time.perf_counter()
+        cached, cache_key = await self._run_in_executor(self._lookup_answer, query, top_k, collection, history)
+        if cached is not None:
+            self._record_path("cached", start_time)
+            return cached
+        
+        results = await self.aretrieve(query, top_k=top_k, collection=collection, history=history)
+        
+        response, path = self._answer_without_llm(query, results)
+        
+        if response is None:
+            # Compression embeds sentences, so the context is built in the executor
+            context = await self._run_in_executor(self.format_context, results, query, collection)
+            answer = await self._agenerate(context, query, deadline)
+            
+            if answer is None:
+                response, path = self._extractive_response(results, degraded=True), "deadline_exceeded"
+            else:
+                response = {
+                    "answer": answer,
+                    "sources": self.format_sources(results),
+                    "has_context": True,
+                    "k": len(results)
+                }
+        
+        self._store_answer(cache_key, response)
+        self._record_path(path, start_time)
+        return response
+    
+    async def astream_answer(self, query: str, top_k: Optional[int] = 3, collection: Optional[str] = None,
+                             history: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async version of `stream_answer`; closing the iterator cancels generation.
+        
+        Args:
+            query: User question
+            top_k: Number of documents to retrieve, or None to choose it adaptively
+            collection: Collection to search (the default collection if None)
+            history: Earlier user turns of the conversation, oldest first, blended into the
+                retrieval query
+            
+        Yields:
+            A "sources" event, then "token" events, as in `stream_answer`
+        """
+        start_time = time.perf_counter()
+        cached, cache_key = await self._run_in_executor(self._lookup_answer, query, top_k, collection, history)
+        if cached is not None:
+            yield {"type": "sources", "sources": cached["sources"], "has_context": True}
+            yield {"type": "token", "content": cached["answer"]}
+            self._record_path("cached", start_time)
+            return
+        
+        results = await self.aretrieve(query, top_k=top_k, collection=collection, history=history)
+        
+        response, path = self._answer_without_llm(query, results)
+        if response is not None:
+            yield {"type": "sources", "sources": response["sources"], "has_context": response["has_context"]}
+            yield {"type": "token", "content": response["answer"]}
+            self._store_answer(cache_key, response)
+            self._record_path(path, start_time)
+            return
+        
+        sources = self.format_sources(results)
+        yield {"type": "sources", "sources": sources, "has_context": True}
+        
+        # Compression embeds sentences, so the context is built in the executor
+        context = await self._run_in_executor(self.format_context, results, query, collection)
+        generation_chain = await self._ageneration_chain()
+        chunks = []
+        async for chunk in generation_chain.astream({"context": context, "query": query}):
+            if chunk:
+                chunks.append(chunk)
+                yield {"type": "token", "content": chunk}
+        
+        self._store_answer(cache_key, {"answer": "".join(chunks), "sources": sources, "has_context": True,
+                                       "k": len(sources)})
+        self._record_path("llm", start_time)
+    
+    def format_sources(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Format retrieval results as source citations.
+        
+        Args:
+            results: List of retrieval results
+            
+        Returns:
+            List of sources with file, page and score
+        """
         sources = []
         for result in results:
             doc = result["document"]
@@ -202,8 +1281,4 @@ class RAGEngine:
                 "score": score
             })
         
-        return {
-            "answer": answer,
-            "sources": sources,
-            "has_context": True
-        } 
\ No newline at end of file
+        return sources 
\ No newline at end of file
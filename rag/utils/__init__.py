@@ -2,8 +2,14 @@
 Utility modules for the RAG system.
 """
 
+from .answer_cache import SemanticAnswerCache
+from .dimension_reducer import DimensionReducer
 from .document_processor import DocumentProcessor
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
 from .embedding_manager import EmbeddingManager
+from .embedding_pool import EmbeddingWorkerPool
+from .model_registry import EmbeddingModelRegistry
+from .retrieval_cache import RetrievalCache
 from .vector_store import VectorStore
 
-__all__ = ['DocumentProcessor', 'EmbeddingManager', 'VectorStore'] 
\ No newline at end of file
+__all__ = ['SemanticAnswerCache', 'DimensionReducer', 'DocumentProcessor', 'EmbeddingCache', 'QueryEmbeddingCache', 'EmbeddingManager', 'EmbeddingWorkerPool', 'EmbeddingModelRegistry', 'RetrievalCache', 'VectorStore'] 
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Adaptive K Module
+
+This module chooses how many retrieved chunks to keep for a query, cutting the
+ranked scores below a threshold or at the largest drop between neighbours.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+def choose_k(scores: List[float], min_k: int = 1, max_k: int = 10,
+             min_score: Optional[float] = None, min_gap: float = 0.0) -> int:
+    """
+    Choose the number of results to keep from scores ranked best first.
+    
+    Results below `min_score` are dropped; of the rest, the list is cut at the largest
+    gap between consecutive scores if that gap is at least `min_gap`. The result is
+    clamped to [min_k, max_k] (and to the number of scores).
+    
+    Args:
+        scores: Similarity scores, highest first
+        min_k: Minimum number of results kept
+        max_k: Maximum number of results kept
+        min_score: Calibrated score below which results are irrelevant (no threshold if None)
+        min_gap: Smallest score drop treated as the boundary of the relevant results
+    
+    Returns:
+        Number of leading results to keep
+    """
+    if min_k < 0 or max_k < max(min_k, 1):
+        raise ValueError(f"Invalid bounds: min_k={min_k}, max_k={max_k}")
+    
+    scores = np.asarray(scores[:max_k], dtype=np.float32)
+    k = len(scores)
+    if min_score is not None:
+        k = int(np.count_nonzero(scores >= min_score))
+    
+    shortest = max(min_k, 1)
+    if k > shortest:
+        # gaps[i] is the drop after the (i + 1)-th result; cuts keep at least min_k results
+        gaps = scores[:k - 1] - scores[1:k]
+        cut = shortest - 1 + int(np.argmax(gaps[shortest - 1:]))
+        if gaps[cut] >= min_gap and gaps[cut] > 0:
+            k = cut + 1
+    
+    return min(max(k, min_k), len(scores))
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Answer Cache Module
+
+This module caches generated answers and serves them for later questions whose
+query embedding is close enough, using a small FAISS index of past queries.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional
+
+import numpy as np
+import faiss
+
+class SemanticAnswerCache:
+    """Bounded LRU cache of answers looked up by query-embedding similarity."""
+    
+    def __init__(self, max_entries: int = 1024, similarity_threshold: float = 0.95, candidates: int = 4):
+        """
+        Initialize the SemanticAnswerCache.
+        
+        Args:
+            max_entries: Maximum number of cached answers before LRU eviction
+            similarity_threshold: Minimum cosine similarity for a past query to count as the same question
+            candidates: Number of nearest past queries checked for matching request parameters
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.candidates = candidates
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        
+        self.index_version = None
+        self._index = None  # inner product over normalized embeddings = cosine similarity
+        self._entries = OrderedDict()  # id -> (request parameters, response)
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """Get the embedding as a unit-length (1, dimension) float32 matrix."""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _check_version(self, index_version: Hashable) -> None:
+        """Drop all entries if the vector store changed since they were cached."""
+        if index_version != self.index_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._index = None
+            self.index_version = index_version
+    
+    def get(self, embedding: np.ndarray, index_version: Hashable, params: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Look up the answer of a similar past question.
+        
+        Args:
+            embedding: Query embedding
+            index_version: Version of the vector store the answer must come from
+            params: Request parameters that must match exactly (e.g. top_k and collection)
+        
+        Returns:
+            Cached response, or None on a miss
+        """
+        vector = self._normalize(embedding)
+        
+        with self._lock:
+            self._check_version(index_version)
+            
+            if self._index is not None and self._entries:
+                similarities, ids = self._index.search(vector, min(self.candidates, len(self._entries)))
+                for similarity, entry_id in zip(similarities[0], ids[0]):
+                    if entry_id == -1 or similarity < self.similarity_threshold:
+                        break
+                    entry = self._entries.get(int(entry_id))
+                    if entry is not None and entry[0] == params:
+                        self._entries.move_to_end(int(entry_id))
+                        self.hits += 1
+                        return entry[1]
+            
+            self.misses += 1
+            return None
+    
+    def put(self, embedding: np.ndarray, index_version: Hashable, params: Hashable, response: Dict[str, Any]) -> None:
+        """
+        Store the answer of a question.
+        
+        Answers computed against a vector store version that is no longer current are dropped.
+        
+        Args:
+            embedding: Query embedding
+            index_version: Version of the vector store the answer came from
+            params: Request parameters of the answer
+            response: Response to serve for similar questions
+        """
+        vector = self._normalize(embedding)
+        
+        with self._lock:
+            if index_version != self.index_version:
+                return
+            if self._index is None:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+            
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (params, response)
+            
+            if len(self._entries) > self.max_entries:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([evicted_id], dtype=np.int64))
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry count, hits, misses, hit rate, evictions and invalidations
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+    
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        with self._lock:
+            self._entries.clear()
+            self._index = None
\ No newline at end of file
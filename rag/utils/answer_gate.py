@@ -0,0 +1,30 @@
+"""
+Answer Gate Module
+
+This module recognizes short lookup-style questions, whose answer can be a
+retrieved passage as is, without generating one with the LLM.
+"""
+
+import re
+
+# Questions asking for a fact or definition rather than an explanation or comparison
+LOOKUP_QUESTION = re.compile(
+    r"^\s*(what|who|when|where|which|define|definition of|meaning of)\b", re.IGNORECASE)
+NON_LOOKUP_WORDS = re.compile(
+    r"\b(why|how|explain|compare|comparison|difference|differences|versus|vs|pros|cons|should|summari[sz]e)\b",
+    re.IGNORECASE)
+
+def is_lookup_question(query: str, max_words: int = 12) -> bool:
+    """
+    Check whether a question is a short fact or definition lookup.
+    
+    Args:
+        query: User question
+        max_words: Longest question still considered a lookup
+    
+    Returns:
+        True if the question looks like a lookup
+    """
+    return (len(query.split()) <= max_words
+            and LOOKUP_QUESTION.match(query) is not None
+            and NON_LOOKUP_WORDS.search(query) is None)
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Concurrency Utilities Module
+
+This module provides synchronization helpers shared by the RAG components.
+"""
+
+import threading
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    """Lock allowing many concurrent readers or one writer, preferring waiting writers."""
+    
+    def __init__(self):
+        """Initialize the ReadWriteLock."""
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    @contextmanager
+    def read(self):
+        """Hold the lock for reading; blocks only while a writer holds or waits for it."""
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+    
+    @contextmanager
+    def write(self):
+        """Hold the lock exclusively, after in-flight readers have finished."""
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Context Compressor Module
+
+This module shrinks the LLM context to the sentences of the retrieved passages
+that are most similar to the query, within a token budget.
+"""
+
+import re
+from typing import List, Dict, Any, Callable
+
+import numpy as np
+
+from .token_counter import count_tokens
+
+# Sentence ends followed by whitespace, and line breaks
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split a text into sentences.
+    
+    Args:
+        text: Text to split
+    
+    Returns:
+        Non-empty sentences in their original order
+    """
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+def compress_passages(passages: List[Dict[str, Any]],
+                      query_embedding: np.ndarray,
+                      embed_fn: Callable[[List[str]], np.ndarray],
+                      max_tokens: int,
+                      model: str = "gpt-3.5-turbo") -> List[Dict[str, Any]]:
+    """
+    Keep the sentences most similar to the query, up to a token budget.
+    
+    Kept sentences stay in their original order within their passage, and passages
+    left without any sentence are dropped. Passages that already fit are returned
+    unchanged without embedding anything.
+    
+    Args:
+        passages: Context passages with text, metadata and score
+        query_embedding: Embedding of the query
+        embed_fn: Function embedding a list of texts in one call (rows aligned with the texts)
+        max_tokens: Token budget of the kept sentences
+        model: Name of the model whose tokenizer counts tokens
+    
+    Returns:
+        Passages with their text reduced to the kept sentences
+    """
+    sentences = []  # (passage position, sentence, tokens)
+    for position, passage in enumerate(passages):
+        for sentence in split_sentences(passage["text"]):
+            sentences.append((position, sentence, count_tokens(sentence, model)))
+    
+    if sum(tokens for _, _, tokens in sentences) <= max_tokens:
+        return passages
+    
+    # Cosine similarity of every sentence to the query, from one batched encoder call
+    embeddings = np.asarray(embed_fn([sentence for _, sentence, _ in sentences]), dtype=np.float32)
+    query_vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vector)
+    similarities = embeddings @ query_vector / np.maximum(norms, 1e-12)
+    
+    # Greedy fill by similarity; a sentence that does not fit is skipped so shorter ones still can
+    keep = np.zeros(len(sentences), dtype=bool)
+    used_tokens = 0
+    for i in np.argsort(-similarities, kind="stable"):
+        tokens = sentences[i][2]
+        if used_tokens + tokens > max_tokens:
+            continue
+        keep[i] = True
+        used_tokens += tokens
+    
+    kept_sentences = [[] for _ in passages]
+    for (position, sentence, _), kept in zip(sentences, keep):
+        if kept:
+            kept_sentences[position].append(sentence)
+    
+    return [{**passage, "text": " ".join(kept)}
+            for passage, kept in zip(passages, kept_sentences) if kept]
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Context Packer Module
+
+This module packs retrieved chunks into a token budget for the LLM prompt,
+merging consecutive chunks of the same source and removing their overlap.
+"""
+
+from typing import List, Dict, Any
+
+from .token_counter import count_tokens
+
+# Shorter suffix/prefix matches are more likely coincidence than chunk overlap
+MIN_GUESSED_OVERLAP = 10
+
+# Joins chunks that do not overlap, e.g. where the splitter dropped a paragraph break
+CHUNK_SEPARATOR = "\n"
+
+def chunk_tokens(document: Dict[str, Any], model: str = "gpt-3.5-turbo") -> int:
+    """
+    Get the token count of a chunk, precomputed at index time if available.
+    
+    Args:
+        document: Document chunk with text and metadata
+        model: Name of the model whose tokenizer is used otherwise
+    
+    Returns:
+        Number of tokens
+    """
+    token_count = document["metadata"].get("token_count")
+    return token_count if token_count is not None else count_tokens(document["text"], model)
+
+def overlap_length(previous: Dict[str, Any], following: Dict[str, Any]) -> int:
+    """
+    Get the number of leading characters of a chunk repeated from the end of the previous one.
+    
+    Args:
+        previous: Earlier chunk of the same source
+        following: The chunk directly after it
+    
+    Returns:
+        Length of the duplicated text at the start of `following` (0 if there is none,
+        including when the chunks are separated by a gap)
+    """
+    previous_start = previous["metadata"].get("start_index")
+    following_start = following["metadata"].get("start_index")
+    if previous_start is not None and following_start is not None:
+        # Offsets recorded at index time give the overlap directly
+        overlap = previous_start + len(previous["text"]) - following_start
+        return max(0, min(overlap, len(following["text"])))
+    
+    # Indexes built without offsets: longest suffix of the previous chunk that starts the next one
+    previous_text, following_text = previous["text"], following["text"]
+    for length in range(min(len(previous_text), len(following_text)), MIN_GUESSED_OVERLAP - 1, -1):
+        if previous_text.endswith(following_text[:length]):
+            return length
+    return 0
+
+def continuation(previous: Dict[str, Any], following: Dict[str, Any]) -> str:
+    """
+    Get the text that continues a passage ending with `previous` by the chunk after it.
+    
+    Args:
+        previous: Earlier chunk of the same source and page
+        following: The chunk directly after it
+    
+    Returns:
+        `following` without the overlap, or prefixed with CHUNK_SEPARATOR if there is no overlap
+    """
+    overlap = overlap_length(previous, following)
+    if overlap > 0:
+        return following["text"][overlap:]
+    return CHUNK_SEPARATOR + following["text"]
+
+def merge_chunks(documents: List[Dict[str, Any]], metadata: Dict[str, Any],
+                 model: str = "gpt-3.5-turbo") -> Dict[str, Any]:
+    """
+    Merge consecutive chunks of one source into a single chunk, removing their overlap.
+    
+    Chunks that do not overlap are joined with CHUNK_SEPARATOR.
+    
+    Args:
+        documents: Consecutive chunks in chunk order
+        metadata: Metadata of the merged chunk (e.g. that of the chunk the others were added to)
+        model: Name of the model whose tokenizer counts tokens
+    
+    Returns:
+        Chunk with the merged text, and the metadata with its chunk ids and token count
+    """
+    text = documents[0]["text"]
+    for previous, following in zip(documents, documents[1:]):
+        if previous["metadata"].get("page") == following["metadata"].get("page"):
+            text += continuation(previous, following)
+        else:
+            # Offsets restart on every page, so chunks of different pages are only joined
+            text += CHUNK_SEPARATOR + following["text"]
+    
+    metadata = dict(metadata)
+    # The merged text no longer starts at the offset of `metadata`
+    metadata["start_index"] = None
+    metadata["chunk_ids"] = [document["metadata"].get("chunk_id") for document in documents]
+    metadata["token_count"] = count_tokens(text, model)
+    return {"text": text, "metadata": metadata}
+
+def pack_context(results: List[Dict[str, Any]], max_tokens: int,
+                 model: str = "gpt-3.5-turbo") -> List[Dict[str, Any]]:
+    """
+    Select chunks greedily by score within a token budget, then merge adjacent ones.
+    
+    Args:
+        results: Retrieval results with document and score
+        max_tokens: Token budget of the packed context
+        model: Name of the model whose tokenizer counts tokens
+    
+    Returns:
+        Passages ordered by their best score, each with text, metadata (source and page),
+        score, chunk ids and token count
+    """
+    # Greedy fill by score; a chunk that does not fit is skipped so smaller ones still can
+    selected = []
+    used_tokens = 0
+    for result in sorted(results, key=lambda x: x["score"], reverse=True):
+        tokens = chunk_tokens(result["document"], model)
+        if used_tokens + tokens > max_tokens:
+            continue
+        selected.append(result)
+        used_tokens += tokens
+    
+    # Merge runs of consecutive chunks of the same source and page
+    selected.sort(key=lambda x: (str(x["document"]["metadata"].get("source")),
+                                 str(x["document"]["metadata"].get("page")),
+                                 x["document"]["metadata"].get("chunk_id", -1)))
+    passages = []
+    previous = None
+    for result in selected:
+        doc = result["document"]
+        metadata = doc["metadata"]
+        chunk_id = metadata.get("chunk_id")
+        
+        if (previous is not None and chunk_id is not None
+                and metadata.get("source") == previous["metadata"].get("source")
+                and metadata.get("page") == previous["metadata"].get("page")
+                and chunk_id == previous["metadata"].get("chunk_id", -2) + 1):
+            passage = passages[-1]
+            passage["text"] += continuation(previous, doc)
+            passage["score"] = max(passage["score"], result["score"])
+            passage["chunk_ids"].append(chunk_id)
+        else:
+            passages.append({
+                "text": doc["text"],
+                "metadata": {"source": metadata.get("source", "Unknown"), "page": metadata.get("page", "")},
+                "score": result["score"],
+                "chunk_ids": [chunk_id]
+            })
+        previous = doc
+    
+    for passage in passages:
+        passage["token_count"] = count_tokens(passage["text"], model)
+    
+    passages.sort(key=lambda x: x["score"], reverse=True)
+    return passages
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Conversation Module
+
+This module builds retrieval embeddings from the current turn of a conversation
+and its recent turns.
+"""
+
+import numpy as np
+
+def combine_turn_embeddings(embeddings: np.ndarray, decay: float = 0.5) -> np.ndarray:
+    """
+    Combine the embeddings of a conversation's turns into one query embedding.
+    
+    Turns are weighted by recency: the current turn by 1, the turn before it by
+    `decay`, the one before that by `decay` squared, and so on. Each embedding is
+    normalized first, and the result is scaled back to the norm of the current turn.
+    
+    Args:
+        embeddings: Matrix of turn embeddings, oldest first and the current turn last
+        decay: Weight ratio between consecutive turns (0 ignores the history)
+    
+    Returns:
+        Combined query embedding
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    weights = decay ** np.arange(len(embeddings) - 1, -1, -1, dtype=np.float32)
+    
+    combined = (weights[:, None] * (embeddings / norms)).sum(axis=0)
+    return combined * (norms[-1, 0] / max(float(np.linalg.norm(combined)), 1e-12))
\ No newline at end of file
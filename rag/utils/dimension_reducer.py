@@ -0,0 +1,141 @@
+"""
+Dimension Reducer Module
+
+This module reduces embedding dimension before indexing, either with a PCA
+projection learned at index time or by truncating to the leading dimensions.
+"""
+
+from typing import Dict, Any
+
+import numpy as np
+
+class DimensionReducer:
+    """Learned PCA (or truncation) transform applied to document and query embeddings."""
+    
+    METHODS = ("pca", "truncate")
+    
+    def __init__(self, target_dim: int, method: str = "pca", max_fit_samples: int = 100000):
+        """
+        Initialize the DimensionReducer.
+        
+        Args:
+            target_dim: Dimension of the reduced embeddings
+            method: "pca" (learned projection) or "truncate" (keep the first dimensions)
+            max_fit_samples: Maximum number of embeddings used to fit the projection
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported dimension reduction method: {method}")
+        
+        self.target_dim = target_dim
+        self.method = method
+        self.max_fit_samples = max_fit_samples
+        self.mean = None
+        self.components = None
+        self.explained_variance_ratio = None
+    
+    @property
+    def is_fitted(self) -> bool:
+        """Whether the transform is ready to use."""
+        return self.method == "truncate" or self.components is not None
+    
+    def fit(self, embeddings: np.ndarray) -> 'DimensionReducer':
+        """
+        Learn the projection from a sample of embeddings.
+        
+        Args:
+            embeddings: Float32 matrix of embeddings
+        
+        Returns:
+            The fitted reducer
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.target_dim > embeddings.shape[1]:
+            raise ValueError(f"Cannot reduce {embeddings.shape[1]}-dimensional embeddings to {self.target_dim}")
+        
+        if self.method == "truncate":
+            return self
+        
+        if embeddings.shape[0] > self.max_fit_samples:
+            rows = np.random.default_rng(0).choice(embeddings.shape[0], self.max_fit_samples, replace=False)
+            embeddings = embeddings[rows]
+        
+        # Eigendecomposition of the (dimension x dimension) covariance matrix
+        self.mean = embeddings.mean(axis=0)
+        centered = (embeddings - self.mean).astype(np.float64)
+        covariance = centered.T @ centered / max(1, centered.shape[0] - 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        
+        order = np.argsort(eigenvalues)[::-1][:self.target_dim]
+        self.components = np.ascontiguousarray(eigenvectors[:, order].T, dtype=np.float32)
+        total_variance = eigenvalues.sum()
+        self.explained_variance_ratio = float(eigenvalues[order].sum() / total_variance) if total_variance > 0 else 1.0
+        return self
+    
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Reduce embeddings.
+        
+        Args:
+            embeddings: Float32 matrix (or single vector) of full-dimension embeddings
+        
+        Returns:
+            Contiguous float32 matrix (or vector) of reduced embeddings
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        
+        if self.method == "truncate":
+            reduced = embeddings[..., :self.target_dim]
+        else:
+            if self.components is None:
+                raise RuntimeError("DimensionReducer must be fitted before use")
+            reduced = (embeddings - self.mean) @ self.components.T
+        
+        return np.ascontiguousarray(reduced, dtype=np.float32)
+    
+    def config(self) -> Dict[str, Any]:
+        """
+        Get the reducer settings for the vector store metadata.
+        
+        Returns:
+            Dictionary with method, target dimension and explained variance
+        """
+        return {
+            "method": self.method,
+            "target_dim": self.target_dim,
+            "explained_variance_ratio": self.explained_variance_ratio
+        }
+    
+    def save(self, path: str) -> None:
+        """
+        Save the learned projection.
+        
+        Args:
+            path: Path of the .npz file to write
+        """
+        arrays = {}
+        if self.components is not None:
+            arrays = {"mean": self.mean, "components": self.components}
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+    
+    @classmethod
+    def load(cls, path: str, config: Dict[str, Any]) -> 'DimensionReducer':
+        """
+        Load a reducer saved with `save`.
+        
+        Args:
+            path: Path of the .npz file
+            config: Settings as returned by `config`
+        
+        Returns:
+            Loaded DimensionReducer
+        """
+        instance = cls(target_dim=config["target_dim"], method=config["method"])
+        instance.explained_variance_ratio = config.get("explained_variance_ratio")
+        
+        with np.load(path) as arrays:
+            if "components" in arrays:
+                instance.mean = arrays["mean"]
+                instance.components = arrays["components"]
+        
+        return instance
\ No newline at end of file
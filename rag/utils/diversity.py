@@ -0,0 +1,108 @@
+"""
+Diversity Module
+
+This module re-ranks search candidates so the kept results are not near-duplicates:
+maximal marginal relevance (MMR) over their vectors, and a cap on the results per group
+(e.g. per source file).
+"""
+
+from typing import Optional
+
+import numpy as np
+
+def group_codes(groups) -> np.ndarray:
+    """
+    Map group labels to integer codes.
+    
+    Args:
+        groups: Group label of each candidate (e.g. source file names; None is a label too)
+    
+    Returns:
+        Int64 array of codes aligned with `groups`
+    """
+    _, codes = np.unique(np.array([str(group) for group in groups], dtype=object), return_inverse=True)
+    return codes.astype(np.int64)
+
+def cap_per_group(codes: np.ndarray, k: int, max_per_group: int) -> np.ndarray:
+    """
+    Keep the first `k` candidates, skipping those beyond `max_per_group` of their group.
+    
+    Args:
+        codes: Group code of each candidate, candidates ordered best first
+        k: Number of candidates to keep
+        max_per_group: Maximum number of candidates kept per group
+    
+    Returns:
+        Positions of the kept candidates, best first
+    """
+    n = len(codes)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    
+    # Rank of each candidate within its group, from a stable sort by group
+    order = np.argsort(codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    group_sizes = np.diff(np.r_[starts, n])
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = np.arange(n) - np.repeat(starts, group_sizes)
+    
+    return np.flatnonzero(ranks < max_per_group)[:k]
+
+def mmr_select(query_vector: np.ndarray, candidate_vectors: np.ndarray, k: int,
+               lambda_mult: float = 0.5, codes: Optional[np.ndarray] = None,
+               max_per_group: Optional[int] = None) -> np.ndarray:
+    """
+    Select candidates by maximal marginal relevance.
+    
+    Each step picks the candidate maximizing
+    lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected)),
+    with cosine similarities computed once as NumPy matrices.
+    
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: Matrix with one candidate vector per row
+        k: Number of candidates to select
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+        codes: Group code of each candidate, for `max_per_group`
+        max_per_group: Maximum number of selected candidates per group (unbounded if None)
+    
+    Returns:
+        Positions of the selected candidates in selection order
+    """
+    if not 0.0 <= lambda_mult <= 1.0:
+        raise ValueError(f"lambda_mult must be in [0, 1], got {lambda_mult}")
+    
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    n = vectors.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32).ravel()
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+    
+    # Highest similarity of each candidate to the selection; -1 (the cosine minimum) while empty
+    redundancy = np.full(n, -1.0, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    if max_per_group is not None:
+        group_counts = np.zeros(int(codes.max()) + 1, dtype=np.int64)
+    
+    selected = []
+    for _ in range(min(k, n)):
+        scores = np.where(available, lambda_mult * relevance - (1.0 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        if not available[best]:
+            break
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+        
+        if max_per_group is not None:
+            group_counts[codes[best]] += 1
+            if group_counts[codes[best]] >= max_per_group:
+                available &= codes != codes[best]
+    
+    return np.array(selected, dtype=np.int64)
\ No newline at end of file
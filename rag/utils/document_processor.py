@@ -6,27 +6,40 @@ This module handles loading documents from various formats and chunking them for
 
 import os
 from typing import List, Dict, Any, Optional
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
+
+from .token_counter import count_tokens
 
 class DocumentProcessor:
     """Class for loading and processing documents."""
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, token_model: str = "gpt-3.5-turbo"):
         """
         Initialize the DocumentProcessor.
         
         Args:
             chunk_size: The size of text chunks for splitting documents
             chunk_overlap: The overlap between chunks
+            token_model: LLM whose tokenizer counts the tokens of each chunk
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-        )
+        self.token_model = token_model
+        self._text_splitter = None
+    
+    @property
+    def text_splitter(self):
+        """The text splitter, created on first use so importing LangChain is deferred."""
+        if self._text_splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+                # Offsets let overlapping neighbours be merged without duplicating text
+                add_start_index=True,
+            )
+        return self._text_splitter
     
     def load_document(self, file_path: str) -> List[Dict[str, Any]]:
         """
@@ -38,6 +51,8 @@ class DocumentProcessor:
         Returns:
             List of document chunks with text and metadata
         """
+        from langchain_community.document_loaders import TextLoader, PyPDFLoader
+        
         file_ext = os.path.splitext(file_path)[1].lower()
         
         try:
@@ -71,7 +86,9 @@ class DocumentProcessor:
                     "metadata": {
                         "source": chunk.metadata.get("source", filename),
                         "page": chunk.metadata.get("page", None),
-                        "chunk_id": i
+                        "chunk_id": i,
+                        "start_index": chunk.metadata.get("start_index"),
+                        "token_count": count_tokens(chunk.page_content, self.token_model)
                     }
                 })
             
@@ -0,0 +1,313 @@
+"""
+Embedding Cache Module
+
+This module provides a persistent on-disk cache for document embeddings so that
+unchanged chunks are not re-embedded on every indexing run, and an in-process
+LRU cache for query embeddings.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so trivial whitespace changes still hit the cache.
+    
+    Args:
+        text: Raw text
+    
+    Returns:
+        Normalized text
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def hash_text(text: str) -> str:
+    """
+    Compute the cache key hash for a text.
+    
+    Args:
+        text: Raw text
+    
+    Returns:
+        Hex digest of the normalized text
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache keyed by (model name, normalized text hash)."""
+    
+    # SQLite limits the number of bound parameters per statement
+    LOOKUP_BATCH_SIZE = 500
+    
+    def __init__(self, path: str, max_entries: int = 100000, write_batch_size: int = 1000):
+        """
+        Initialize the EmbeddingCache.
+        
+        Args:
+            path: Path of the SQLite file backing the cache
+            max_entries: Maximum number of cached embeddings before LRU eviction
+            write_batch_size: Number of rows written per transaction
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.max_entries = max_entries
+        self.write_batch_size = write_batch_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, "
+            "text_hash TEXT NOT NULL, "
+            "dim INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+    
+    def get_many(self, model: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Look up cached embeddings for a list of texts.
+        
+        Args:
+            model: Name of the embedding model
+            texts: List of texts to look up
+        
+        Returns:
+            Mapping from position in `texts` to cached float32 embedding
+        """
+        if not texts:
+            return {}
+        
+        # Several positions may share the same text
+        positions: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            positions.setdefault(hash_text(text), []).append(i)
+        
+        found = {}
+        hashes = list(positions)
+        now = time.time()
+        
+        with self._lock:
+            for start in range(0, len(hashes), self.LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                
+                for text_hash, blob in rows:
+                    embedding = np.frombuffer(blob, dtype=np.float32)
+                    for i in positions[text_hash]:
+                        found[i] = embedding
+                
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        [(now, model, text_hash) for text_hash, _ in rows]
+                    )
+            self._conn.commit()
+            
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        
+        return found
+    
+    def put_many(self, model: str, texts: List[str], embeddings: Union[np.ndarray, List[List[float]]]) -> None:
+        """
+        Store embeddings for a list of texts, evicting old entries if needed.
+        
+        Args:
+            model: Name of the embedding model
+            texts: List of texts that were embedded
+            embeddings: Embeddings matching `texts`
+        """
+        if not texts:
+            return
+        
+        now = time.time()
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        rows = [
+            (model, hash_text(text), matrix.shape[1], matrix[i].tobytes(), now)
+            for i, text in enumerate(texts)
+        ]
+        
+        with self._lock:
+            for start in range(0, len(rows), self.write_batch_size):
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows[start:start + self.write_batch_size]
+                )
+                self._conn.commit()
+            self._evict()
+    
+    def _evict(self) -> None:
+        """Remove least recently used entries beyond `max_entries`."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        self.evictions += excess
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry count, hits, misses, hit rate and evictions
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
+    
+    def clear(self) -> None:
+        """Remove all cached embeddings and reset statistics."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+class QueryEmbeddingCache:
+    """Bounded in-process LRU cache with TTL for query embeddings."""
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600.0):
+        """
+        Initialize the QueryEmbeddingCache.
+        
+        Args:
+            max_entries: Maximum number of cached query embeddings
+            ttl_seconds: Time after which an entry expires (never if None)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.model = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._entries = OrderedDict()  # normalized query -> (expiry time, float32 vector)
+        self._lock = threading.Lock()
+    
+    def _check_model(self, model: str) -> None:
+        """Drop all entries if the embedding model changed."""
+        if model != self.model:
+            self._entries.clear()
+            self.model = model
+    
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        """
+        Look up a cached query embedding.
+        
+        Args:
+            model: Name of the embedding model
+            query: Query text
+        
+        Returns:
+            Cached float32 embedding, or None on a miss
+        """
+        key = normalize_text(query)
+        
+        with self._lock:
+            self._check_model(model)
+            entry = self._entries.get(key)
+            
+            if entry is not None and entry[0] is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, model: str, query: str, embedding: Any) -> None:
+        """
+        Store a query embedding.
+        
+        Args:
+            model: Name of the embedding model
+            query: Query text
+            embedding: Embedding vector of the query
+        """
+        key = normalize_text(query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        expiry = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        
+        with self._lock:
+            self._check_model(model)
+            self._entries[key] = (expiry, vector)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry count, hits, misses, hit rate and evictions
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
+    
+    def clear(self) -> None:
+        """Remove all cached query embeddings and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
\ No newline at end of file
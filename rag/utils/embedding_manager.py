@@ -4,88 +4,579 @@ Embedding Manager Module
 This module handles generating embeddings for document chunks and queries.
 """
 
-from typing import List, Dict, Any, Union
+import os
+import time
+import threading
+from typing import List, Dict, Any, Union, Optional
 import numpy as np
-from langchain_openai import OpenAIEmbeddings
-from sentence_transformers import SentenceTransformer
+
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_pool import EmbeddingWorkerPool
+from .openai_embedding_client import OpenAIEmbeddingClient
+
+# Dimensions of the OpenAI embedding models
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072
+}
+
+# OpenAI model used when OpenAI embeddings are requested with a local model name (e.g. the default)
+DEFAULT_OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+def resolve_model_name(model_name: str, use_openai: bool = False) -> str:
+    """
+    Get the name of the embedding model that is actually used.
+    
+    Args:
+        model_name: Requested model name
+        use_openai: Whether OpenAI's embedding API is used
+    
+    Returns:
+        The requested name, or DEFAULT_OPENAI_EMBEDDING_MODEL if OpenAI is used with a
+        name that is not an OpenAI embedding model
+    """
+    if use_openai and model_name not in OPENAI_EMBEDDING_DIMENSIONS and not model_name.startswith("text-embedding-"):
+        return DEFAULT_OPENAI_EMBEDDING_MODEL
+    return model_name
 
 class EmbeddingManager:
     """Class for generating and managing embeddings."""
     
-    def __init__(self, use_openai: bool = False, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, use_openai: bool = False, model_name: str = "all-MiniLM-L6-v2",
+                 cache_path: Optional[str] = None, cache_max_entries: int = 100000,
+                 query_cache_size: int = 1024, query_cache_ttl: Optional[float] = 3600.0,
+                 batch_size: int = 32, max_batch_tokens: Optional[int] = None,
+                 sort_by_length: bool = True, show_progress: bool = False,
+                 backend: str = "torch", onnx_model_dir: Optional[str] = None,
+                 onnx_quantize: bool = False, num_workers: int = 0, pool_min_texts: int = 1024,
+                 openai_max_concurrency: int = 4, openai_tokens_per_minute: int = 1000000,
+                 openai_checkpoint_dir: Optional[str] = None,
+                 model_cache_folder: Optional[str] = None, offline: bool = False):
         """
-        Initialize the EmbeddingManager.
+        Initialize the EmbeddingManager. The model itself is loaded on first use (or by `load`).
         
         Args:
             use_openai: Whether to use OpenAI's embedding API (requires API key)
-            model_name: Name of the local model to use if not using OpenAI
+            model_name: Name of the embedding model (with OpenAI, a name that is not an OpenAI
+                embedding model selects DEFAULT_OPENAI_EMBEDDING_MODEL)
+            cache_path: Path of an on-disk embedding cache (disabled if None)
+            cache_max_entries: Maximum number of embeddings kept in the on-disk cache
+            query_cache_size: Maximum number of cached query embeddings (disabled if 0)
+            query_cache_ttl: Seconds before a cached query embedding expires (never if None)
+            batch_size: Maximum number of texts per encoder batch
+            max_batch_tokens: Maximum padded tokens (batch size x longest text) per batch
+            sort_by_length: Group texts of similar token length to minimize padding
+            show_progress: Print progress after each encoder batch
+            backend: Local inference backend, "torch" (Sentence Transformers) or "onnx" (ONNX Runtime)
+            onnx_model_dir: Directory of the exported ONNX model (exported on first use if missing)
+            onnx_quantize: Whether the ONNX backend uses a dynamically int8-quantized model
+            num_workers: Number of worker processes for large local embedding jobs (disabled if 0)
+            pool_min_texts: Minimum number of texts for a job to be sent to the worker pool
+            openai_max_concurrency: Maximum number of OpenAI embedding requests in flight
+            openai_tokens_per_minute: Tokens-per-minute budget for OpenAI embedding requests
+            openai_checkpoint_dir: Directory for resumable OpenAI embedding checkpoints (disabled if None)
+            model_cache_folder: Local directory where model weights are cached
+            offline: Only load model weights from the local cache, never from the network
         """
         self.use_openai = use_openai
+        self.client = None
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.sort_by_length = sort_by_length
+        self.show_progress = show_progress
+        
+        if not use_openai and backend not in ("torch", "onnx"):
+            raise ValueError(f"Unsupported embedding backend: {backend}")
+        
+        self.model_name = resolve_model_name(model_name, use_openai)
+        self.backend = "openai" if use_openai else backend
+        self.onnx_model_dir = onnx_model_dir
+        self.onnx_quantize = onnx_quantize
+        self.model_cache_folder = model_cache_folder
+        self.offline = offline
+        
+        self._embedder = None
+        self._load_lock = threading.Lock()
+        self.load_seconds = None
+        self._memory_bytes = None
+        
+        # Encoder latency, counting cache misses only
+        self._stats_lock = threading.Lock()
+        self._encode_stats = {"calls": 0, "texts": 0, "seconds": 0.0}
         
         if use_openai:
-            self.embedder = OpenAIEmbeddings(model="text-embedding-ada-002")
-        else:
-            self.embedder = SentenceTransformer(model_name)
+            # Bulk embedding goes through the batching client
+            self.client = OpenAIEmbeddingClient(
+                model=self.model_name,
+                max_concurrency=openai_max_concurrency,
+                tokens_per_minute=openai_tokens_per_minute,
+                checkpoint_dir=openai_checkpoint_dir
+            )
+        
+        # Worker processes are started on the first large job
+        self.num_workers = 0 if use_openai else num_workers
+        self.pool_min_texts = pool_min_texts
+        self._pool = None
+        self._worker_kwargs = {
+            "model_name": model_name,
+            "batch_size": batch_size,
+            "max_batch_tokens": max_batch_tokens,
+            "sort_by_length": sort_by_length,
+            "backend": backend,
+            "onnx_model_dir": onnx_model_dir,
+            "onnx_quantize": onnx_quantize,
+            "model_cache_folder": model_cache_folder,
+            "offline": offline
+        }
+        
+        self._dimension = None
+        
+        # Identity of the embedding space, used to key cached embeddings
+        self.model_id = self.make_model_id(model_name, use_openai, backend, onnx_quantize)
+        
+        self.cache = EmbeddingCache(cache_path, max_entries=cache_max_entries) if cache_path else None
+        self.query_cache = QueryEmbeddingCache(query_cache_size, query_cache_ttl) if query_cache_size > 0 else None
+    
+    @staticmethod
+    def make_model_id(model_name: str, use_openai: bool = False, backend: str = "torch",
+                      onnx_quantize: bool = False) -> str:
+        """
+        Get the model id of the manager these settings create, without creating it.
+        
+        Args:
+            model_name: Requested model name
+            use_openai: Whether OpenAI's embedding API is used
+            backend: Local inference backend
+            onnx_quantize: Whether the ONNX backend uses a quantized model
+        
+        Returns:
+            Model id
+        """
+        model_name = resolve_model_name(model_name, use_openai)
+        if not use_openai and backend == "onnx" and onnx_quantize:
+            return f"{model_name}:onnx-int8"
+        return model_name
+    
+    @property
+    def embedder(self):
+        """The embedding model, loaded on first access."""
+        if self._embedder is None:
+            with self._load_lock:
+                if self._embedder is None:
+                    start_time = time.perf_counter()
+                    self._embedder = self._load_embedder()
+                    self.load_seconds = time.perf_counter() - start_time
+        return self._embedder
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the embedding model has been loaded."""
+        return self._embedder is not None
+    
+    def _load_embedder(self):
+        """
+        Import and construct the embedding model for the configured backend.
+        
+        Returns:
+            The embedding model
+        """
+        if self.offline:
+            # Only use weights that are already in the local cache
+            os.environ["HF_HUB_OFFLINE"] = "1"
+            os.environ["TRANSFORMERS_OFFLINE"] = "1"
+        
+        # Heavy dependencies are imported here so importing this module stays fast
+        if self.backend == "openai":
+            from langchain_openai import OpenAIEmbeddings
+            return OpenAIEmbeddings(model=self.model_name)
+        
+        if self.backend == "onnx":
+            # Optional dependency, only imported when requested
+            from .onnx_embedder import OnnxEmbedder
+            return OnnxEmbedder(self.model_name, model_dir=self.onnx_model_dir, quantize=self.onnx_quantize)
+        
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name, cache_folder=self.model_cache_folder)
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def load(self, warmup_batch_size: int = 8) -> float:
+        """
+        Load the model and run a warm-up batch so the first real request is not slowed down.
+        
+        Args:
+            warmup_batch_size: Number of texts in the warm-up batch (no warm-up if 0)
+            
+        Returns:
+            Seconds spent loading and warming up
+        """
+        start_time = time.perf_counter()
+        self.get_dimension()
+        
+        # Remote embeddings have no local kernels to warm up
+        if warmup_batch_size > 0 and not self.use_openai:
+            # Straight through the encoder, so the warm-up is not counted in encode_stats
+            warmup_texts = [f"warm-up sentence number {i}" for i in range(warmup_batch_size)]
+            self._encode_batched(warmup_texts)
+            self.embedder.encode(warmup_texts[0], convert_to_numpy=True)
+        
+        return time.perf_counter() - start_time
+    
+    def unload(self) -> None:
+        """Release the model (and worker pool); it is loaded again on next use."""
+        with self._load_lock:
+            self.close()
+            self._embedder = None
+            self._memory_bytes = None
+    
+    def memory_bytes(self) -> int:
+        """
+        Estimate the memory held by the loaded model.
+        
+        Returns:
+            Size of the model weights in bytes (0 if not loaded or remote)
+        """
+        embedder = self._embedder
+        if embedder is None or self.use_openai:
+            return 0
+        
+        if self._memory_bytes is None:
+            if hasattr(embedder, "parameters"):
+                # torch module: parameters and buffers
+                tensors = list(embedder.parameters()) + list(embedder.buffers())
+                self._memory_bytes = sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+            else:
+                # ONNX session: size of the model file
+                model_path = getattr(embedder, "model_path", None)
+                self._memory_bytes = os.path.getsize(model_path) if model_path and os.path.exists(model_path) else 0
+        return self._memory_bytes
+    
+    def _record_encode(self, num_texts: int, seconds: float) -> None:
+        """Add one encoder call to the latency statistics."""
+        with self._stats_lock:
+            self._encode_stats["calls"] += 1
+            self._encode_stats["texts"] += num_texts
+            self._encode_stats["seconds"] += seconds
+    
+    def encode_stats(self) -> Dict[str, Any]:
+        """
+        Get encoder latency statistics.
+        
+        Returns:
+            Dictionary with encoder call and text counts, total and mean latency, and load time
+        """
+        with self._stats_lock:
+            stats = dict(self._encode_stats)
+        stats["mean_latency_ms"] = stats["seconds"] * 1000.0 / stats["calls"] if stats["calls"] else 0.0
+        stats["load_seconds"] = self.load_seconds
+        return stats
+    
+    def get_dimension(self) -> int:
+        """
+        Get the dimension of the embeddings produced by the loaded model.
+        
+        Returns:
+            Embedding dimension
+        """
+        if self._dimension is None:
+            if self.use_openai:
+                # OpenAI models do not report their dimension; embed a probe text if it is not known
+                self._dimension = OPENAI_EMBEDDING_DIMENSIONS.get(self.model_name)
+                if self._dimension is None:
+                    self._dimension = len(self.embedder.embed_query("dimension probe"))
+            else:
+                self._dimension = int(self.embedder.get_sentence_embedding_dimension())
+        return self._dimension
+    
+    def generate_embeddings(self, texts: List[str], as_list: bool = False,
+                            use_cache: bool = True) -> Union[np.ndarray, List[List[float]]]:
         """
         Generate embeddings for a list of texts.
         
         Args:
             texts: List of text strings to embed
+            as_list: Return a list of Python float lists instead of a matrix (for legacy callers)
+            use_cache: Read and write the on-disk cache; texts that are not worth persisting
+                (e.g. sentence fragments embedded per query) bypass it
             
         Returns:
-            List of embedding vectors
+            Contiguous float32 matrix of shape (len(texts), dimension), or a list of vectors if `as_list`
         """
         if not texts:
-            return []
+            return [] if as_list else np.empty((0, 0), dtype=np.float32)
+        
+        if self.cache is None or not use_cache:
+            embeddings = self._encode(texts)
+        else:
+            # Only embed the texts that are not already cached
+            cached = self.cache.get_many(self.model_id, texts)
+            missing = [i for i in range(len(texts)) if i not in cached]
+            
+            new_embeddings = None
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                new_embeddings = self._encode(missing_texts)
+                self.cache.put_many(self.model_id, missing_texts, new_embeddings)
             
+            dimension = new_embeddings.shape[1] if new_embeddings is not None else len(next(iter(cached.values())))
+            embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+            for i, embedding in cached.items():
+                embeddings[i] = embedding
+            if missing:
+                embeddings[missing] = new_embeddings
+        
+        return embeddings.tolist() if as_list else embeddings
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with the configured backend, bypassing the cache.
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            Contiguous float32 matrix of embeddings
+        """
+        start_time = time.perf_counter()
         if self.use_openai:
             # OpenAI embeddings
-            embeddings = self.embedder.embed_documents(texts)
-            return embeddings
+            embeddings = self.client.embed(texts)
+        elif self.num_workers > 0 and len(texts) >= self.pool_min_texts:
+            # Large jobs are spread over the worker processes
+            embeddings = self._get_pool().encode(texts)
         else:
             # Sentence Transformers embeddings
-            embeddings = self.embedder.encode(texts)
-            return embeddings.tolist()
+            embeddings = self._encode_batched(texts)
+        
+        self._record_encode(len(texts), time.perf_counter() - start_time)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def _get_pool(self) -> EmbeddingWorkerPool:
+        """
+        Get the worker pool, starting it on first use.
+        
+        Returns:
+            The embedding worker pool
+        """
+        if self._pool is None:
+            self._pool = EmbeddingWorkerPool(self.num_workers, manager_kwargs=self._worker_kwargs)
+        return self._pool
+    
+    def close(self) -> None:
+        """Shut down the embedding worker pool, if it was started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+    
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """
+        Compute the (truncated) token length of each text.
+        
+        Args:
+            texts: List of text strings
+            
+        Returns:
+            Token length of each text
+        """
+        tokenizer = getattr(self.embedder, "tokenizer", None)
+        max_length = getattr(self.embedder, "max_seq_length", None)
+        
+        if tokenizer is None:
+            # Rough whitespace estimate if the model exposes no tokenizer
+            lengths = [len(text.split()) + 2 for text in texts]
+        else:
+            encoded = tokenizer(texts, add_special_tokens=True, truncation=max_length is not None,
+                                max_length=max_length)
+            lengths = [len(ids) for ids in encoded["input_ids"]]
+        
+        if max_length is not None:
+            lengths = [min(length, max_length) for length in lengths]
+        return lengths
+    
+    def _make_batches(self, lengths: List[int]) -> List[List[int]]:
+        """
+        Split text positions into encoder batches.
+        
+        Texts are ordered by decreasing token length (if `sort_by_length`), so each batch
+        pads to a similar length. A batch is closed when it reaches `batch_size` texts or
+        when adding another text would exceed `max_batch_tokens` padded tokens.
+        
+        Args:
+            lengths: Token length of each text
+            
+        Returns:
+            List of batches, each a list of positions into the original texts
+        """
+        order = list(range(len(lengths)))
+        if self.sort_by_length:
+            order.sort(key=lambda i: lengths[i], reverse=True)
+        
+        batches = []
+        batch = []
+        longest = 0
+        for i in order:
+            padded = max(longest, lengths[i]) * (len(batch) + 1)
+            if batch and (len(batch) >= self.batch_size or
+                          (self.max_batch_tokens is not None and padded > self.max_batch_tokens)):
+                batches.append(batch)
+                batch = []
+                longest = 0
+            batch.append(i)
+            longest = max(longest, lengths[i])
+        
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _encode_batched(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts with the local model in length-bucketed batches.
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            Float32 matrix of embeddings in the original order of `texts`
+        """
+        if self.sort_by_length or self.max_batch_tokens is not None:
+            lengths = self._token_lengths(texts)
+        else:
+            lengths = [0] * len(texts)
+        batches = self._make_batches(lengths)
+        
+        embeddings = None
+        done = 0
+        for batch in batches:
+            batch_embeddings = self.embedder.encode([texts[i] for i in batch], batch_size=len(batch),
+                                                    convert_to_numpy=True)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+            
+            # Restore the original order
+            embeddings[batch] = batch_embeddings
+            
+            done += len(batch)
+            if self.show_progress:
+                print(f"Embedded {done}/{len(texts)} chunks")
+        
+        return embeddings
+    
+    def cache_stats(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get statistics of the embedding caches.
+        
+        Returns:
+            Statistics of the on-disk and query caches (None for disabled caches)
+        """
+        return {
+            "model": self.model_id,
+            "documents": self.cache.stats() if self.cache is not None else None,
+            "queries": self.query_cache.stats() if self.query_cache is not None else None
+        }
     
-    def generate_query_embedding(self, query: str) -> List[float]:
+    def generate_query_embedding(self, query: str, as_list: bool = False) -> Union[np.ndarray, List[float]]:
         """
         Generate embedding for a single query text.
         
         Args:
             query: Query text to embed
+            as_list: Return a list of Python floats instead of an array (for legacy callers)
             
         Returns:
-            Embedding vector
+            Float32 embedding vector, or a list of floats if `as_list`
         """
+        if self.query_cache is not None:
+            cached = self.query_cache.get(self.model_id, query)
+            if cached is not None:
+                return cached.tolist() if as_list else cached
+        
+        start_time = time.perf_counter()
         if self.use_openai:
             # OpenAI query embedding
             embedding = self.embedder.embed_query(query)
-            return embedding
         else:
             # Sentence Transformers query embedding
-            embedding = self.embedder.encode(query)
-            return embedding.tolist()
+            embedding = self.embedder.encode(query, convert_to_numpy=True)
+        self._record_encode(1, time.perf_counter() - start_time)
+        
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if self.query_cache is not None:
+            self.query_cache.put(self.model_id, query, embedding)
+        
+        return embedding.tolist() if as_list else embedding
+    
+    def generate_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for several queries with a single encoder call.
+        
+        Args:
+            queries: List of query texts
+            
+        Returns:
+            Float32 matrix whose rows are aligned with `queries`
+        """
+        cached = {}
+        if self.query_cache is not None:
+            for i, query in enumerate(queries):
+                embedding = self.query_cache.get(self.model_id, query)
+                if embedding is not None:
+                    cached[i] = embedding
+        
+        missing = [i for i in range(len(queries)) if i not in cached]
+        new_embeddings = None
+        if missing:
+            missing_queries = [queries[i] for i in missing]
+            start_time = time.perf_counter()
+            if self.use_openai:
+                new_embeddings = self.client.embed(missing_queries)
+            else:
+                new_embeddings = self.embedder.encode(missing_queries, batch_size=len(missing_queries),
+                                                      convert_to_numpy=True)
+            self._record_encode(len(missing_queries), time.perf_counter() - start_time)
+            new_embeddings = np.asarray(new_embeddings, dtype=np.float32)
+            
+            if self.query_cache is not None:
+                for query, embedding in zip(missing_queries, new_embeddings):
+                    self.query_cache.put(self.model_id, query, embedding)
+        
+        dimension = new_embeddings.shape[1] if new_embeddings is not None else next(iter(cached.values())).shape[0]
+        embeddings = np.empty((len(queries), dimension), dtype=np.float32)
+        for i, embedding in cached.items():
+            embeddings[i] = embedding
+        if missing:
+            embeddings[missing] = new_embeddings
+        
+        return embeddings
+    
+    def embed_documents(self, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Generate the embedding matrix for document chunks.
+        
+        Args:
+            documents: List of document chunks with text and metadata
+            
+        Returns:
+            Float32 matrix whose rows are aligned with `documents`
+        """
+        return self.generate_embeddings([doc["text"] for doc in documents])
     
     def process_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Process documents by adding embeddings to each chunk.
         
+        Prefer `embed_documents` and passing the matrix to `VectorStore.add_documents`;
+        this method is kept for callers that expect an embedding on every chunk.
+        
         Args:
             documents: List of document chunks with text and metadata
             
         Returns:
-            Documents with embeddings added
+            Documents with embeddings added (rows of one float32 matrix, not copies)
         """
         if not documents:
             return []
-            
-        # Extract text from documents
-        texts = [doc["text"] for doc in documents]
         
         # Generate embeddings
-        embeddings = self.generate_embeddings(texts)
+        embeddings = self.embed_documents(documents)
         
         # Add embeddings to documents
         for i, doc in enumerate(documents):
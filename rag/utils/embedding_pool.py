@@ -0,0 +1,144 @@
+"""
+Embedding Pool Module
+
+This module spreads local embedding of large text collections over several worker
+processes. Each worker loads the model once; texts and embeddings are exchanged
+through shared memory so the embedding matrix is never pickled.
+"""
+
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+# Per-process state of a worker
+_worker_manager = None
+
+def _init_worker(manager_kwargs: Dict[str, Any], num_threads: int) -> None:
+    """Load the embedding model once in a worker process."""
+    global _worker_manager
+    
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+    
+    from .embedding_manager import EmbeddingManager
+    _worker_manager = EmbeddingManager(**manager_kwargs)
+
+def _worker_dimension() -> int:
+    """Get the embedding dimension of the worker's model."""
+    return int(_worker_manager.generate_query_embedding("dimension probe").shape[0])
+
+def _worker_encode(task: Tuple[str, str, str, int, int, int, int]) -> int:
+    """
+    Embed one range of texts from the shared input buffer into the shared output buffer.
+    
+    Returns:
+        Number of texts embedded
+    """
+    text_name, offsets_name, output_name, num_texts, dimension, start, end = task
+    
+    # The parent owns (and unlinks) the blocks; workers only attach to them
+    text_block = shared_memory.SharedMemory(name=text_name)
+    offsets_block = shared_memory.SharedMemory(name=offsets_name)
+    output_block = shared_memory.SharedMemory(name=output_name)
+    try:
+        offsets = np.ndarray((num_texts + 1,), dtype=np.int64, buffer=offsets_block.buf)
+        data = text_block.buf
+        texts = [bytes(data[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(start, end)]
+        
+        output = np.ndarray((num_texts, dimension), dtype=np.float32, buffer=output_block.buf)
+        output[start:end] = _worker_manager._encode(texts)
+        
+        # Release the buffer views before closing the blocks
+        del offsets, output, data
+    finally:
+        text_block.close()
+        offsets_block.close()
+        output_block.close()
+    
+    return end - start
+
+class EmbeddingWorkerPool:
+    """Pool of worker processes that each hold a copy of a local embedding model."""
+    
+    def __init__(self, num_workers: Optional[int] = None, chunk_size: int = 256,
+                 manager_kwargs: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the EmbeddingWorkerPool and load the model in every worker.
+        
+        Args:
+            num_workers: Number of worker processes (CPU count if None)
+            chunk_size: Number of texts handed to a worker at a time
+            manager_kwargs: Keyword arguments for the per-worker EmbeddingManager
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        
+        # Workers embed directly; caching stays in the parent
+        kwargs = dict(manager_kwargs or {})
+        kwargs.update(cache_path=None, query_cache_size=0, num_workers=0)
+        
+        # Split the cores between workers instead of oversubscribing them
+        num_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        
+        context = mp.get_context("spawn")
+        self._pool = context.Pool(self.num_workers, initializer=_init_worker, initargs=(kwargs, num_threads))
+        self.dimension = self._pool.apply(_worker_dimension)
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts across the worker processes.
+        
+        Args:
+            texts: List of text strings to embed
+        
+        Returns:
+            Float32 matrix of embeddings in the order of `texts`
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        
+        blocks = []
+        try:
+            text_block = shared_memory.SharedMemory(create=True, size=max(1, int(offsets[-1])))
+            blocks.append(text_block)
+            text_block.buf[:offsets[-1]] = b"".join(encoded)
+            
+            offsets_block = shared_memory.SharedMemory(create=True, size=offsets.nbytes)
+            blocks.append(offsets_block)
+            np.ndarray(offsets.shape, dtype=np.int64, buffer=offsets_block.buf)[:] = offsets
+            
+            output_block = shared_memory.SharedMemory(create=True, size=len(texts) * self.dimension * 4)
+            blocks.append(output_block)
+            
+            tasks = [
+                (text_block.name, offsets_block.name, output_block.name, len(texts), self.dimension,
+                 start, min(start + self.chunk_size, len(texts)))
+                for start in range(0, len(texts), self.chunk_size)
+            ]
+            # Unordered so that fast workers keep pulling new chunks
+            for _ in self._pool.imap_unordered(_worker_encode, tasks):
+                pass
+            
+            output = np.ndarray((len(texts), self.dimension), dtype=np.float32, buffer=output_block.buf)
+            embeddings = output.copy()
+            del output
+            return embeddings
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        self._pool.close()
+        self._pool.join()
\ No newline at end of file
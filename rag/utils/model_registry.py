@@ -0,0 +1,160 @@
+"""
+Model Registry Module
+
+This module shares embedding models between the collections that use them and
+unloads the least recently used ones when a memory budget is exceeded.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from .embedding_manager import EmbeddingManager
+
+class EmbeddingModelRegistry:
+    """Registry of embedding managers, one per model, with LRU unloading under a memory budget."""
+    
+    def __init__(self, memory_budget_mb: Optional[float] = None, **manager_kwargs):
+        """
+        Initialize the EmbeddingModelRegistry.
+        
+        Args:
+            memory_budget_mb: Maximum memory of the loaded models (unbounded if None)
+            **manager_kwargs: Settings passed to every EmbeddingManager (cache, batching, backend, ...)
+        """
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb is not None else None
+        self.manager_kwargs = manager_kwargs
+        
+        # Managers by model id, least recently used first
+        self._managers = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self.unloads = 0
+    
+    def register(self, embedding_manager: EmbeddingManager) -> EmbeddingManager:
+        """
+        Add an existing embedding manager so it is shared and counted against the budget.
+        
+        Args:
+            embedding_manager: Embedding manager to register
+        
+        Returns:
+            The registered manager (an already registered one for the same model takes precedence)
+        """
+        with self._lock:
+            existing = self._managers.get(embedding_manager.model_id)
+            if existing is not None:
+                return existing
+            self._managers[embedding_manager.model_id] = embedding_manager
+            self._last_used[embedding_manager.model_id] = time.time()
+            return embedding_manager
+    
+    def get(self, model_name: str, use_openai: bool = False) -> EmbeddingManager:
+        """
+        Get the shared embedding manager of a model, loading the model if needed.
+        
+        Args:
+            model_name: Name of the embedding model
+            use_openai: Whether it is an OpenAI embedding model
+        
+        Returns:
+            Loaded EmbeddingManager
+        """
+        model_id = EmbeddingManager.make_model_id(model_name, use_openai,
+                                                  backend=self.manager_kwargs.get("backend", "torch"),
+                                                  onnx_quantize=self.manager_kwargs.get("onnx_quantize", False))
+        with self._lock:
+            if model_id not in self._managers:
+                # Constructing a manager is cheap; the model itself loads below
+                self._managers[model_id] = EmbeddingManager(use_openai=use_openai, model_name=model_name,
+                                                            **self.manager_kwargs)
+            embedding_manager = self._managers[model_id]
+            self._managers.move_to_end(model_id)
+            self._last_used[model_id] = time.time()
+        
+        # Loading happens outside the registry lock so other models stay usable
+        embedding_manager.get_dimension()
+        self._enforce_budget(keep=model_id)
+        return embedding_manager
+    
+    def touch(self, embedding_manager: EmbeddingManager) -> None:
+        """
+        Mark a model as recently used, unloading others if it was reloaded past the budget.
+        
+        Args:
+            embedding_manager: Embedding manager that was used
+        """
+        with self._lock:
+            if embedding_manager.model_id not in self._managers:
+                return
+            self._managers.move_to_end(embedding_manager.model_id)
+            self._last_used[embedding_manager.model_id] = time.time()
+        self._enforce_budget(keep=embedding_manager.model_id)
+    
+    def memory_bytes(self) -> int:
+        """
+        Get the memory held by the loaded models.
+        
+        Returns:
+            Total estimated model memory in bytes
+        """
+        with self._lock:
+            managers = list(self._managers.values())
+        return sum(embedding_manager.memory_bytes() for embedding_manager in managers)
+    
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        """Unload least recently used models until the loaded models fit the budget."""
+        if self.memory_budget is None:
+            return
+        
+        with self._lock:
+            managers = list(self._managers.items())
+        total = sum(embedding_manager.memory_bytes() for _, embedding_manager in managers)
+        
+        for model_id, embedding_manager in managers:
+            if total <= self.memory_budget:
+                break
+            if model_id == keep or not embedding_manager.is_loaded:
+                continue
+            size = embedding_manager.memory_bytes()
+            # Unloaded managers stay registered and reload on their next use
+            embedding_manager.unload()
+            total -= size
+            self.unloads += 1
+            print(f"Unloaded embedding model {model_id} ({size / (1024 * 1024):.1f} MB)")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-model statistics.
+        
+        Returns:
+            Dictionary with the memory budget and usage, unload count, and per-model
+            load state, memory, load time and encoder latency
+        """
+        with self._lock:
+            managers = list(self._managers.items())
+            last_used = dict(self._last_used)
+        
+        models = {}
+        for model_id, embedding_manager in managers:
+            models[model_id] = {
+                "loaded": embedding_manager.is_loaded,
+                "memory_mb": embedding_manager.memory_bytes() / (1024 * 1024),
+                "last_used": last_used.get(model_id),
+                **embedding_manager.encode_stats()
+            }
+        
+        return {
+            "memory_budget_mb": self.memory_budget / (1024 * 1024) if self.memory_budget is not None else None,
+            "memory_mb": sum(model["memory_mb"] for model in models.values()),
+            "unloads": self.unloads,
+            "models": models
+        }
+    
+    def close(self) -> None:
+        """Shut down the worker pools of all models."""
+        with self._lock:
+            managers = list(self._managers.values())
+        for embedding_manager in managers:
+            embedding_manager.close()
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+ONNX Embedder Module
+
+This module runs Sentence Transformers models with ONNX Runtime on CPU, optionally
+with dynamic int8 quantization. It requires `onnxruntime` and `transformers`;
+exporting a model additionally requires `torch`.
+"""
+
+import os
+from typing import List, Union, Optional
+
+import numpy as np
+import onnxruntime as ort
+from transformers import AutoTokenizer
+
+# Default location of exported models
+DEFAULT_ONNX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rag", "onnx")
+
+def _hub_model_id(model_name: str) -> str:
+    """Map a short Sentence Transformers name to its Hugging Face Hub id."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+def export_onnx_model(model_name: str, output_dir: str, opset: int = 14) -> str:
+    """
+    Export a transformer model and its fast tokenizer to ONNX.
+    
+    Args:
+        model_name: Sentence Transformers or Hugging Face model name
+        output_dir: Directory to write `model.onnx` and the tokenizer files to
+        opset: ONNX opset version
+    
+    Returns:
+        Path of the exported model
+    """
+    import torch
+    from transformers import AutoModel
+    
+    os.makedirs(output_dir, exist_ok=True)
+    model_id = _hub_model_id(model_name)
+    
+    tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+    tokenizer.save_pretrained(output_dir)
+    
+    model = AutoModel.from_pretrained(model_id)
+    model.eval()
+    
+    dummy = tokenizer(["an example sentence"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    
+    model_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    
+    print(f"Exported {model_id} to {model_path}")
+    return model_path
+
+def quantize_onnx_model(model_path: str, output_path: str) -> str:
+    """
+    Apply dynamic int8 quantization to an exported model.
+    
+    Args:
+        model_path: Path of the float32 ONNX model
+        output_path: Path to write the quantized model to
+    
+    Returns:
+        Path of the quantized model
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    print(f"Quantized {model_path} to {output_path}")
+    return output_path
+
+class OnnxEmbedder:
+    """Sentence embedding model running on ONNX Runtime, compatible with SentenceTransformer.encode."""
+    
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", model_dir: Optional[str] = None,
+                 quantize: bool = False, normalize: bool = True, max_seq_length: int = 256,
+                 num_threads: Optional[int] = None):
+        """
+        Initialize the OnnxEmbedder, exporting and quantizing the model on first use.
+        
+        Args:
+            model_name: Sentence Transformers model name
+            model_dir: Directory with the exported model (defaults to ~/.cache/rag/onnx/<model>)
+            quantize: Whether to use a dynamically int8-quantized model
+            normalize: Whether to L2-normalize embeddings (all-MiniLM-L6-v2 does)
+            max_seq_length: Maximum number of tokens per text
+            num_threads: Number of intra-op threads (ONNX Runtime default if None)
+        """
+        self.model_name = model_name
+        self.model_dir = model_dir or os.path.join(DEFAULT_ONNX_DIR, model_name.replace("/", "_"))
+        self.quantize = quantize
+        self.normalize = normalize
+        self.max_seq_length = max_seq_length
+        
+        model_path = os.path.join(self.model_dir, "model.onnx")
+        if not os.path.exists(model_path):
+            export_onnx_model(model_name, self.model_dir)
+        
+        if quantize:
+            quantized_path = os.path.join(self.model_dir, "model.int8.onnx")
+            if not os.path.exists(quantized_path):
+                quantize_onnx_model(model_path, quantized_path)
+            model_path = quantized_path
+        self.model_path = model_path
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir, use_fast=True)
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        """
+        Get the dimension of the produced embeddings.
+        
+        Returns:
+            Embedding dimension
+        """
+        return int(self.encode("dimension probe").shape[0])
+    
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """
+        Encode texts into embeddings (mean pooling over token embeddings).
+        
+        Args:
+            sentences: A text or list of texts
+            batch_size: Number of texts per inference call
+            convert_to_numpy: Accepted for SentenceTransformer compatibility; always numpy
+        
+        Returns:
+            Float32 embedding vector for a single text, or matrix for a list of texts
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            outputs.append(self._encode_batch(texts[start:start + batch_size]))
+        
+        embeddings = np.vstack(outputs) if outputs else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Run one padded batch through the model."""
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length,
+                                 return_tensors="np")
+        feed = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+            feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+        
+        token_embeddings = self.session.run(None, feed)[0]
+        
+        # Mean pooling over non-padding tokens
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        embeddings = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32, copy=False)
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+OpenAI Embedding Client Module
+
+This module embeds large text collections through the OpenAI embeddings HTTP API
+with token-budgeted batches, concurrent requests, rate-limit handling and
+resumable checkpoints.
+"""
+
+import os
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import requests
+
+from .token_counter import count_tokens
+
+class _RateLimiter:
+    """Token bucket limiting the number of tokens sent per minute."""
+    
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.available = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens: int) -> None:
+        """Block until `tokens` can be sent."""
+        # A batch larger than the bucket is let through once the bucket is full
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                wait = (tokens - self.available) / self.rate
+            time.sleep(wait)
+
+class OpenAIEmbeddingClient:
+    """Concurrent, rate-limit-aware client for the OpenAI embeddings endpoint."""
+    
+    def __init__(self,
+                 model: str = "text-embedding-ada-002",
+                 api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 max_batch_tokens: int = 8000,
+                 max_batch_size: int = 2048,
+                 max_concurrency: int = 4,
+                 tokens_per_minute: int = 1000000,
+                 max_retries: int = 8,
+                 checkpoint_dir: Optional[str] = None,
+                 timeout: float = 60.0):
+        """
+        Initialize the OpenAIEmbeddingClient.
+        
+        Args:
+            model: Name of the OpenAI embedding model
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            base_url: API base URL (defaults to OPENAI_BASE_URL or the public API), e.g. a local mock
+            max_batch_tokens: Maximum estimated tokens per request
+            max_batch_size: Maximum number of texts per request
+            max_concurrency: Maximum number of requests in flight
+            tokens_per_minute: Tokens-per-minute budget of the API key
+            max_retries: Maximum retries of a batch on 429 and server errors
+            checkpoint_dir: Directory where completed batches are saved so an interrupted run can resume
+            timeout: Request timeout in seconds
+        """
+        self.model = model
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.checkpoint_dir = checkpoint_dir
+        self.timeout = timeout
+        
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        
+        self._limiter = _RateLimiter(tokens_per_minute)
+        self._session = requests.Session()
+        
+        # A 429 pauses every worker, not only the one that received it
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "rate_limited": 0, "tokens": 0, "resumed_batches": 0}
+    
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Split texts into token-budgeted batches.
+        
+        Args:
+            texts: List of texts
+        
+        Returns:
+            List of batches, each a list of positions into `texts`
+        """
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text, self.model)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts, running several batches concurrently.
+        
+        Args:
+            texts: List of texts to embed
+        
+        Returns:
+            Float32 matrix whose rows are aligned with `texts`
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        batches = self.make_batches(texts)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = list(executor.map(lambda batch: self._embed_batch([texts[i] for i in batch]), batches))
+        
+        embeddings = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        for batch, result in zip(batches, results):
+            embeddings[batch] = result
+        return embeddings
+    
+    def _checkpoint_path(self, texts: List[str]) -> Optional[str]:
+        """Get the checkpoint file of a batch."""
+        if not self.checkpoint_dir:
+            return None
+        digest = hashlib.sha256()
+        digest.update(self.model.encode("utf-8"))
+        for text in texts:
+            digest.update(b"\0")
+            digest.update(text.encode("utf-8"))
+        return os.path.join(self.checkpoint_dir, f"{digest.hexdigest()}.npy")
+    
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed one batch, resuming from its checkpoint if it already completed."""
+        checkpoint = self._checkpoint_path(texts)
+        if checkpoint and os.path.exists(checkpoint):
+            with self._lock:
+                self._stats["resumed_batches"] += 1
+            return np.load(checkpoint)
+        
+        embeddings = self._request(texts)
+        
+        if checkpoint:
+            # Write then rename so an interrupted run never leaves a partial checkpoint
+            temp_path = f"{checkpoint}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, embeddings)
+            os.replace(temp_path, checkpoint)
+        
+        return embeddings
+    
+    def _request(self, texts: List[str]) -> np.ndarray:
+        """Send one embeddings request, retrying on rate limits and server errors."""
+        tokens = sum(count_tokens(text, self.model) for text in texts)
+        
+        for attempt in range(self.max_retries + 1):
+            # Honour a pause requested by any worker's 429
+            delay = self._pause_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._limiter.acquire(tokens)
+            
+            error = None
+            try:
+                response = self._session.post(
+                    f"{self.base_url}/embeddings",
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    json={"model": self.model, "input": texts},
+                    timeout=self.timeout
+                )
+            except requests.exceptions.RequestException as e:
+                response = None
+                error = e
+            
+            with self._lock:
+                self._stats["requests"] += 1
+            
+            if response is not None and response.status_code == 200:
+                data = sorted(response.json()["data"], key=lambda item: item["index"])
+                with self._lock:
+                    self._stats["tokens"] += tokens
+                return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+            
+            if response is not None and response.status_code != 429 and response.status_code < 500:
+                # Client errors will not succeed on retry
+                response.raise_for_status()
+            
+            if attempt == self.max_retries:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+            
+            wait = self._retry_delay(response, attempt)
+            with self._lock:
+                self._stats["retries"] += 1
+                if response is not None and response.status_code == 429:
+                    self._stats["rate_limited"] += 1
+                    self._pause_until = max(self._pause_until, time.monotonic() + wait)
+            time.sleep(wait)
+    
+    @staticmethod
+    def _retry_delay(response: Optional[requests.Response], attempt: int) -> float:
+        """Get the delay before a retry from Retry-After headers or exponential backoff."""
+        if response is not None:
+            retry_after_ms = response.headers.get("retry-after-ms")
+            retry_after = response.headers.get("Retry-After")
+            try:
+                if retry_after_ms is not None:
+                    return float(retry_after_ms) / 1000.0
+                if retry_after is not None:
+                    return float(retry_after)
+            except ValueError:
+                pass
+        # Exponential backoff with jitter
+        return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get request statistics.
+        
+        Returns:
+            Dictionary with request, retry, rate-limit, token and resume counts
+        """
+        with self._lock:
+            return dict(self._stats)
\ No newline at end of file
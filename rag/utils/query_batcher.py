@@ -0,0 +1,179 @@
+"""
+Query Batcher Module
+
+This module collects queries that arrive concurrently from request threads and
+embeds (and optionally searches) them as one batch.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Callable
+
+import numpy as np
+
+class _PendingQuery:
+    """A query waiting to be batched."""
+    
+    __slots__ = ("text", "top_k", "arrival", "future")
+    
+    def __init__(self, text: str, top_k: Optional[int]):
+        self.text = text
+        self.top_k = top_k
+        self.arrival = time.monotonic()
+        self.future = Future()
+
+class QueryBatcher:
+    """Dynamic micro-batching scheduler in front of the query encoder."""
+    
+    def __init__(self,
+                 embed_fn: Callable[[List[str]], np.ndarray],
+                 search_fn: Optional[Callable[[np.ndarray, int], List[List[Dict[str, Any]]]]] = None,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0):
+        """
+        Initialize the QueryBatcher and start its worker thread.
+        
+        Args:
+            embed_fn: Function embedding a list of queries into a float32 matrix
+            search_fn: Function searching a matrix of query embeddings for the top k results
+                of each row (searches are not batched if None)
+            max_batch_size: Maximum number of queries per batch
+            max_wait_ms: Maximum time a query waits for others before its batch is flushed (a query
+                arriving while no other is queued is flushed at once)
+        """
+        self.embed_fn = embed_fn
+        self.search_fn = search_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        
+        self.batches = 0
+        self.queries = 0
+        
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._thread.start()
+    
+    def _submit(self, text: str, top_k: Optional[int] = None) -> Future:
+        """Queue a query and return the future of its result."""
+        if self._closed:
+            raise RuntimeError("QueryBatcher is closed")
+        pending = _PendingQuery(text, top_k)
+        self._queue.put(pending)
+        return pending.future
+    
+    def embed(self, query: str) -> np.ndarray:
+        """
+        Embed a query as part of the next batch.
+        
+        Args:
+            query: Query text
+        
+        Returns:
+            Float32 embedding vector
+        """
+        return self._submit(query).result()
+    
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Embed and search a query as part of the next batch.
+        
+        Args:
+            query: Query text
+            top_k: Number of top results to return
+        
+        Returns:
+            List of document chunks with similarity scores
+        """
+        if self.search_fn is None:
+            raise RuntimeError("QueryBatcher was created without a search function")
+        return self._submit(query, top_k).result()
+    
+    def _collect(self, first: _PendingQuery) -> List[_PendingQuery]:
+        """
+        Gather queries until the batch is full or the oldest query's deadline passes.
+        
+        A query with no other query queued behind it is flushed at once, so a lone
+        request never pays the batching delay; only concurrent traffic waits for the
+        batch to fill.
+        """
+        batch = [first]
+        deadline = first.arrival + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if len(batch) == 1 or remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if pending is None:
+                # Flush what we have, then stop
+                self._queue.put(None)
+                break
+            batch.append(pending)
+        
+        return batch
+    
+    def _run(self) -> None:
+        """Worker loop: collect a batch, process it, repeat."""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            
+            batch = self._collect(first)
+            try:
+                self._process(batch)
+            except Exception as e:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+    
+    def _process(self, batch: List[_PendingQuery]) -> None:
+        """Embed (and search) one batch and fan the results out."""
+        embeddings = self.embed_fn([pending.text for pending in batch])
+        self.batches += 1
+        self.queries += len(batch)
+        
+        searches = [pending for pending in batch if pending.top_k is not None]
+        for i, pending in enumerate(batch):
+            if pending.top_k is None:
+                pending.future.set_result(embeddings[i])
+        
+        if not searches:
+            return
+        
+        # One search at the largest requested k, truncated per query
+        rows = [i for i, pending in enumerate(batch) if pending.top_k is not None]
+        results = self.search_fn(embeddings[rows], max(pending.top_k for pending in searches))
+        for pending, result in zip(searches, results):
+            pending.future.set_result(result[:pending.top_k])
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching statistics.
+        
+        Returns:
+            Dictionary with batch and query counts and the mean batch size
+        """
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
+    
+    def close(self) -> None:
+        """Flush pending queries and stop the worker thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Retrieval Cache Module
+
+This module caches the results of identical retrievals as compact arrays of
+document positions and scores, scoped to the vector store version they came from.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .embedding_cache import normalize_text
+
+class RetrievalCache:
+    """Bounded LRU cache of (query, top_k, options) -> (document positions, scores)."""
+    
+    def __init__(self, max_entries: int = 4096):
+        """
+        Initialize the RetrievalCache.
+        
+        Args:
+            max_entries: Maximum number of cached retrievals
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        # Keys start with the vector store version, so a store mutation makes every older
+        # entry unreachable without touching it; stale entries age out through the LRU
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(index_version: Hashable, query: str, top_k: int, options: Hashable = None) -> Tuple:
+        """
+        Build the cache key of a retrieval.
+        
+        Args:
+            index_version: Version of the searched vector store
+            query: Query text
+            top_k: Number of results
+            options: Other parameters affecting the results (e.g. the collection)
+        
+        Returns:
+            Hashable cache key
+        """
+        return (index_version, normalize_text(query), top_k, options)
+    
+    def get(self, key: Tuple) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Look up cached results.
+        
+        Args:
+            key: Key from `make_key`
+        
+        Returns:
+            Tuple of (document positions, scores), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key: Tuple, results: List[Dict[str, Any]]) -> None:
+        """
+        Store retrieval results as position and score arrays.
+        
+        Args:
+            key: Key from `make_key`
+            results: Search results carrying their document position ("id") and score
+        """
+        ids = np.fromiter((result["id"] for result in results), dtype=np.int64, count=len(results))
+        scores = np.fromiter((result["score"] for result in results), dtype=np.float32, count=len(results))
+        
+        with self._lock:
+            self._entries[key] = (ids, scores)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with entry count, hits, misses, hit rate and evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+    
+    def clear(self) -> None:
+        """Remove all cached results by swapping in an empty table."""
+        with self._lock:
+            self._entries = OrderedDict()
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Token Counter Module
+
+This module counts LLM tokens with tiktoken when it is installed, and estimates
+them from the text length otherwise.
+"""
+
+import threading
+from typing import Dict
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encodings: Dict[str, object] = {}
+_lock = threading.Lock()
+
+def _get_encoding(model: str):
+    """Get (and cache) the tiktoken encoding of a model."""
+    with _lock:
+        if model not in _encodings:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        return _encodings[model]
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Count (or estimate, without tiktoken) the tokens of a text.
+    
+    Args:
+        text: Text to count
+        model: Name of the model whose tokenizer is used
+    
+    Returns:
+        Number of tokens
+    """
+    if tiktoken is not None:
+        return len(_get_encoding(model).encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
\ No newline at end of file
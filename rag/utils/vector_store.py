@@ -7,50 +7,113 @@ This module handles storing and retrieving document embeddings using FAISS.
 import os
 import json
 import pickle
+import itertools
 import numpy as np
 import faiss
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from .dimension_reducer import DimensionReducer
+from .diversity import cap_per_group, group_codes, mmr_select
+
+# Versions are unique across stores, so a replaced store never reuses a version
+_versions = itertools.count(1)
 
 class VectorStore:
     """Class for storing and retrieving document embeddings."""
     
-    def __init__(self, dimension: int = 384):
+    def __init__(self, dimension: int = 384, reducer: Optional[DimensionReducer] = None,
+                 model_id: Optional[str] = None):
         """
         Initialize the VectorStore.
         
         Args:
             dimension: Dimension of the embedding vectors
+            reducer: Optional transform reducing embeddings before they are indexed; it is
+                fitted on the first documents added if not fitted yet
+            model_id: Identity of the embedding model that produced the vectors
         """
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)  # L2 distance
+        self.reducer = reducer
+        self.model_id = model_id
+        # Changes whenever the indexed content changes; caches keyed on it go stale with it
+        self.version = next(_versions)
+        index_dimension = reducer.target_dim if reducer is not None else dimension
+        self.index = faiss.IndexFlatL2(index_dimension)  # L2 distance
         self.documents = []  # Store document data
+        # Adjacency index: (source, chunk_id) -> document position, for neighbour lookups
+        self.chunk_positions = {}
     
-    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+    def add_documents(self, documents: List[Dict[str, Any]], embeddings: Optional[np.ndarray] = None) -> None:
         """
         Add documents to the vector store.
         
         Args:
-            documents: List of document chunks with text, metadata, and embeddings
+            documents: List of document chunks with text and metadata
+            embeddings: Float32 matrix whose rows are aligned with `documents`. If None,
+                each document must carry its own "embedding" (legacy path)
         """
         if not documents:
             return
-            
-        # Extract embeddings
-        embeddings = [np.array(doc["embedding"], dtype=np.float32) for doc in documents]
-        embeddings_matrix = np.vstack(embeddings)
+        
+        if embeddings is None:
+            # Legacy path: stack the per-document embeddings
+            embeddings = np.vstack([doc["embedding"] for doc in documents])
+        
+        # FAISS needs a contiguous float32 matrix; this is a no-op if it already is one
+        embeddings_matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings_matrix.shape[0] != len(documents):
+            raise ValueError(f"Got {embeddings_matrix.shape[0]} embeddings for {len(documents)} documents")
+        
+        if self.reducer is not None:
+            # Learn the projection at index time
+            if not self.reducer.is_fitted:
+                self.reducer.fit(embeddings_matrix)
+            embeddings_matrix = self.reducer.transform(embeddings_matrix)
         
         # Add to FAISS index
         self.index.add(embeddings_matrix)
         
         # Store documents (without embeddings to save memory)
+        start = len(self.documents)
         for doc in documents:
-            doc_copy = doc.copy()
-            # Remove the embedding from stored document to save memory
-            if "embedding" in doc_copy:
-                del doc_copy["embedding"]
-            self.documents.append(doc_copy)
+            self.documents.append({key: value for key, value in doc.items() if key != "embedding"})
+        self._index_chunks(start)
+        
+        self.version = next(_versions)
+    
+    def _index_chunks(self, start: int = 0) -> None:
+        """Add the documents from position `start` on to the adjacency index."""
+        for position in range(start, len(self.documents)):
+            metadata = self.documents[position].get("metadata", {})
+            if metadata.get("chunk_id") is not None:
+                self.chunk_positions[(metadata.get("source"), metadata["chunk_id"])] = position
     
-    def search(self, query_embedding: List[float], top_k: int = 3) -> List[Dict[str, Any]]:
+    def neighbours(self, position: int, window: int = 1) -> List[int]:
+        """
+        Get the positions of the chunks next to a chunk in its source document.
+        
+        Args:
+            position: Document position of the chunk
+            window: Number of chunks taken on each side
+            
+        Returns:
+            Positions of the existing neighbours, nearest first (preceding before following at equal distance)
+        """
+        metadata = self.documents[position]["metadata"]
+        chunk_id = metadata.get("chunk_id")
+        if chunk_id is None:
+            return []
+        
+        source = metadata.get("source")
+        positions = []
+        for distance in range(1, window + 1):
+            for neighbour_id in (chunk_id - distance, chunk_id + distance):
+                neighbour = self.chunk_positions.get((source, neighbour_id))
+                if neighbour is not None:
+                    positions.append(neighbour)
+        return positions
+    
+    def search(self, query_embedding: Union[np.ndarray, List[float]], top_k: int = 3) -> List[Dict[str, Any]]:
         """
         Search for documents similar to the query embedding.
         
@@ -59,30 +122,151 @@ class VectorStore:
             top_k: Number of top results to return
             
         Returns:
-            List of document chunks with similarity scores
+            List of document chunks with similarity scores and index positions ("id")
         """
-        if not self.documents:
-            return []
+        # Convert query embedding to a (1, dimension) float32 matrix
+        query_embedding_np = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        
+        return self.search_batch(query_embedding_np, top_k=top_k)[0]
+    
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        Search for documents similar to each of several query embeddings in one index call.
+        
+        Args:
+            query_embeddings: Float32 matrix with one query embedding per row
+            top_k: Number of top results to return per query
             
-        # Convert query embedding to numpy array
-        query_embedding_np = np.array([query_embedding], dtype=np.float32)
+        Returns:
+            List of search results (as returned by `search`) per query
+        """
+        ids, scores = self.search_ids_batch(query_embeddings, top_k=top_k)
+        return [self.results_from_ids(ids[row], scores[row]) for row in range(ids.shape[0])]
+    
+    def search_ids_batch(self, query_embeddings: np.ndarray, top_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search for the positions and scores of the documents similar to each query embedding.
+        
+        Args:
+            query_embeddings: Float32 matrix with one query embedding per row
+            top_k: Number of top results to return per query
+            
+        Returns:
+            Tuple of (int64 document positions, float32 similarity scores), each of shape
+            (queries, k) with the best match first; missing results have position -1
+        """
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if self.reducer is not None:
+            query_embeddings = self.reducer.transform(query_embeddings)
+        
+        if not self.documents:
+            empty = (query_embeddings.shape[0], 0)
+            return np.empty(empty, dtype=np.int64), np.empty(empty, dtype=np.float32)
         
         # Search the index
-        distances, indices = self.index.search(query_embedding_np, min(top_k, len(self.documents)))
+        distances, indices = self.index.search(query_embeddings, min(top_k, len(self.documents)))
+        
+        # Convert distance to similarity score; L2 results are already ordered best first
+        scores = (1.0 / (1.0 + distances)).astype(np.float32)
+        return indices.astype(np.int64), scores
+    
+    def search_diverse(self, query_embedding: Union[np.ndarray, List[float]], top_k: int = 3,
+                       fetch_k: int = 20, mmr_lambda: Optional[float] = None,
+                       max_per_source: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search for relevant documents that are not near-duplicates of each other.
+        
+        The `fetch_k` nearest documents are re-ranked by maximal marginal relevance over
+        their stored vectors (if `mmr_lambda` is set), keeping at most `max_per_source`
+        documents with the same metadata["source"] (if set).
         
-        # Get the documents for the indices
+        Args:
+            query_embedding: Embedding vector of the query
+            top_k: Number of results to return
+            fetch_k: Number of nearest documents re-ranked
+            mmr_lambda: Trade-off between relevance (1.0) and diversity (0.0); no MMR if None
+            max_per_source: Maximum number of results per source document (unbounded if None)
+            
+        Returns:
+            List of document chunks with similarity scores and positions, highest score first
+        """
+        query_embedding_np = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        ids, scores = self.search_ids_batch(query_embedding_np, top_k=max(fetch_k, top_k))
+        valid = ids[0] != -1
+        ids, scores = ids[0][valid], scores[0][valid]
+        
+        codes = None
+        if max_per_source is not None:
+            codes = group_codes([self.documents[idx]["metadata"].get("source") for idx in ids])
+        
+        if mmr_lambda is not None:
+            # Stored vectors live in the (possibly reduced) index space, so the query is mapped there too
+            if self.reducer is not None:
+                query_embedding_np = self.reducer.transform(query_embedding_np)
+            selected = mmr_select(query_embedding_np, self.index.reconstruct_batch(ids), top_k,
+                                  lambda_mult=mmr_lambda, codes=codes, max_per_group=max_per_source)
+        elif codes is not None:
+            selected = cap_per_group(codes, top_k, max_per_source)
+        else:
+            selected = np.arange(min(top_k, len(ids)))
+        
+        return self.results_from_ids(ids[selected], scores[selected])
+    
+    def range_search(self, query_embedding: Union[np.ndarray, List[float]], min_score: float,
+                     max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search for all documents whose similarity score to the query reaches a threshold.
+        
+        Args:
+            query_embedding: Embedding vector of the query
+            min_score: Minimum similarity score (0 < min_score <= 1)
+            max_results: Maximum number of results, the best ones kept (unbounded if None)
+            
+        Returns:
+            List of document chunks with similarity scores and positions, highest score first
+        """
+        if not 0 < min_score <= 1:
+            raise ValueError(f"min_score must be in (0, 1], got {min_score}")
+        
+        query_embedding_np = np.ascontiguousarray(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+        if self.reducer is not None:
+            query_embedding_np = self.reducer.transform(query_embedding_np)
+        
+        if not self.documents:
+            return []
+        
+        # score = 1 / (1 + distance), so the threshold is a radius on the (squared) L2 distance;
+        # FAISS only returns distances strictly below the radius
+        radius = np.nextafter(np.float32(1.0 / min_score - 1.0), np.float32(np.inf))
+        lims, distances, indices = self.index.range_search(query_embedding_np, float(radius))
+        distances, indices = distances[lims[0]:lims[1]], indices[lims[0]:lims[1]]
+        
+        order = np.argsort(distances, kind="stable")[:max_results]
+        scores = (1.0 / (1.0 + distances[order])).astype(np.float32)
+        return self.results_from_ids(indices[order].astype(np.int64), scores)
+    
+    def results_from_ids(self, ids: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Build search results from document positions and scores.
+        
+        Args:
+            ids: Document positions
+            scores: Similarity scores aligned with `ids`
+            
+        Returns:
+            List of document chunks with similarity scores and positions, highest score first
+        """
         results = []
-        for i, idx in enumerate(indices[0]):
+        for idx, score in zip(ids, scores):
             if idx < len(self.documents) and idx != -1:  # Check if index is valid
-                doc = self.documents[idx]
                 results.append({
-                    "document": doc,
-                    "score": float(1.0 / (1.0 + distances[0][i]))  # Convert distance to similarity score
+                    "id": int(idx),
+                    "document": self.documents[idx],
+                    "score": float(score)
                 })
         
         # Sort by score (highest first)
         results.sort(key=lambda x: x["score"], reverse=True)
-        
         return results
     
     def save(self, directory: str, name: str = "vector_store") -> None:
@@ -104,30 +288,76 @@ class VectorStore:
         with open(docs_path, "wb") as f:
             pickle.dump(self.documents, f)
         
+        # Save the dimension reduction transform
+        metadata = {"dimension": self.dimension, "model": self.model_id}
+        if self.reducer is not None:
+            self.reducer.save(os.path.join(directory, f"{name}.reducer.npz"))
+            metadata["reduction"] = self.reducer.config()
+        
         # Save metadata (dimension, etc.)
         meta_path = os.path.join(directory, f"{name}.meta")
         with open(meta_path, "w") as f:
-            json.dump({"dimension": self.dimension}, f)
+            json.dump(metadata, f)
+    
+    @staticmethod
+    def saved_model(directory: str, name: str = "vector_store") -> Optional[str]:
+        """
+        Get the embedding model a saved vector store was built with.
+        
+        Args:
+            directory: Directory containing the vector store files
+            name: Base name of the saved files
+            
+        Returns:
+            Model identity recorded in the metadata, or None for indexes saved before it was recorded
+        """
+        with open(os.path.join(directory, f"{name}.meta"), "r") as f:
+            return json.load(f).get("model")
     
     @classmethod
-    def load(cls, directory: str, name: str = "vector_store") -> 'VectorStore':
+    def load(cls, directory: str, name: str = "vector_store", expected_model: Optional[str] = None,
+             expected_dimension: Optional[int] = None) -> 'VectorStore':
         """
         Load a vector store from disk.
         
         Args:
             directory: Directory containing the vector store files
             name: Base name of the saved files
+            expected_model: Embedding model queries will be embedded with (not checked if None)
+            expected_dimension: Dimension of that model's embeddings (not checked if None)
             
         Returns:
             Loaded VectorStore
+        
+        Raises:
+            ValueError: If the index was built with a different embedding model
         """
         # Load metadata
         meta_path = os.path.join(directory, f"{name}.meta")
         with open(meta_path, "r") as f:
             metadata = json.load(f)
         
+        # Vectors from another model are not comparable with the query embeddings;
+        # indexes saved before the model was recorded can only be checked by dimension
+        model_id = metadata.get("model")
+        if expected_model is not None and model_id is not None and model_id != expected_model:
+            raise ValueError(f"Index was built with embedding model {model_id}, not {expected_model}")
+        if expected_dimension is not None and metadata["dimension"] != expected_dimension:
+            raise ValueError(f"Index has {metadata['dimension']}-dimensional embeddings, "
+                             f"the embedding model produces {expected_dimension}")
+        if model_id is None:
+            # An older index that passed the checks is recorded with the model it is used with
+            # from now on, so the next save upgrades it and later loads check the model
+            model_id = expected_model
+        
+        # Load the dimension reduction transform
+        reducer = None
+        if metadata.get("reduction"):
+            reducer_path = os.path.join(directory, f"{name}.reducer.npz")
+            reducer = DimensionReducer.load(reducer_path, metadata["reduction"])
+        
         # Create instance
-        instance = cls(dimension=metadata["dimension"])
+        instance = cls(dimension=metadata["dimension"], reducer=reducer, model_id=model_id)
         
         # Load FAISS index
         index_path = os.path.join(directory, f"{name}.index")
@@ -138,4 +368,7 @@ class VectorStore:
         with open(docs_path, "rb") as f:
             instance.documents = pickle.load(f)
         
+        # The adjacency index is derived from the documents, so it is rebuilt rather than saved
+        instance._index_chunks()
+        
         return instance 
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Shared fixtures of the RAG tests.
+"""
+
+import os
+
+import pytest
+
+from fakes import FakeChain, FakeEncoder
+
+# Importing the API builds its engine; keep that from loading models or creating a cache file
+os.environ.setdefault("RAG_PRELOAD", "0")
+os.environ.setdefault("RAG_EMBEDDING_CACHE", "")
+
+@pytest.fixture
+def make_engine(monkeypatch):
+    """Factory of RAG engines whose embedding models are fake encoders and whose LLM is a fake chain."""
+    from rag.models.rag_engine import RAGEngine
+    from rag.utils.embedding_manager import EmbeddingManager
+    
+    monkeypatch.setattr(EmbeddingManager, "_load_embedder", lambda self: FakeEncoder(self.model_name))
+    engines = []
+    
+    def factory(documents=None, chain=None, **kwargs):
+        engine = RAGEngine(**kwargs)
+        engine._generation_chain = chain or FakeChain()
+        engine._llm = object()
+        if documents:
+            embeddings = engine.embedding_manager.embed_documents(documents)
+            engine.vector_store.add_documents(documents, embeddings=embeddings)
+        engines.append(engine)
+        return engine
+    
+    yield factory
+    for engine in engines:
+        if engine.query_batcher is not None:
+            engine.query_batcher.close()
+
+@pytest.fixture
+def api_client(monkeypatch, tmp_path):
+    """Factory of Flask test clients of the RAG API serving a given engine, with DATA_DIR in a temporary directory."""
+    from rag import api
+    
+    def factory(engine):
+        monkeypatch.setattr(api, "rag_engine", engine)
+        monkeypatch.setattr(api, "DATA_DIR", str(tmp_path))
+        return api.app.test_client()
+    
+    return factory
\ No newline at end of file
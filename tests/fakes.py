@@ -0,0 +1,84 @@
+"""
+Deterministic stand-ins for the embedding model and the LLM chain.
+
+They let the tests run offline and exercise only the engine's own logic.
+"""
+
+import re
+import asyncio
+import hashlib
+
+import numpy as np
+
+class FakeEncoder:
+    """Bag-of-words hashing encoder with the SentenceTransformer methods the engine uses."""
+    
+    def __init__(self, model_name: str = "fake", dimension: int = 64):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.calls = 0
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+    
+    def _embed(self, text: str) -> np.ndarray:
+        # Words are hashed with the model name, so each model has its own embedding space
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(f"{self.model_name}:{word}".encode("utf-8")).hexdigest()
+            vector[int(digest, 16) % self.dimension] += 1.0
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+    
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        self.calls += 1
+        if isinstance(texts, str):
+            return self._embed(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.stack([self._embed(text) for text in texts])
+
+class FakeChain:
+    """Generation chain answering with a fixed text, optionally after a delay."""
+    
+    def __init__(self, answer: str = "generated answer", delay: float = 0.0):
+        self.answer = answer
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+        self.inputs = None
+    
+    def invoke(self, inputs):
+        self.calls += 1
+        self.inputs = inputs
+        return self.answer
+    
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        self.inputs = inputs
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.answer
+    
+    def stream(self, inputs):
+        self.calls += 1
+        self.inputs = inputs
+        yield from self.answer.split(" ")
+
+def make_chunks(source: str, texts):
+    """
+    Build consecutive chunks of one source document, with the metadata DocumentProcessor records.
+    
+    The chunks do not overlap; each starts one character (a separating space) after the previous one.
+    """
+    chunks = []
+    start_index = 0
+    for i, text in enumerate(texts):
+        chunks.append({
+            "text": text,
+            "metadata": {"source": source, "page": "", "chunk_id": i, "start_index": start_index}
+        })
+        start_index += len(text) + 1
+    return chunks
\ No newline at end of file
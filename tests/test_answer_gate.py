@@ -0,0 +1,54 @@
+"""
+Tests for answering without the LLM: the confidence gate and the extractive fast path.
+"""
+
+from fakes import FakeChain, make_chunks
+from rag.models.rag_engine import NO_CONTEXT_ANSWER
+from rag.utils.answer_gate import is_lookup_question
+
+DOCUMENTS = make_chunks("glossary.txt", [
+    "what is faiss faiss is a library for vector similarity search",
+    "embeddings map text to vectors of numbers",
+    "a token budget limits the size of the llm context"
+])
+
+def test_low_confidence_skips_the_llm(make_engine):
+    chain = FakeChain()
+    engine = make_engine(DOCUMENTS, chain=chain, min_answer_score=0.9)
+    
+    response = engine.answer_question("completely unrelated gardening tips", top_k=2)
+    
+    assert response["answer"] == NO_CONTEXT_ANSWER
+    assert response["has_context"] is False
+    assert response["sources"] == []
+    assert chain.calls == 0
+    assert engine.answer_path_stats()["low_confidence"]["requests"] == 1
+
+def test_confident_lookup_is_answered_with_the_passage(make_engine):
+    chain = FakeChain()
+    engine = make_engine(DOCUMENTS, chain=chain, extractive_min_score=0.5)
+    
+    response = engine.answer_question("what is faiss", top_k=2)
+    
+    assert response["extractive"] is True
+    assert response["answer"] == DOCUMENTS[0]["text"]
+    assert response["k"] == 1
+    assert chain.calls == 0
+    assert engine.answer_path_stats()["extractive"]["requests"] == 1
+
+def test_other_questions_go_to_the_llm(make_engine):
+    chain = FakeChain()
+    engine = make_engine(DOCUMENTS, chain=chain, min_answer_score=0.1, extractive_min_score=0.5)
+    
+    response = engine.answer_question("why is faiss fast for vector similarity search", top_k=2)
+    
+    assert response["answer"] == chain.answer
+    assert chain.calls == 1
+    assert engine.answer_path_stats()["llm"]["requests"] == 1
+
+def test_lookup_questions():
+    assert is_lookup_question("What is FAISS?")
+    assert is_lookup_question("define token budget")
+    assert not is_lookup_question("How does FAISS search work?")
+    assert not is_lookup_question("What is the difference between FAISS and Annoy?")
+    assert not is_lookup_question("what " + "very " * 20 + "long question")
\ No newline at end of file
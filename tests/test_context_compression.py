@@ -0,0 +1,24 @@
+"""
+Tests for compressing the LLM context to the sentences most similar to the query.
+"""
+
+from fakes import make_chunks
+
+DOCUMENTS = make_chunks("guide.txt", [
+    "Vector search finds similar chunks. The weather was nice that day. Lunch was served at noon.",
+    "FAISS builds vector indexes for search. Parking is free on weekends. The office closes at six."
+])
+
+def test_compression_keeps_relevant_sentences_without_caching_them(make_engine, tmp_path):
+    engine = make_engine(DOCUMENTS, embedding_cache_path=str(tmp_path / "cache.sqlite"),
+                         compression_max_tokens=20)
+    cache = engine.embedding_manager.cache
+    entries = cache.stats()["entries"]
+    
+    results = engine.retrieve("how does vector search work", top_k=2)
+    context = engine.format_context(results, "how does vector search work")
+    
+    assert "Vector search finds similar chunks." in context
+    assert "Parking is free on weekends." not in context
+    # Sentence embeddings are computed per query and never written to the on-disk cache
+    assert cache.stats()["entries"] == entries
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Tests for packing retrieved chunks into a token budget.
+"""
+
+from rag.utils.context_packer import CHUNK_SEPARATOR, overlap_length, pack_context
+
+def chunk(chunk_id, text, start_index=None, token_count=5, source="notes.txt", page=""):
+    return {
+        "text": text,
+        "metadata": {"source": source, "page": page, "chunk_id": chunk_id,
+                     "start_index": start_index, "token_count": token_count}
+    }
+
+def result(document, score):
+    return {"document": document, "score": score}
+
+def test_overlap_is_stripped_once():
+    first = chunk(0, "alpha beta gamma delta", start_index=0)
+    second = chunk(1, "gamma delta epsilon", start_index=11)
+    
+    passages = pack_context([result(first, 0.9), result(second, 0.8)], max_tokens=100)
+    
+    assert len(passages) == 1
+    assert passages[0]["text"] == "alpha beta gamma delta epsilon"
+    assert passages[0]["chunk_ids"] == [0, 1]
+
+def test_gap_between_chunks_keeps_a_separator():
+    first = chunk(0, "Teams value problem-solving.", start_index=0)
+    second = chunk(1, "## Machine Learning", start_index=30)
+    
+    assert overlap_length(first, second) == 0
+    passages = pack_context([result(first, 0.9), result(second, 0.8)], max_tokens=100)
+    
+    assert passages[0]["text"] == "Teams value problem-solving." + CHUNK_SEPARATOR + "## Machine Learning"
+
+def test_overlap_is_guessed_without_offsets():
+    first = chunk(0, "the index stores vectors for search")
+    second = chunk(1, "vectors for search and their metadata")
+    unrelated = chunk(2, "a new paragraph starts here")
+    
+    passages = pack_context([result(first, 0.9), result(second, 0.8), result(unrelated, 0.7)], max_tokens=100)
+    
+    assert passages[0]["text"] == ("the index stores vectors for search and their metadata"
+                                   + CHUNK_SEPARATOR + "a new paragraph starts here")
+
+def test_budget_skips_chunks_that_do_not_fit():
+    best = chunk(0, "best chunk", token_count=6)
+    large = chunk(5, "large chunk", token_count=8)
+    small = chunk(9, "small chunk", token_count=3)
+    
+    passages = pack_context([result(best, 0.9), result(large, 0.8), result(small, 0.7)], max_tokens=10)
+    
+    # The large chunk does not fit after the best one, but the smaller one still does
+    assert [passage["text"] for passage in passages] == ["best chunk", "small chunk"]
+    assert sum(passage["token_count"] for passage in passages) <= 10
+
+def test_only_consecutive_chunks_of_the_same_page_are_merged():
+    first = chunk(0, "first chunk", start_index=0)
+    third = chunk(2, "third chunk", start_index=30)
+    other_page = chunk(1, "other page", start_index=12, page=2)
+    
+    passages = pack_context([result(first, 0.9), result(third, 0.8), result(other_page, 0.7)], max_tokens=100)
+    
+    assert [passage["text"] for passage in passages] == ["first chunk", "third chunk", "other page"]
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Tests for conversation-aware retrieval and the caching of follow-up questions.
+"""
+
+import numpy as np
+
+from fakes import FakeChain, make_chunks
+from rag.utils.conversation import combine_turn_embeddings
+
+DOCUMENTS = make_chunks("manual.txt", [
+    "the battery charges in two hours",
+    "the screen brightness adjusts automatically",
+    "the warranty covers the battery for one year"
+])
+
+def test_combined_embedding_is_weighted_by_recency():
+    turns = np.array([[1.0, 0.0], [0.0, 2.0]])
+    
+    combined = combine_turn_embeddings(turns, decay=0.5)
+    
+    assert np.isclose(np.linalg.norm(combined), 2.0)
+    assert combined[1] > combined[0] > 0
+    np.testing.assert_allclose(combine_turn_embeddings(turns, decay=0.0), turns[-1])
+
+def test_follow_up_is_served_from_the_answer_cache(make_engine):
+    chain = FakeChain()
+    engine = make_engine(DOCUMENTS, chain=chain, answer_cache_size=16, temperature=0)
+    history = ["how long does the battery charge"]
+    
+    first = engine.answer_question("is it covered", top_k=1, history=history)
+    second = engine.answer_question("is it covered", top_k=1, history=history)
+    
+    assert first.get("cached") is None
+    assert second["cached"] is True
+    assert chain.calls == 1
+    assert engine.answer_path_stats()["cached"]["requests"] == 1
+
+def test_follow_up_in_another_conversation_is_not_served_from_the_cache(make_engine):
+    chain = FakeChain()
+    engine = make_engine(DOCUMENTS, chain=chain, answer_cache_size=16, temperature=0)
+    
+    engine.answer_question("is it covered", top_k=1, history=["how long does the battery charge"])
+    response = engine.answer_question("is it covered", top_k=1, history=["does the screen adjust brightness"])
+    
+    assert response.get("cached") is None
+    assert chain.calls == 2
+
+def test_earlier_turns_are_not_encoded_again(make_engine):
+    engine = make_engine(DOCUMENTS)
+    history = ["how long does the battery charge"]
+    
+    engine.retrieve("is it covered", top_k=1, history=history)
+    stats = engine.embedding_manager.query_cache.stats()
+    engine.retrieve("for how long", top_k=1, history=history + ["is it covered"])
+    
+    # Only the new turn is a query cache miss
+    assert engine.embedding_manager.query_cache.stats()["misses"] == stats["misses"] + 1
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Tests for the deadline fallback: a slow LLM is cancelled and the best passage is returned.
+"""
+
+import time
+import asyncio
+
+from fakes import FakeChain, make_chunks
+
+DOCUMENTS = make_chunks("guide.txt", [
+    "the deadline bounds how long a request waits for the llm",
+    "degraded answers fall back to the best retrieved passage"
+])
+
+QUERY = "why does the request wait for the llm deadline"
+
+def test_slow_llm_falls_back_to_the_best_passage(make_engine):
+    chain = FakeChain(delay=2.0)
+    engine = make_engine(DOCUMENTS, chain=chain, answer_cache_size=16, temperature=0)
+    
+    start = time.monotonic()
+    response = engine.answer_question(QUERY, top_k=2, deadline=start + 0.2)
+    
+    assert time.monotonic() - start < 1.5
+    assert response["degraded"] is True
+    assert response["extractive"] is True
+    assert response["answer"] == DOCUMENTS[0]["text"]
+    assert response["k"] == 1
+    
+    # The in-flight call is cancelled, and the degraded answer is not cached
+    time.sleep(0.1)
+    assert chain.cancelled == 1
+    chain.delay = 0.0
+    assert engine.answer_question(QUERY, top_k=2)["answer"] == chain.answer
+    
+    stats = engine.answer_path_stats()
+    assert stats["deadline_exceeded"]["requests"] == 1
+    assert stats["llm"]["requests"] == 1
+    assert stats["cached"]["requests"] == 0
+    # Both questions went to the LLM, so none was a skip
+    assert stats["llm_skip_rate"] == 0.0
+
+def test_async_deadline(make_engine):
+    chain = FakeChain(delay=2.0)
+    engine = make_engine(DOCUMENTS, chain=chain)
+    
+    async def ask():
+        return await engine.aanswer_question(QUERY, top_k=2, deadline=time.monotonic() + 0.2)
+    
+    response = asyncio.run(ask())
+    
+    assert response["degraded"] is True
+    assert chain.cancelled == 1
+    assert engine.answer_path_stats()["deadline_exceeded"]["requests"] == 1
+
+def test_skip_rate_counts_answers_without_the_llm(make_engine):
+    chain = FakeChain()
+    engine = make_engine(DOCUMENTS, chain=chain, min_answer_score=0.6)
+    
+    engine.answer_question(QUERY, top_k=2)
+    engine.answer_question("unrelated gardening tips", top_k=2)
+    
+    stats = engine.answer_path_stats()
+    assert stats["llm"]["requests"] == 1
+    assert stats["low_confidence"]["requests"] == 1
+    assert stats["llm_skip_rate"] == 0.5
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Tests for diverse retrieval: MMR re-ranking and the per-source cap.
+"""
+
+import numpy as np
+import pytest
+
+from fakes import make_chunks
+from rag.utils.diversity import cap_per_group, group_codes, mmr_select
+
+def test_group_codes():
+    codes = group_codes(["b.txt", "a.txt", "b.txt", None])
+    assert codes[0] == codes[2]
+    assert len(set(codes.tolist())) == 3
+
+def test_cap_per_group_keeps_the_best_of_each_group():
+    codes = np.array([0, 0, 0, 1, 0, 2, 1])
+    assert cap_per_group(codes, k=4, max_per_group=2).tolist() == [0, 1, 3, 5]
+    assert cap_per_group(codes, k=10, max_per_group=1).tolist() == [0, 3, 5]
+    assert cap_per_group(np.array([], dtype=np.int64), k=3, max_per_group=1).tolist() == []
+
+def test_mmr_skips_near_duplicates():
+    query = np.array([1.0, 1.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.9, 0.0],
+        [1.0, 0.91, 0.0],  # near-duplicate of the first
+        [0.6, 1.0, 0.3]
+    ])
+    
+    assert mmr_select(query, candidates, k=2, lambda_mult=1.0).tolist() == [1, 0]
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.5).tolist() == [1, 2]
+
+def test_mmr_respects_the_group_cap():
+    query = np.array([1.0, 0.0])
+    candidates = np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+    codes = np.array([0, 0, 1])
+    
+    selected = mmr_select(query, candidates, k=3, lambda_mult=1.0, codes=codes, max_per_group=1)
+    assert selected.tolist() == [0, 2]
+
+def test_mmr_rejects_bad_lambda():
+    with pytest.raises(ValueError):
+        mmr_select(np.ones(2), np.ones((2, 2)), k=1, lambda_mult=1.5)
+
+def test_engine_caps_chunks_per_source(make_engine):
+    documents = (make_chunks("long.txt", [f"vector search tuning part {i}" for i in range(5)]) +
+                 make_chunks("short.txt", ["vector search basics"]))
+    
+    plain = make_engine(documents).retrieve("vector search tuning", top_k=3)
+    assert [result["document"]["metadata"]["source"] for result in plain] == ["long.txt"] * 3
+    
+    capped = make_engine(documents, max_chunks_per_source=2).retrieve("vector search tuning", top_k=3)
+    sources = [result["document"]["metadata"]["source"] for result in capped]
+    assert sorted(sources) == ["long.txt", "long.txt", "short.txt"]
+    assert [result["score"] for result in capped] == sorted((result["score"] for result in capped), reverse=True)
\ No newline at end of file
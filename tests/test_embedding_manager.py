@@ -0,0 +1,18 @@
+"""
+Tests for the embedding manager's loading and encoder statistics.
+"""
+
+from fakes import FakeEncoder
+from rag.utils.embedding_manager import EmbeddingManager
+
+def test_warm_up_is_not_counted_in_encoder_stats(monkeypatch):
+    monkeypatch.setattr(EmbeddingManager, "_load_embedder", lambda self: FakeEncoder(self.model_name))
+    manager = EmbeddingManager(model_name="fake-a", query_cache_size=0)
+    
+    manager.load(warmup_batch_size=8)
+    assert manager.is_loaded
+    assert manager.encode_stats()["calls"] == 0
+    
+    manager.generate_embeddings(["one text", "another text"])
+    stats = manager.encode_stats()
+    assert (stats["calls"], stats["texts"]) == (1, 2)
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Tests for recording the embedding model in saved indexes and migrating indexes to a new model.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from fakes import make_chunks
+from rag.utils.vector_store import VectorStore
+
+DOCUMENTS = make_chunks("notes.txt", [
+    f"note {i} about {topic}" for i, topic in enumerate(
+        ["faiss indexes", "embedding models", "token budgets", "vector search", "answer caching",
+         "query batching", "sentence compression", "score gaps", "source diversity",
+         "neighbour chunks", "conversation history", "deadlines", "rate limits"])
+])
+
+def test_migration_cuts_over_and_saves(make_engine, tmp_path):
+    engine = make_engine(DOCUMENTS)
+    old_version = engine.vector_store.version
+    
+    migration = engine.start_migration("other-model", batch_size=4, save_directory=str(tmp_path))
+    migration.join(timeout=30)
+    
+    assert migration.state == "completed"
+    assert migration.status()["done"] == len(DOCUMENTS)
+    assert engine.embedding_manager.model_id == "other-model"
+    assert engine.vector_store.model_id == "other-model"
+    assert engine.vector_store.version != old_version
+    assert len(engine.vector_store.documents) == len(DOCUMENTS)
+    assert VectorStore.saved_model(str(tmp_path)) == "other-model"
+    
+    # Queries are embedded with the new model and find the right chunk
+    results = engine.retrieve("note 3 about vector search", top_k=1)
+    assert results[0]["document"]["text"] == "note 3 about vector search"
+
+def test_migration_fits_reducer_on_all_documents(make_engine):
+    engine = make_engine(DOCUMENTS, reduced_dimension=4)
+    
+    migration = engine.start_migration("other-model", batch_size=4)
+    migration.join(timeout=30)
+    
+    assert migration.state == "completed"
+    embeddings = engine.embedding_manager.embed_documents(DOCUMENTS)
+    np.testing.assert_allclose(engine.vector_store.reducer.mean, embeddings.mean(axis=0), atol=1e-6)
+
+def test_load_refuses_index_of_another_model(make_engine, tmp_path):
+    make_engine(DOCUMENTS).save_index(str(tmp_path))
+    
+    engine = make_engine(embedding_model_name="other-model")
+    with pytest.raises(ValueError):
+        engine.load_index(str(tmp_path))
+    
+    # The saved model can be adopted explicitly, e.g. to migrate away from it
+    engine.load_index(str(tmp_path), use_saved_model=True)
+    assert engine.embedding_manager.model_id == "all-MiniLM-L6-v2"
+    assert len(engine.vector_store.documents) == len(DOCUMENTS)
+
+def test_legacy_index_records_model_on_next_save(make_engine, tmp_path):
+    make_engine(DOCUMENTS).save_index(str(tmp_path))
+    meta_path = tmp_path / "vector_store.meta"
+    metadata = json.loads(meta_path.read_text())
+    del metadata["model"]
+    meta_path.write_text(json.dumps(metadata))
+    
+    engine = make_engine()
+    engine.load_index(str(tmp_path))
+    assert engine.vector_store.model_id == "all-MiniLM-L6-v2"
+    
+    engine.save_index(str(tmp_path))
+    assert VectorStore.saved_model(str(tmp_path)) == "all-MiniLM-L6-v2"
+
+def test_query_against_index_of_another_model_is_refused(make_engine, api_client, tmp_path):
+    make_engine(DOCUMENTS).save_index(str(tmp_path))
+    saved = (tmp_path / "vector_store.index").read_bytes()
+    
+    client = api_client(make_engine(embedding_model_name="other-model"))
+    for endpoint in ("/api/rag/query", "/api/rag/query/stream"):
+        response = client.post(endpoint, json={"query": "vector search"})
+        assert response.status_code == 409
+        assert "mismatch" in response.get_json()["message"]
+    
+    # The saved index is left as it was
+    assert (tmp_path / "vector_store.index").read_bytes() == saved
+    assert VectorStore.saved_model(str(tmp_path)) == "all-MiniLM-L6-v2"
+
+def test_mismatched_index_is_served_after_migration(make_engine, api_client, tmp_path):
+    make_engine(DOCUMENTS).save_index(str(tmp_path))
+    engine = make_engine(embedding_model_name="other-model")
+    client = api_client(engine)
+    
+    response = client.post("/api/rag/migrate", json={"embedding_model": "other-model", "batch_size": 4})
+    assert response.status_code == 202
+    engine.migration.join(timeout=30)
+    assert engine.migration.state == "completed"
+    
+    response = client.post("/api/rag/query", json={"query": "note 3 about vector search", "top_k": 1})
+    assert response.status_code == 200
+    assert VectorStore.saved_model(str(tmp_path)) == "other-model"
+@pytest.mark.parametrize("batch_size", [0, -4, 2.5, "8", True])
+def test_invalid_migration_batch_size_is_rejected(make_engine, api_client, batch_size):
+    engine = make_engine(DOCUMENTS)
+    client = api_client(engine)
+    
+    response = client.post("/api/rag/migrate", json={"embedding_model": "other-model", "batch_size": batch_size})
+    assert response.status_code == 400
+    assert "batch_size" in response.get_json()["message"]
+    assert engine.migration is None
+    
+    with pytest.raises(ValueError):
+        engine.start_migration("other-model", batch_size=batch_size)
+    assert engine.migration is None
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Tests for sharing embedding managers between collections.
+"""
+
+from fakes import FakeEncoder
+from rag.utils.embedding_manager import DEFAULT_OPENAI_EMBEDDING_MODEL, EmbeddingManager
+from rag.utils.model_registry import EmbeddingModelRegistry
+
+def test_openai_model_names_are_kept():
+    registry = EmbeddingModelRegistry(query_cache_size=0)
+    
+    small = registry.get("text-embedding-3-small", use_openai=True)
+    large = registry.get("text-embedding-3-large", use_openai=True)
+    
+    assert small.model_id == small.client.model == "text-embedding-3-small"
+    assert small.get_dimension() == 1536
+    assert large.model_id == "text-embedding-3-large"
+    assert large.get_dimension() == 3072
+    # A registered model is shared instead of built again
+    assert registry.get("text-embedding-3-small", use_openai=True) is small
+    assert set(registry.stats()["models"]) == {"text-embedding-3-small", "text-embedding-3-large"}
+
+def test_local_model_name_with_openai_uses_the_default_model():
+    manager = EmbeddingManager(use_openai=True, model_name="all-MiniLM-L6-v2", query_cache_size=0)
+    
+    assert manager.model_name == DEFAULT_OPENAI_EMBEDDING_MODEL
+    assert EmbeddingManager.make_model_id("all-MiniLM-L6-v2", use_openai=True) == manager.model_id
+
+def test_local_models_are_shared(monkeypatch):
+    monkeypatch.setattr(EmbeddingManager, "_load_embedder", lambda self: FakeEncoder(self.model_name))
+    registry = EmbeddingModelRegistry(query_cache_size=0)
+    
+    first = registry.get("fake-a")
+    
+    assert registry.get("fake-a") is first
+    assert registry.get("fake-b") is not first
+    assert registry.register(EmbeddingManager(model_name="fake-a")) is first
\ No newline at end of file
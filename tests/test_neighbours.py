@@ -0,0 +1,78 @@
+"""
+Tests for neighbour expansion: the chunks next to each hit are merged into its passage.
+"""
+
+from fakes import FakeChain, make_chunks
+
+WORDS = ["apples", "bananas", "cherries", "dates", "elderberries", "figs"]
+
+def make_documents():
+    documents = make_chunks("fruit.txt", [f"notes on {word}" for word in WORDS])
+    for document in documents:
+        document["metadata"]["token_count"] = 3
+    return documents
+
+def test_neighbours_are_merged_into_the_hit(make_engine):
+    engine = make_engine(make_documents(), neighbour_window=1, neighbour_max_tokens=None)
+    
+    results = engine.retrieve("cherries", top_k=1)
+    
+    assert len(results) == 1
+    assert results[0]["id"] == 2
+    assert results[0]["document"]["text"] == "notes on bananas\nnotes on cherries\nnotes on dates"
+    assert results[0]["document"]["metadata"]["chunk_ids"] == [1, 2, 3]
+    assert sorted(results[0]["neighbours"]) == [1, 3]
+    # The stored chunk itself is left alone
+    assert engine.vector_store.documents[2]["text"] == "notes on cherries"
+
+def test_k_and_citations_count_only_hits(make_engine):
+    chain = FakeChain()
+    engine = make_engine(make_documents(), chain=chain, neighbour_window=1, neighbour_max_tokens=None)
+    
+    response = engine.answer_question("cherries", top_k=1)
+    
+    assert response["k"] == 1
+    assert len(response["sources"]) == 1
+    assert "notes on bananas" in chain.inputs["context"]
+    assert "notes on dates" in chain.inputs["context"]
+
+def test_neighbours_are_not_duplicated(make_engine):
+    engine = make_engine(make_documents(), neighbour_window=1, neighbour_max_tokens=None)
+    
+    results = engine.retrieve("cherries dates", top_k=2)
+    
+    assert sorted(result["id"] for result in results) == [2, 3]
+    texts = [result["document"]["text"] for result in results]
+    context = "".join(texts)
+    for word in ["bananas", "cherries", "dates", "elderberries"]:
+        assert context.count(word) == 1
+
+def test_passages_stay_contiguous(make_engine):
+    engine = make_engine(make_documents(), neighbour_window=2, neighbour_max_tokens=None)
+    
+    results = engine.retrieve("dates bananas", top_k=2)
+    by_id = {result["id"]: result for result in results}
+    
+    # Chunk 2 sits between the hits, so it goes to the better one, and chunk 0 (past
+    # chunk 2 for the hit on chunk 3) may only join the hit on chunk 1
+    assert sorted(by_id) == [1, 3]
+    for result in results:
+        chunk_ids = result["document"]["metadata"].get("chunk_ids", [result["id"]])
+        assert chunk_ids == list(range(chunk_ids[0], chunk_ids[-1] + 1))
+
+def test_token_budget_goes_to_the_best_hits(make_engine):
+    engine = make_engine(make_documents(), neighbour_window=1, neighbour_max_tokens=6)
+    
+    results = engine.retrieve("bananas bananas elderberries", top_k=2)
+    
+    assert [result["id"] for result in results] == [1, 4]
+    assert results[0]["document"]["metadata"]["chunk_ids"] == [0, 1, 2]
+    assert "neighbours" not in results[1]
+def test_overlapping_neighbours_are_merged_without_repeating_text(make_engine):
+    documents = make_chunks("overlap.txt", ["the cache keeps recent vectors", "recent vectors expire after an hour"])
+    documents[1]["metadata"]["start_index"] = len("the cache keeps ")
+    engine = make_engine(documents, neighbour_window=1, neighbour_max_tokens=None)
+    
+    results = engine.retrieve("expire hour", top_k=1)
+    
+    assert results[0]["document"]["text"] == "the cache keeps recent vectors expire after an hour"
\ No newline at end of file
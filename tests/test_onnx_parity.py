@@ -0,0 +1,42 @@
+"""
+Parity of the ONNX embedding backend with the torch backend.
+
+Skipped unless onnxruntime, transformers, torch and sentence-transformers are installed
+and the model can be loaded (from the local cache or the network).
+"""
+
+import pytest
+
+for module in ("onnxruntime", "transformers", "torch", "sentence_transformers"):
+    pytest.importorskip(module)
+
+from rag.benchmark import ONNX_INT8_MIN_SIMILARITY, ONNX_MIN_SIMILARITY, cosine_similarities
+from rag.utils.embedding_manager import EmbeddingManager
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+TEXTS = [
+    "FAISS builds vector indexes for similarity search.",
+    "The answer cache serves similar questions without calling the LLM.",
+    "Chunks are packed into a token budget before they are sent to the model.",
+    "short",
+    "A considerably longer passage that spans several clauses, mentions embeddings, "
+    "quantization, latency percentiles and throughput, so that padding and truncation "
+    "of the tokenizer are exercised as well."
+]
+
+def embed(**kwargs):
+    manager = EmbeddingManager(model_name=MODEL_NAME, query_cache_size=0, **kwargs)
+    try:
+        return manager.generate_embeddings(TEXTS)
+    except Exception as e:
+        pytest.skip(f"{MODEL_NAME} is not available: {e}")
+
+@pytest.mark.parametrize("quantize, min_similarity", [(False, ONNX_MIN_SIMILARITY),
+                                                      (True, ONNX_INT8_MIN_SIMILARITY)])
+def test_onnx_embeddings_match_torch(quantize, min_similarity):
+    reference = embed()
+    candidate = embed(backend="onnx", onnx_quantize=quantize)
+    
+    assert candidate.shape == reference.shape
+    assert cosine_similarities(reference, candidate).min() >= min_similarity
\ No newline at end of file
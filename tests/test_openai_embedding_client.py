@@ -0,0 +1,116 @@
+"""
+Tests for the OpenAI embedding client, against a local mock of the embeddings endpoint.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import requests
+
+from rag.utils.openai_embedding_client import OpenAIEmbeddingClient
+
+class MockEmbeddingsServer:
+    """
+    Stdlib HTTP server imitating POST /embeddings.
+    
+    The embedding of "text N" is [N, len(batch)], and the items of every response are
+    returned in reverse order, so clients have to reorder them by "index".
+    """
+    
+    def __init__(self):
+        self.requests = []
+        # Status codes of the next requests, in order (None succeeds); then all succeed
+        self.failures = []
+        self.retry_after = "0.05"
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(body["input"])
+                status = server.failures.pop(0) if server.failures else None
+                if status is not None:
+                    self.send_response(status)
+                    if status == 429:
+                        self.send_header("Retry-After", server.retry_after)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                
+                data = [{"index": i, "embedding": [float(text.split()[1]), float(len(body["input"]))]}
+                        for i, text in enumerate(body["input"])]
+                payload = json.dumps({"data": data[::-1]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def mock_server():
+    server = MockEmbeddingsServer()
+    yield server
+    server.close()
+
+def make_client(server, **kwargs):
+    options = {"api_key": "test", "base_url": server.base_url, "max_batch_size": 4, "max_concurrency": 1}
+    options.update(kwargs)
+    return OpenAIEmbeddingClient(**options)
+
+TEXTS = [f"text {i}" for i in range(10)]
+
+def test_embeddings_are_reordered_by_index(mock_server):
+    client = make_client(mock_server)
+    embeddings = client.embed(TEXTS)
+    
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (10, 2)
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(10))
+    assert [len(batch) for batch in mock_server.requests] == [4, 4, 2]
+
+def test_rate_limit_is_retried_after_retry_after(mock_server):
+    mock_server.failures = [429, 429]
+    client = make_client(mock_server)
+    embeddings = client.embed(TEXTS[:3])
+    
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(3))
+    stats = client.stats()
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["rate_limited"] == 2
+
+def test_client_errors_are_not_retried(mock_server):
+    mock_server.failures = [400]
+    client = make_client(mock_server)
+    with pytest.raises(requests.HTTPError):
+        client.embed(TEXTS[:3])
+    assert len(mock_server.requests) == 1
+
+def test_interrupted_run_resumes_from_checkpoints(mock_server, tmp_path):
+    # The second of three batches fails for good; the others are checkpointed
+    mock_server.failures = [None, 503]
+    with pytest.raises(requests.HTTPError):
+        make_client(mock_server, checkpoint_dir=str(tmp_path), max_retries=0).embed(TEXTS)
+    
+    mock_server.requests.clear()
+    client = make_client(mock_server, checkpoint_dir=str(tmp_path))
+    embeddings = client.embed(TEXTS)
+    
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(10))
+    assert client.stats()["resumed_batches"] == 2
+    assert mock_server.requests == [TEXTS[4:8]]
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Tests for the request validation of the query endpoints.
+"""
+
+import pytest
+
+from fakes import make_chunks
+
+DOCUMENTS = make_chunks("guide.txt", ["vector search with faiss", "token budgets for context",
+                                      "caching query embeddings"])
+
+@pytest.mark.parametrize("endpoint", ["/api/rag/query", "/api/rag/query/stream"])
+@pytest.mark.parametrize("top_k", ["five", "", 0, -2, 1.5, True, None])
+def test_invalid_top_k_is_rejected(make_engine, api_client, endpoint, top_k):
+    client = api_client(make_engine(DOCUMENTS))
+    response = client.post(endpoint, json={"query": "vector search", "top_k": top_k})
+    assert response.status_code == 400
+    assert "top_k" in response.get_json()["message"]
+
+@pytest.mark.parametrize("endpoint", ["/api/rag/query", "/api/rag/query/stream"])
+@pytest.mark.parametrize("history", ["earlier turn", [1, 2], {"turn": "earlier"}])
+def test_invalid_history_is_rejected(make_engine, api_client, endpoint, history):
+    client = api_client(make_engine(DOCUMENTS))
+    response = client.post(endpoint, json={"query": "vector search", "history": history})
+    assert response.status_code == 400
+    assert "history" in response.get_json()["message"]
+
+def test_fixed_and_adaptive_top_k_are_served(make_engine, api_client):
+    client = api_client(make_engine(DOCUMENTS, adaptive_max_k=2))
+    
+    response = client.post("/api/rag/query", json={"query": "vector search", "top_k": 3})
+    assert response.status_code == 200
+    assert response.get_json()["k"] == 3
+    
+    response = client.post("/api/rag/query", json={"query": "vector search", "top_k": "auto"})
+    assert response.status_code == 200
+    assert 1 <= response.get_json()["k"] <= 2
+@pytest.mark.parametrize("endpoint", ["/api/rag/query", "/api/rag/query/stream"])
+@pytest.mark.parametrize("timeout_ms", ["abc", "500", 0, -5, True, [100]])
+def test_invalid_timeout_is_rejected(make_engine, api_client, endpoint, timeout_ms):
+    client = api_client(make_engine(DOCUMENTS))
+    response = client.post(endpoint, json={"query": "vector search", "timeout_ms": timeout_ms})
+    assert response.status_code == 400
+    assert "timeout_ms" in response.get_json()["message"]
+
+def test_valid_timeout_is_served(make_engine, api_client):
+    client = api_client(make_engine(DOCUMENTS))
+    response = client.post("/api/rag/query", json={"query": "vector search", "timeout_ms": 5000})
+    assert response.status_code == 200
+    assert response.get_json()["degraded"] is False
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+Tests for the query micro-batcher.
+"""
+
+import time
+import threading
+
+import numpy as np
+
+from rag.utils.query_batcher import QueryBatcher
+
+def test_lone_query_is_not_delayed():
+    batcher = QueryBatcher(lambda queries: np.zeros((len(queries), 4), dtype=np.float32), max_wait_ms=1000)
+    try:
+        start = time.monotonic()
+        batcher.embed("only query")
+        assert time.monotonic() - start < 0.5
+    finally:
+        batcher.close()
+
+def test_concurrent_queries_share_batches():
+    batch_sizes = []
+    
+    def embed(queries):
+        batch_sizes.append(len(queries))
+        time.sleep(0.05)
+        return np.arange(len(queries), dtype=np.float32)[:, None].repeat(4, axis=1)
+    
+    batcher = QueryBatcher(embed, max_wait_ms=50)
+    results = {}
+    
+    def run(i):
+        results[i] = batcher.embed(f"query {i}")
+    
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        batcher.close()
+    
+    assert sum(batch_sizes) == 8
+    assert len(batch_sizes) < 8
+    assert len(results) == 8
\ No newline at end of file